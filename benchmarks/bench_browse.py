@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Directory Browse Benchmark
+==========================
+
+Writes a folder of PDF sheets, revisions and other files and times listing
+it for the file picker:
+
+- legacy: os.listdir, then isdir() and stat() per entry, then a full sort
+  (what /api/browse did on each call)
+- scandir: scan_directory() and a sort, uncached
+- cached: DirectoryListingCache with the listing already cached, returning
+  one sorted page of 500 entries (what paging and re-sorting costs)
+
+Usage:
+    python benchmarks/bench_browse.py [--files 20000] [--folders 200]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import synthetic_pdfs  # noqa: F401  (puts the repository root on sys.path)
+from directory_listing import DirectoryListing, DirectoryListingCache, scan_directory
+
+
+def build_folder(folder, files, folders, rng):
+    for i in range(folders):
+        os.makedirs(os.path.join(folder, f"Revision {i}"))
+    for i in range(files):
+        extension = rng.choice(('.pdf', '.pdf', '.pdf', '.dwg', '.bak'))
+        with open(os.path.join(folder, f"M-{i:05d} Rev {rng.randrange(10)}{extension}"), 'w') as f:
+            f.write('x' * rng.randrange(1, 500))
+
+
+def legacy_listing(directory):
+    """The original /api/browse listing of one directory."""
+    folders = []
+    files = []
+    for item in os.listdir(directory):
+        item_path = os.path.join(directory, item)
+        if os.path.isdir(item_path):
+            folders.append({'name': item, 'path': item_path, 'type': 'folder'})
+        elif item.lower().endswith('.pdf'):
+            stat = os.stat(item_path)
+            files.append({'name': item, 'path': item_path, 'size': stat.st_size,
+                          'modified': stat.st_mtime, 'type': 'file'})
+    folders.sort(key=lambda x: x['name'].lower())
+    files.sort(key=lambda x: x['name'].lower())
+    return folders, files
+
+
+def scandir_listing(directory):
+    folders, files = scan_directory(directory)
+    return DirectoryListing(directory, 0, folders, files).sorted('name')
+
+
+def cached_page(cache, directory, sort):
+    folders, files = cache.listing(directory).sorted(sort, True)
+    return folders[:500] + files[:max(500 - len(folders), 0)]
+
+
+def best_of(func, repeat=5):
+    """Fastest of several runs, in milliseconds, and the last result."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark directory listing for /api/browse')
+    parser.add_argument('--files', type=int, default=20000, help='Files in the folder')
+    parser.add_argument('--folders', type=int, default=200, help='Subfolders in the folder')
+    args = parser.parse_args()
+    
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as folder:
+        build_folder(folder, args.files, args.folders, rng)
+        
+        legacy_ms, (legacy_folders, legacy_files) = best_of(lambda: legacy_listing(folder))
+        scandir_ms, (folders, files) = best_of(lambda: scandir_listing(folder))
+        assert [f['path'] for f in folders + files] == [f['path'] for f in legacy_folders + legacy_files]
+        
+        cache = DirectoryListingCache()
+        cache.listing(folder)
+        print(f"{len(folders)} folders and {len(files)} PDFs among {args.files} files\n")
+        print(f"{'listing':>28} {'ms':>9} {'speedup':>8}")
+        print(f"{'legacy (listdir + stat)':>28} {legacy_ms:>9.1f} {'1x':>8}")
+        print(f"{'scandir':>28} {scandir_ms:>9.1f} {legacy_ms / scandir_ms:>7.1f}x")
+        for sort in ('name', 'modified', 'size'):
+            cached_ms, _ = best_of(lambda: cached_page(cache, folder, sort))
+            print(f"{'cached page, by ' + sort:>28} {cached_ms:>9.2f} {legacy_ms / cached_ms:>7.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Consolidated PDF Benchmark
+==========================
+
+Builds a synthetic export folder with several hundred PNG extractions
+rendered at 3x scale (like the frontend's region captures), spread over a
+few equipment types, and times create_consolidated_equipment_pdfs:
+
+- legacy: PNG size read by opening the file with fitz.open(png_path) after
+  reading it into memory (the original code: the file is read and parsed twice)
+- current: size read from the PNG header, one buffer per image
+- current with --workers processes, if more than one
+- each image recompression profile in --profiles, with --workers processes
+
+The page sizes of every variant must match the legacy PDFs.
+
+Usage:
+    python benchmarks/bench_consolidation.py [--images 300] [--types 6] [--workers 4]
+        [--profiles lossless jpeg:75 grayscale bilevel] [--max-dpi 72]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+import timeit
+
+import synthetic_pdfs  # noqa: F401  (puts the repository root on sys.path)
+import equipment_pdfs
+
+import fitz  # PyMuPDF
+
+
+def legacy_insert_png_page(doc, png_path):
+    """The original PNG insertion: read the bytes, then open the file again for its size."""
+    with open(png_path, 'rb') as f:
+        png_data = f.read()
+    
+    img = fitz.open(png_path)
+    page_rect = img[0].rect
+    img.close()
+    
+    page = doc.new_page(width=page_rect.width, height=page_rect.height)
+    page.insert_image(page_rect, stream=png_data, keep_proportion=True)
+
+
+def build_export_folder(folder, images, types, region=(400, 300), scale=3):
+    """Write equipment folders of distinct 3x-scale region captures plus project_data.json."""
+    source = fitz.open()
+    page = source.new_page(width=region[0], height=region[1])
+    matrix = fitz.Matrix(scale, scale)
+    
+    equipment = {}
+    for i in range(images):
+        equipment_type = f"TYPE{i % types}"
+        equipment_dir = os.path.join(folder, equipment_type)
+        os.makedirs(equipment_dir, exist_ok=True)
+        
+        # Redraw the page so every image is distinct (identical images would be deduplicated on save)
+        page.clean_contents()
+        page.draw_rect(page.rect, color=(1, 1, 1), fill=(1, 1, 1))
+        for row in range(12):
+            y = 20 + row * 22
+            page.draw_line((20, y), (region[0] - 20, y), color=(0, 0, 0), width=0.5)
+            page.insert_text((24, y + 16), f"{equipment_type}-{i} ROW {row} CFM {(i * 37 + row * 11) % 5000}",
+                             fontsize=9)
+        
+        image_name = f"extraction_{i}.png"
+        page.get_pixmap(matrix=matrix).save(os.path.join(equipment_dir, image_name))
+        
+        equipment.setdefault(equipment_type, []).append({
+            'id': i,
+            'extractionType': 'schedule',
+            'extractionName': f"Extraction {i}",
+            'isFullPage': False,
+            'files': {'image': f"{equipment_type}/{image_name}"}
+        })
+        
+        if i % 50 == 0:
+            # Start from an empty page again so content streams stay small
+            source.delete_page(0)
+            page = source.new_page(width=region[0], height=region[1])
+    
+    with open(os.path.join(folder, 'project_data.json'), 'w') as f:
+        json.dump({'originalPdfPath': None, 'equipment': equipment}, f)
+    
+    source.close()
+
+
+def page_sizes(result):
+    """(width, height) of every page of every consolidated PDF, by equipment type."""
+    sizes = {}
+    for stats in result['equipment']:
+        with fitz.open(stats['pdf_path']) as doc:
+            sizes[stats['equipment_type']] = [(round(p.rect.width, 3), round(p.rect.height, 3)) for p in doc]
+    return sizes
+
+
+def run(folder, workers, image_profile=None):
+    """Time one consolidation run, hiding its per-page progress output."""
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = equipment_pdfs.create_consolidated_equipment_pdfs(folder, workers=workers,
+                                                                   image_profile=image_profile)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark consolidated equipment PDF generation')
+    parser.add_argument('--images', type=int, default=300, help='Number of PNG extractions')
+    parser.add_argument('--types', type=int, default=6, help='Number of equipment types')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Worker processes for the parallel run')
+    parser.add_argument('--profiles', nargs='*', default=['lossless', 'jpeg', 'grayscale', 'bilevel'],
+                        help='Image recompression profiles to compare')
+    parser.add_argument('--max-dpi', type=float, default=None,
+                        help='Also downsample images above this resolution in the profile runs')
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as folder:
+        print(f"Rendering {args.images} extraction images at 3x scale...")
+        build_export_folder(folder, args.images, args.types)
+        
+        png_paths = [os.path.join(root, name) for root, _, files in os.walk(folder)
+                     for name in files if name.endswith('.png')]
+        total_mb = sum(os.path.getsize(path) for path in png_paths) / 1024 / 1024
+        print(f"{len(png_paths)} PNGs, {total_mb:.1f}MB, {args.types} equipment types\n")
+        
+        # Size lookup alone
+        png_data = open(png_paths[0], 'rb').read()
+        number = 200
+        opened = min(timeit.repeat(lambda: fitz.open(png_paths[0])[0].rect, number=number, repeat=3)) / number
+        header = min(timeit.repeat(lambda: equipment_pdfs.png_page_size(png_data), number=number, repeat=3)) / number
+        print(f"size lookup: fitz.open {opened * 1e6:.0f}us, PNG header {header * 1e6:.1f}us\n")
+        
+        current_insert = equipment_pdfs.insert_png_page
+        equipment_pdfs.insert_png_page = legacy_insert_png_page
+        try:
+            legacy_seconds, legacy_result = run(folder, 1)
+        finally:
+            equipment_pdfs.insert_png_page = current_insert
+        legacy_sizes = page_sizes(legacy_result)
+        
+        timings = [('legacy', 1, legacy_seconds, legacy_result)]
+        variants = [('current', workers, None) for workers in sorted({1, args.workers})]
+        variants += [(name, args.workers, equipment_pdfs.resolve_image_profile(name, args.max_dpi))
+                     for name in args.profiles]
+        
+        for name, workers, image_profile in variants:
+            seconds, result = run(folder, workers, image_profile)
+            if page_sizes(result) != legacy_sizes:
+                print(f"❌ Page sizes differ from legacy for {name} with {workers} worker(s)")
+            timings.append((name, workers, seconds, result))
+        
+        print(f"\n{'variant':>12} {'workers':>8} {'parallel':>10} {'seconds':>9} {'speedup':>8} {'output MB':>10}")
+        for name, workers, seconds, result in timings:
+            output_mb = sum(stats['size_bytes'] for stats in result['equipment']) / 1024 / 1024
+            print(f"{name:>12} {workers:>8} {str(result['parallelism']):>10} {seconds:>9.2f} "
+                  f"{legacy_seconds / seconds:>7.2f}x {output_mb:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
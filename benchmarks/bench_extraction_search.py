@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Extraction Search Benchmark
+===========================
+
+Writes several synthetic export folders (project_data.json with OCR text
+for every extraction) and times a search across all of them:
+
+- legacy: read and parse every project_data.json, then a lowercase
+  substring count over the concatenated fields (the original endpoint)
+- index: ExtractionSearchIndex with the folders already indexed
+- index, cold: the first search, which indexes every folder
+
+Usage:
+    python benchmarks/bench_extraction_search.py [--projects 4] [--extractions 500]
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+import synthetic_pdfs  # noqa: F401  (puts the repository root on sys.path)
+from search_index import ExtractionSearchIndex
+
+WORDS = ('supply fan return exhaust cfm static pressure motor hp voltage phase rpm model filter coil '
+         'damper heating cooling capacity mbh eat lat ewt lwt gpm refrigerant compressor').split()
+EQUIPMENT_TYPES = ('AHU', 'VAV', 'FANS', 'RTU', 'GRD')
+
+
+def build_project(folder, extractions, rng):
+    """Write project_data.json with OCR text of a few hundred words per extraction."""
+    equipment = {}
+    for i in range(extractions):
+        equipment_type = rng.choice(EQUIPMENT_TYPES)
+        raw_text = ' '.join(rng.choice(WORDS) for _ in range(300))
+        equipment.setdefault(equipment_type, []).append({
+            'id': f"{os.path.basename(folder)}-{i}",
+            'extractionName': f"{equipment_type}-{i % 40} Schedule",
+            'extractionType': 'schedule',
+            'ocrData': {'rawText': f"{raw_text} TAG {equipment_type}-{i}",
+                        'notes': {'entries': ['Provide VFD', 'Coordinate with controls']}}
+        })
+    
+    os.makedirs(folder, exist_ok=True)
+    with open(os.path.join(folder, 'project_data.json'), 'w') as f:
+        json.dump({'equipment': equipment}, f)
+
+
+def legacy_search(query, folders):
+    """The original /api/search-extractions scan."""
+    query = query.lower()
+    results = []
+    for folder in folders:
+        with open(os.path.join(folder, 'project_data.json'), 'r', encoding='utf-8') as f:
+            project_data = json.load(f)
+        for equipment_type, extractions in project_data['equipment'].items():
+            for extraction in extractions:
+                searchable_text = ' '.join([
+                    extraction.get('extractionName', ''),
+                    extraction.get('equipmentType', ''),
+                    extraction.get('extractionType', ''),
+                    extraction.get('ocrData', {}).get('rawText', ''),
+                    ' '.join(extraction.get('ocrData', {}).get('notes', {}).get('entries', []))
+                ]).lower()
+                if query in searchable_text:
+                    results.append((extraction['id'], searchable_text.count(query)))
+    results.sort(key=lambda result: result[1], reverse=True)
+    return results
+
+
+def best_of(func, repeat=5):
+    """Fastest of several runs, in milliseconds, and the last result."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark extraction full-text search')
+    parser.add_argument('--projects', type=int, default=4, help='Number of export folders')
+    parser.add_argument('--extractions', type=int, default=500, help='Extractions per folder')
+    args = parser.parse_args()
+    
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as root:
+        folders = [os.path.join(root, f"project_{i}") for i in range(args.projects)]
+        for folder in folders:
+            build_project(folder, args.extractions, rng)
+        
+        index = ExtractionSearchIndex(os.path.join(root, 'search.sqlite3'))
+        start = time.perf_counter()
+        index.search('fan', folders)
+        cold_ms = (time.perf_counter() - start) * 1000
+        print(f"{args.projects * args.extractions} extractions in {args.projects} folders; "
+              f"first search (indexing) {cold_ms:.0f}ms\n")
+        
+        print(f"{'query':>22} {'legacy ms':>10} {'index ms':>9} {'speedup':>8} {'legacy hits':>12} {'index hits':>11}")
+        for query in ('compressor', 'AHU-12', 'static pressure', 'provide vfd'):
+            legacy_ms, legacy_results = best_of(lambda: legacy_search(query, folders))
+            index_ms, found = best_of(lambda: index.search(f'"{query}"', folders, limit=50))
+            print(f"{query:>22} {legacy_ms:>10.1f} {index_ms:>9.2f} {legacy_ms / index_ms:>7.0f}x "
+                  f"{len(legacy_results):>12} {found['total_found']:>11}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+File Lookup Benchmark
+=====================
+
+Writes a synthetic directory tree of PDFs and times finding one file by
+name and size:
+
+- walk: os.walk over the tree, stat-ing every same-named file (what
+  /api/find-file did on each call)
+- index: PathIndex with the tree already crawled
+- crawl: a full first crawl, and an incremental crawl of the unchanged tree
+
+Usage:
+    python benchmarks/bench_find_file.py [--directories 2000] [--files 10]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import synthetic_pdfs  # noqa: F401  (puts the repository root on sys.path)
+from path_index import PathIndex
+
+
+def build_tree(root, directories, files, rng):
+    """Job folders up to six levels deep with a few PDFs and other files each."""
+    folders = [root]
+    for i in range(directories):
+        parent = rng.choice([folder for folder in folders[-50:] if folder.count(os.sep) - root.count(os.sep) < 6] or [root])
+        folder = os.path.join(parent, f"folder_{i}")
+        os.makedirs(folder)
+        folders.append(folder)
+        for j in range(files):
+            extension = rng.choice(('.pdf', '.pdf', '.dwg', '.xlsx'))
+            with open(os.path.join(folder, f"sheet_{rng.randrange(directories * files)}{extension}"), 'w') as f:
+                f.write('x' * rng.randrange(1, 200))
+    return folders
+
+
+def walk_find(root, file_name, file_size):
+    """The original /api/find-file search."""
+    matches = []
+    for dirpath, _dirnames, filenames in os.walk(root):
+        if file_name in filenames:
+            full_path = os.path.join(dirpath, file_name)
+            stat = os.stat(full_path)
+            if abs(stat.st_size - file_size) <= 100:
+                matches.append((full_path, stat.st_size == file_size))
+    return matches
+
+
+def best_of(func, repeat=5):
+    """Fastest of several runs, in milliseconds, and the last result."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark finding a file by name')
+    parser.add_argument('--directories', type=int, default=2000, help='Number of directories')
+    parser.add_argument('--files', type=int, default=10, help='Files per directory')
+    args = parser.parse_args()
+    
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, 'tree')
+        folders = build_tree(root, args.directories, args.files, rng)
+        targets = [os.path.join(folder, name) for folder in rng.sample(folders[1:], 5)
+                   for name in os.listdir(folder) if name.endswith('.pdf')][:3]
+        
+        index = PathIndex(os.path.join(tmp, 'paths.sqlite3'), roots=[root])
+        full_ms, crawl = best_of(index.crawl, repeat=1)
+        incremental_ms, _ = best_of(index.crawl, repeat=3)
+        print(f"{crawl['directories_listed']} directories, {crawl['files']} PDFs indexed; "
+              f"first crawl {full_ms:.0f}ms, unchanged re-crawl {incremental_ms:.0f}ms\n")
+        
+        print(f"{'file':>22} {'walk ms':>9} {'index ms':>9} {'speedup':>8} {'matches':>8}")
+        for target in targets:
+            name, size = os.path.basename(target), os.path.getsize(target)
+            walk_ms, walk_matches = best_of(lambda: walk_find(root, name, size))
+            index_ms, matches = best_of(lambda: index.find(name, size=size))
+            assert sorted(path for path, _ in walk_matches) == sorted(match['path'] for match in matches)
+            print(f"{name:>22} {walk_ms:>9.1f} {index_ms:>9.3f} {walk_ms / index_ms:>7.0f}x {len(matches):>8}")
+
+
+if __name__ == '__main__':
+    main()
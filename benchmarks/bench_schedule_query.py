@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Schedule Query Benchmark
+========================
+
+Writes several synthetic export folders whose extractions carry markdown
+schedule tables and times a condition query across all of them:
+
+- scan: read every project_data.json, parse each table and test every row
+  (what answering the query without an index takes)
+- index: ExtractionSearchIndex with the per-column indexes already loaded
+- index, cold: the first query, which loads the column indexes from the
+  database
+
+Usage:
+    python benchmarks/bench_schedule_query.py [--projects 8] [--extractions 300] [--rows 20]
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+import synthetic_pdfs  # noqa: F401  (puts the repository root on sys.path)
+from schedule_tables import ScheduleIndex, extraction_records, parse_where, record_cells
+from search_index import ExtractionSearchIndex
+
+HEADERS = ('TAG', 'Supply CFM', 'ESP (in. wg)', 'Motor HP', 'RPM', 'V/PH/HZ', 'MCA', 'MOP', 'Model')
+EQUIPMENT_TYPES = ('AHU', 'FANS', 'RTU', 'VAV')
+QUERIES = ('CFM > 5000', 'HP >= 5 AND VOLTAGE = 460', 'TAG ~ EF-1 OR (RPM < 900 AND STATIC >= 1.5)')
+
+
+def schedule_markdown(equipment_type, rows, rng):
+    """A markdown schedule table like the ones the Gemini provider returns."""
+    lines = ['| ' + ' | '.join(HEADERS) + ' |', '|' + '---|' * len(HEADERS)]
+    for i in range(rows):
+        voltage = rng.choice(('115/1/60', '208/3/60', '460/3/60'))
+        lines.append('| ' + ' | '.join((
+            f"{equipment_type[:2]}-{i + 1}",
+            f"{rng.randrange(200, 12000):,}",
+            f"{rng.choice((0.25, 0.5, 0.75, 1, 1.5, 2, 2.5))}",
+            rng.choice(('1/4', '1/2', '3/4', '1', '1-1/2', '2', '3', '5', '7-1/2', '10', '15')),
+            str(rng.randrange(600, 1800)),
+            voltage,
+            f"{rng.uniform(2, 60):.1f}",
+            str(rng.choice((15, 20, 25, 30, 40, 60))),
+            f"M-{rng.randrange(100, 999)}"
+        )) + ' |')
+    return '\n'.join(lines)
+
+
+def build_project(folder, extractions, rows, rng):
+    equipment = {}
+    for i in range(extractions):
+        equipment_type = rng.choice(EQUIPMENT_TYPES)
+        equipment.setdefault(equipment_type, []).append({
+            'id': f"{os.path.basename(folder)}-{i}",
+            'extractionName': f"{equipment_type} Schedule {i}",
+            'extractionType': 'schedule',
+            'ocrData': {'markdown': schedule_markdown(equipment_type, rows, rng)}
+        })
+    
+    os.makedirs(folder, exist_ok=True)
+    with open(os.path.join(folder, 'project_data.json'), 'w') as f:
+        json.dump({'equipment': equipment}, f)
+
+
+def scan_query(where, folders):
+    """Read, parse and test every table row without an index."""
+    tree = parse_where(where)
+    matches = 0
+    for folder in folders:
+        with open(os.path.join(folder, 'project_data.json'), 'r', encoding='utf-8') as f:
+            project_data = json.load(f)
+        for extractions in project_data['equipment'].values():
+            for extraction in extractions:
+                records = extraction_records(extraction)
+                index = ScheduleIndex([cell for i, record in enumerate(records) for cell in record_cells(0, i, record)])
+                if index.evaluate(tree).any():
+                    matches += 1
+    return matches
+
+
+def best_of(func, repeat=3):
+    """Fastest of several runs, in milliseconds, and the last result."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark schedule table condition queries')
+    parser.add_argument('--projects', type=int, default=8, help='Number of export folders')
+    parser.add_argument('--extractions', type=int, default=300, help='Extractions per folder')
+    parser.add_argument('--rows', type=int, default=20, help='Table rows per extraction')
+    args = parser.parse_args()
+    
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as root:
+        folders = [os.path.join(root, f"project_{i}") for i in range(args.projects)]
+        for folder in folders:
+            build_project(folder, args.extractions, args.rows, rng)
+        
+        index = ExtractionSearchIndex(os.path.join(root, 'search.sqlite3'))
+        start = time.perf_counter()
+        for folder in folders:
+            index.refresh(folder)
+        indexing_s = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        index.search(None, folders, where=QUERIES[0], refresh=False)
+        cold_ms = (time.perf_counter() - start) * 1000
+        
+        rows = args.projects * args.extractions * args.rows
+        print(f"{rows} table rows in {args.projects} folders; indexing {indexing_s:.1f}s, "
+              f"first query (loading column indexes) {cold_ms:.0f}ms\n")
+        
+        print(f"{'conditions':>46} {'scan ms':>9} {'index ms':>9} {'speedup':>8} {'matches':>8}")
+        for where in QUERIES:
+            scan_ms, scan_matches = best_of(lambda: scan_query(where, folders), repeat=1)
+            index_ms, found = best_of(lambda: index.search(None, folders, where=where, limit=50, refresh=False))
+            assert found['total_found'] == scan_matches
+            print(f"{where:>46} {scan_ms:>9.0f} {index_ms:>9.2f} {scan_ms / index_ms:>7.0f}x {scan_matches:>8}")
+
+
+if __name__ == '__main__':
+    main()
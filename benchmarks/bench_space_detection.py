@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Space Detection Benchmark
+=========================
+
+Compares the "targeted" and "full_scan" modes of
+BlueBeamSpaceHandler.detect_all_spaces on synthetic drawing sets
+sequentially, and "full_scan" sharded across a process pool.
+
+Usage:
+    python benchmarks/bench_space_detection.py [--pages 400] [--filler 200000] [--workers 8]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from synthetic_pdfs import build_spaces_pdf
+from bluebeam_space_handler import BlueBeamSpaceHandler
+
+
+def time_detection(pdf_path, mode, repeat, workers=1):
+    """Return (best seconds, spaces) for detecting spaces with the given mode."""
+    best = None
+    spaces = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with BlueBeamSpaceHandler(pdf_path) as handler:
+            spaces = handler.detect_all_spaces(mode=mode, workers=workers)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, spaces
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark BlueBeam Space detection modes')
+    parser.add_argument('--pages', type=int, default=400, help='Pages in the synthetic set')
+    parser.add_argument('--spaces-per-page', type=int, default=1, help='Spaces per page')
+    parser.add_argument('--filler', type=int, nargs='+', default=[10000, 100000, 200000],
+                        help='Unrelated objects to add (one run per value)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per mode (best is reported)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Worker processes for the parallel runs')
+    args = parser.parse_args()
+    
+    print(f"{'pages':>6} {'spaces':>7} {'xrefs':>8} {'full_scan':>11} {'targeted':>10} {'speedup':>8} "
+          f"{'full_scan x' + str(args.workers):>14}")
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for filler in args.filler:
+            pdf_path = os.path.join(tmp_dir, f"spaces_{filler}.pdf")
+            info = build_spaces_pdf(pdf_path, pages=args.pages,
+                                    spaces_per_page=args.spaces_per_page,
+                                    filler_objects=filler)
+            
+            full_time, full_spaces = time_detection(pdf_path, 'full_scan', args.repeat)
+            targeted_time, targeted_spaces = time_detection(pdf_path, 'targeted', args.repeat)
+            parallel_full_time, parallel_full_spaces = time_detection(
+                pdf_path, 'full_scan', args.repeat, workers=args.workers)
+            
+            expected = [s.to_dict() for s in full_spaces]
+            for label, spaces in (('targeted', targeted_spaces),
+                                  ('parallel full_scan', parallel_full_spaces)):
+                if [s.to_dict() for s in spaces] != expected:
+                    print(f"❌ {label} disagrees with full_scan for filler={filler}")
+            
+            print(f"{info['pages']:>6} {info['spaces']:>7} {info['xref_length']:>8} "
+                  f"{full_time:>10.3f}s {targeted_time:>9.3f}s {full_time / targeted_time:>7.1f}x "
+                  f"{parallel_full_time:>13.3f}s")
+
+
+if __name__ == '__main__':
+    main()
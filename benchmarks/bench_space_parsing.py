@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Space Parsing Micro-Benchmarks
+==============================
+
+Times the parsing of single BlueBeam Space objects of increasing size:
+
+- legacy: xref_object() + regex/bracket-counting parser (the original code)
+- current: xref_object() + BlueBeamSpaceHandler._parse_space_object
+  (precompiled patterns, NumPy path conversion)
+
+Both parsers must produce the same title, coordinates, color and opacity.
+
+Usage:
+    python benchmarks/bench_space_parsing.py [--vertices 4 50 500 5000] [--number 200]
+"""
+
+import argparse
+import re
+import timeit
+
+from synthetic_pdfs import space_object_source
+from bluebeam_space_handler import BlueBeamSpaceHandler
+
+import fitz  # PyMuPDF
+
+
+def legacy_extract_path_coordinates(path_str):
+    """The original character-by-character path parser."""
+    coordinates = []
+    path_str = re.sub(r'\s+', ' ', path_str.strip())
+    i = 0
+    while i < len(path_str):
+        if path_str[i] == '[':
+            bracket_count = 1
+            start = i + 1
+            i += 1
+            while i < len(path_str) and bracket_count > 0:
+                if path_str[i] == '[':
+                    bracket_count += 1
+                elif path_str[i] == ']':
+                    bracket_count -= 1
+                i += 1
+            if bracket_count == 0:
+                try:
+                    coords = [float(x) for x in path_str[start:i - 1].split()]
+                    if len(coords) >= 2:
+                        coordinates.append([coords[0], coords[1]])
+                except ValueError:
+                    continue
+        else:
+            i += 1
+    return coordinates
+
+
+def legacy_parse_space(doc, xref):
+    """The original xref_object + regex parser; returns (title, coordinates, color, opacity)."""
+    obj_str = doc.xref_object(xref)
+    if '/Type /Space' not in obj_str:
+        return None
+    
+    title_match = re.search(r'/Title\s*\((.*?)\)', obj_str)
+    title = title_match.group(1) if title_match else f"Space_{xref}"
+    
+    bracket_start = obj_str.find('[', obj_str.find('/Path'))
+    bracket_count = 0
+    bracket_end = -1
+    for i in range(bracket_start, len(obj_str)):
+        if obj_str[i] == '[':
+            bracket_count += 1
+        elif obj_str[i] == ']':
+            bracket_count -= 1
+            if bracket_count == 0:
+                bracket_end = i
+                break
+    coordinates = legacy_extract_path_coordinates(obj_str[bracket_start + 1:bracket_end])
+    
+    color_match = re.search(r'/C\s*\[([\d\.\s]+)\]', obj_str)
+    color = [float(x) for x in color_match.group(1).split()][:3] if color_match else [0.0, 0.0, 1.0]
+    
+    opacity_match = re.search(r'/CA\s*([\d\.]+)', obj_str)
+    opacity = float(opacity_match.group(1)) if opacity_match else 0.25
+    
+    return title, coordinates, color, opacity
+
+
+def current_parse_space(handler, xref):
+    """The current parser, including the /Type check done by _parse_space_xrefs."""
+    obj_str = handler.doc.xref_object(xref)
+    if '/Type /Space' not in obj_str:
+        return None
+    space = handler._parse_space_object(xref, obj_str, {})
+    return space.title, space.coordinates, space.color, space.opacity
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Micro-benchmark BlueBeam Space object parsing')
+    parser.add_argument('--vertices', type=int, nargs='+', default=[4, 50, 500, 5000],
+                        help='Polygon sizes to benchmark')
+    parser.add_argument('--number', type=int, default=200, help='Parses per timing run')
+    args = parser.parse_args()
+    
+    doc = fitz.open()
+    doc.new_page()
+    xrefs = {}
+    for vertices in args.vertices:
+        xref = doc.get_new_xref()
+        doc.update_object(xref, space_object_source(f"Room {vertices}", vertices,
+                                                    color=(0.25, 0.5, 0.75), opacity=0.4))
+        xrefs[vertices] = xref
+    
+    handler = BlueBeamSpaceHandler(stream=doc.tobytes())
+    handler.doc = doc
+    
+    print(f"{'vertices':>9} {'legacy':>12} {'current':>12} {'speedup':>8}")
+    
+    for vertices, xref in xrefs.items():
+        if legacy_parse_space(doc, xref) != current_parse_space(handler, xref):
+            print(f"❌ Parsers disagree for {vertices} vertices")
+        
+        number = max(1, args.number * 50 // max(vertices, 50))
+        legacy = min(timeit.repeat(lambda: legacy_parse_space(doc, xref), number=number, repeat=3)) / number
+        current = min(timeit.repeat(lambda: current_parse_space(handler, xref), number=number, repeat=3)) / number
+        
+        print(f"{vertices:>9} {legacy * 1e6:>10.1f}us {current * 1e6:>10.1f}us {legacy / current:>7.1f}x")
+    
+    doc.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Synthetic PDF Builders for Benchmarks
+=====================================
+
+Builds drawing sets that look like BlueBeam output (pages with /BSISpaces
+arrays pointing at /Type /Space objects) without needing real project files.
+"""
+
+import math
+import os
+import sys
+
+# Allow the benchmarks to import the modules in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # PyMuPDF
+
+
+def space_object_source(title, vertices, color=(0.2, 0.6, 1.0), opacity=0.25,
+                        center=(400.0, 300.0), radius=150.0):
+    """
+    Build the PDF source of a BlueBeam Space object.
+    
+    Args:
+        title: Space name stored in /Title
+        vertices: Number of polygon vertices in /Path
+        color: RGB color stored in /C
+        opacity: Opacity stored in /CA
+        center: Polygon center in page coordinates
+        radius: Polygon radius in points
+        
+    Returns:
+        str: PDF dictionary source for the Space
+    """
+    points = []
+    for i in range(vertices):
+        angle = 2 * math.pi * i / vertices
+        x = center[0] + radius * math.cos(angle)
+        y = center[1] + radius * math.sin(angle)
+        points.append(f"[{x:.3f} {y:.3f}]")
+    
+    return (
+        f"<< /Type /Space /Title ({title}) /Path [{' '.join(points)}] "
+        f"/C [{color[0]} {color[1]} {color[2]}] /CA {opacity} >>"
+    )
+
+
+def build_spaces_pdf(output_path, pages=200, spaces_per_page=2, filler_objects=50000,
+                     vertices=8, page_size=(2592, 1728)):
+    """
+    Write a PDF with BlueBeam Spaces and a large number of unrelated objects.
+    
+    The filler objects stand in for the fonts, images and annotations of a
+    real drawing set so that the xref table is much larger than the number
+    of Spaces.
+    
+    Args:
+        output_path: Where to save the PDF
+        pages: Number of pages
+        spaces_per_page: Spaces referenced from each page's /BSISpaces array
+        filler_objects: Number of extra objects added to the xref table
+        vertices: Polygon vertices per Space
+        page_size: (width, height) of each page in points (36x24 inch default)
+        
+    Returns:
+        dict: Counts describing the generated document
+    """
+    doc = fitz.open()
+    width, height = page_size
+    total_spaces = 0
+    
+    for page_num in range(pages):
+        page = doc.new_page(width=width, height=height)
+        
+        space_refs = []
+        for i in range(spaces_per_page):
+            xref = doc.get_new_xref()
+            center = (200.0 + 300.0 * i, 200.0 + (page_num % 5) * 100.0)
+            doc.update_object(xref, space_object_source(
+                f"Room {page_num + 1}-{i + 1}", vertices, center=center))
+            space_refs.append(f"{xref} 0 R")
+            total_spaces += 1
+        
+        if space_refs:
+            array_xref = doc.get_new_xref()
+            doc.update_object(array_xref, f"[{' '.join(space_refs)}]")
+            doc.xref_set_key(page.xref, "BSISpaces", f"{array_xref} 0 R")
+    
+    for i in range(filler_objects):
+        xref = doc.get_new_xref()
+        doc.update_object(xref, f"<< /Type /Filler /Index {i} /Data [0 1 2 3 4 5 6 7] >>")
+    
+    doc.save(output_path)
+    xref_count = doc.xref_length()
+    doc.close()
+    
+    return {
+        'pages': pages,
+        'spaces': total_spaces,
+        'xref_length': xref_count,
+        'file_size': os.path.getsize(output_path)
+    }
@@ -8,49 +8,167 @@ Adapted from SpaceExtractor for integration with PDF Schedule Extractor.
 """
 
 import fitz  # PyMuPDF
+import numpy as np
 import re
 import json
+import hashlib
 from typing import List, Dict, Optional, Tuple, Any
-from dataclasses import dataclass, asdict
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+from process_pools import POOL_CONTEXT
+
+# Supported strategies for BlueBeamSpaceHandler.detect_all_spaces
+DETECTION_MODES = ("targeted", "full_scan")
+
+# Smallest xref range handed to a worker process; smaller documents are not
+# worth the cost of starting a process and re-opening the PDF
+MIN_XREFS_PER_WORKER = 20000
+
+# Precompiled patterns for parsing Space objects
+_TITLE_RE = re.compile(r'/Title\s*\((.*?)\)')
+_COLOR_RE = re.compile(r'/C\s*\[([\d\.\s]+)\]')
+_OPACITY_RE = re.compile(r'/CA\s*([\d\.]+)')
+_PATH_START_RE = re.compile(r'/Path\s*\[')
+_PATH_END_RE = re.compile(r'\]\s*\]')
+_INNER_ARRAY_RE = re.compile(r'\[([^\[\]]*)\]')
+_BRACKETS_TO_SPACES = str.maketrans('[]', '  ')
+
+# Decimal places of coordinates in JSON output; hides float32 representation noise
+COORDINATE_DECIMALS = 3
 
 
-@dataclass
 class BlueBeamSpace:
-    """Represents a BlueBeam Space object extracted from a PDF."""
-    xref: int
-    title: str
-    coordinates: List[List[float]]  # [[x1,y1], [x2,y2], ...] - original BlueBeam coords
-    page_number: int
-    color: List[float]  # [r, g, b] values 0.0-1.0
-    opacity: float  # 0.0-1.0
-    bounds: Dict[str, float]  # min_x, min_y, max_x, max_y
-    area: float
-    pymupdf_rect: Optional[Tuple[float, float, float, float]] = None  # Transformed coordinates
-    transformation_method: str = "default"
+    """
+    Represents a BlueBeam Space object extracted from a PDF.
+    
+    Vertices are kept in an Nx2 float32 array (MuPDF stores PDF reals as
+    32-bit floats, so nothing is lost) and bounds in a
+    (min_x, min_y, max_x, max_y) tuple. to_dict() produces the same JSON
+    shape as the original dataclass. The polygon area is filled in for all
+    spaces at once by polygon_areas() during detection.
+    """
+    
+    __slots__ = ('xref', 'title', 'vertices', 'page_number', 'color', 'opacity',
+                 'bounds', 'area', 'pymupdf_rect', 'transformation_method')
+    
+    def __init__(self, xref: int, title: str, vertices, page_number: int,
+                 color: List[float], opacity: float,
+                 bounds: Optional[Tuple[float, float, float, float]] = None,
+                 area: Optional[float] = None,
+                 pymupdf_rect: Optional[Tuple[float, float, float, float]] = None,
+                 transformation_method: str = "default"):
+        """
+        Initialize a space, computing bounds from the vertices if not given.
+        
+        Args:
+            xref: Cross-reference number of the Space object
+            title: Space name
+            vertices: Nx2 array-like of original BlueBeam [x, y] coordinates
+            page_number: Zero-based page number
+            color: [r, g, b] values 0.0-1.0
+            opacity: 0.0-1.0
+            bounds: (min_x, min_y, max_x, max_y)
+            area: Polygon area in square points (None until computed)
+            pymupdf_rect: Transformed (x0, y0, x1, y1) rectangle
+            transformation_method: How pymupdf_rect was derived
+        """
+        self.xref = xref
+        self.title = title
+        self.vertices = np.ascontiguousarray(vertices, dtype=np.float32).reshape(-1, 2)
+        self.page_number = page_number
+        self.color = color
+        self.opacity = opacity
+        
+        if bounds is None:
+            bounds = tuple(np.concatenate((self.vertices.min(axis=0), self.vertices.max(axis=0))).tolist())
+        self.bounds = bounds
+        self.area = area
+        
+        self.pymupdf_rect = pymupdf_rect
+        self.transformation_method = transformation_method
+    
+    def __repr__(self) -> str:
+        return (f"BlueBeamSpace(xref={self.xref}, title={self.title!r}, page_number={self.page_number}, "
+                f"vertices={len(self.vertices)}, bounds={self.bounds})")
+    
+    @property
+    def coordinates(self) -> List[List[float]]:
+        """Vertices as a list of [x, y] pairs."""
+        return _round_coordinates(self.vertices).tolist()
+    
+    def transformed_vertices(self) -> np.ndarray:
+        """
+        Vertices in the same coordinate system as pymupdf_rect.
+        
+        Returns:
+            Nx2 float64 array (the original vertices if no transform was applied)
+        """
+        vertices = self.vertices.astype(np.float64)
+        if self.transformation_method == "y_flip_transformation" and self.pymupdf_rect is not None:
+            # pymupdf_rect y0 = mediabox height - max_y
+            mediabox_height = self.pymupdf_rect[1] + self.bounds[3]
+            vertices[:, 1] = mediabox_height - vertices[:, 1]
+        return vertices
     
     def to_dict(self) -> Dict:
         """Convert to dictionary for JSON serialization."""
-        return asdict(self)
+        min_x, min_y, max_x, max_y = _round_coordinates(self.bounds).tolist()
+        return {
+            'xref': self.xref,
+            'title': self.title,
+            'coordinates': self.coordinates,
+            'page_number': self.page_number,
+            'color': list(self.color),
+            'opacity': self.opacity,
+            'bounds': {'min_x': min_x, 'min_y': min_y, 'max_x': max_x, 'max_y': max_y},
+            'area': self.area,
+            'pymupdf_rect': (tuple(_round_coordinates(self.pymupdf_rect).tolist())
+                             if self.pymupdf_rect is not None else None),
+            'transformation_method': self.transformation_method
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'BlueBeamSpace':
+        """Rebuild a space from the output of to_dict (e.g. a cached JSON result)."""
+        bounds = data['bounds']
+        return cls(
+            xref=data['xref'],
+            title=data['title'],
+            vertices=data['coordinates'],
+            page_number=data['page_number'],
+            color=data['color'],
+            opacity=data['opacity'],
+            bounds=(bounds['min_x'], bounds['min_y'], bounds['max_x'], bounds['max_y']),
+            area=data['area'],
+            pymupdf_rect=tuple(data['pymupdf_rect']) if data.get('pymupdf_rect') is not None else None,
+            transformation_method=data.get('transformation_method', 'default')
+        )
 
 
 class BlueBeamSpaceHandler:
     """Handles detection and manipulation of BlueBeam Spaces in PDFs."""
     
-    def __init__(self, pdf_path: str):
+    def __init__(self, pdf_path: Optional[str] = None, stream: Optional[bytes] = None):
         """
-        Initialize the handler with a PDF file path.
+        Initialize the handler with a PDF file path or in-memory PDF data.
         
         Args:
             pdf_path: Path to the PDF file
+            stream: PDF contents (bytes, bytearray or memoryview), used instead
+                of reading pdf_path from disk
         """
+        if pdf_path is None and stream is None:
+            raise ValueError("Either pdf_path or stream must be provided")
+        
         self.pdf_path = pdf_path
+        self.stream = stream
         self.doc = None
         self.spaces = []
         
     def __enter__(self):
         """Context manager entry."""
-        self.doc = fitz.open(self.pdf_path)
+        self.doc = self._open_document()
         return self
         
     def __exit__(self, exc_type, exc_val, exc_tb):
@@ -58,43 +176,107 @@ class BlueBeamSpaceHandler:
         if self.doc:
             self.doc.close()
     
-    def detect_all_spaces(self) -> List[BlueBeamSpace]:
+    def detect_all_spaces(self, mode: str = "targeted", workers: int = 1) -> List[BlueBeamSpace]:
         """
         Detect all BlueBeam Spaces in the PDF.
         
+        Args:
+            mode: "targeted" only visits the Space objects referenced from the
+                /BSISpaces arrays of the pages (and the document catalog), so
+                cost scales with the number of Spaces. "full_scan" inspects
+                every object in the xref table and also finds Spaces that are
+                not referenced from anywhere.
+            workers: Number of worker processes for "full_scan". Values above
+                1 shard the xref range across a process pool; each worker
+                opens its own document handle. "targeted" detection and
+                documents opened from an in-memory stream stay sequential.
+        
         Returns:
-            List of BlueBeamSpace objects found in the PDF
+            List of BlueBeamSpace objects found in the PDF, ordered by xref
         """
+        if mode not in DETECTION_MODES:
+            raise ValueError(f"Unknown detection mode '{mode}', expected one of {DETECTION_MODES}")
+        
         if not self.doc:
-            self.doc = fitz.open(self.pdf_path)
+            self.doc = self._open_document()
         
-        spaces = []
-        page_space_map = {}
+        # Targeted detection only parses the referenced Spaces and is faster
+        # than starting workers; workers re-open the PDF by path, so in-memory
+        # documents stay sequential as well
+        if mode != "full_scan" or self.pdf_path is None:
+            workers = 1
+        
+        if mode == "full_scan":
+            total = self.doc.xref_length()
+            shards = _split_range(total, min(workers, -(-total // MIN_XREFS_PER_WORKER)))
+        else:
+            total = self.doc.page_count
+            shards = [(0, total)]
+        
+        if len(shards) > 1:
+            spaces = self._detect_spaces_parallel(shards, workers)
+        else:
+            spaces = self._collect_spaces(mode, 0, total)
+        
+        _assign_polygon_areas(spaces)
         
+        # Apply coordinate transformations to all spaces
+        for space in spaces:
+            self._transform_space_coordinates(space)
+        
+        self.spaces = spaces
+        return spaces
+    
+    def _open_document(self) -> fitz.Document:
+        """Open the PDF from the in-memory stream if given, otherwise from pdf_path."""
+        if self.stream is not None:
+            return fitz.open(stream=self.stream, filetype="pdf")
+        return fitz.open(self.pdf_path)
+    
+    def _collect_spaces(self, mode: str, start: int, stop: int,
+                        page_space_map: Optional[Dict[int, int]] = None) -> List[BlueBeamSpace]:
+        """
+        Parse the Space objects belonging to one shard of the document.
+        
+        Args:
+            mode: Detection mode (see detect_all_spaces)
+            start: First page ("targeted") or xref ("full_scan") of the shard
+            stop: End of the shard (exclusive)
+            page_space_map: Space xref -> page mapping of the whole document
+                for "full_scan", computed here if not given
+            
+        Returns:
+            List of untransformed BlueBeamSpace objects ordered by xref
+        """
         # First, map spaces to pages by finding BSISpaces arrays
-        for page_num in range(self.doc.page_count):
-            try:
-                page = self.doc[page_num]
-                page_obj = self.doc.xref_object(page.xref)
-                
-                if page_obj and '/BSISpaces' in page_obj:
-                    # Extract BSISpaces reference
-                    bsi_match = re.search(r'/BSISpaces\s+(\d+)\s+0\s+R', page_obj)
-                    if bsi_match:
-                        bsi_xref = int(bsi_match.group(1))
-                        
-                        # Get the actual BSISpaces array
-                        bsi_obj = self.doc.xref_object(bsi_xref)
-                        if bsi_obj:
-                            space_refs = self._extract_space_references(bsi_obj)
-                            for space_ref in space_refs:
-                                page_space_map[space_ref] = page_num
-            except Exception as e:
-                print(f"Error processing page {page_num}: {e}")
-                continue
+        if mode == "full_scan":
+            if page_space_map is None:
+                page_space_map = self._map_spaces_to_pages()
+            candidate_xrefs = range(max(start, 1), stop)
+        else:
+            page_space_map = self._map_spaces_to_pages(start, stop)
+            candidate_xrefs = set(page_space_map)
+            if start == 0:
+                candidate_xrefs.update(self._get_catalog_space_references())
+            candidate_xrefs = sorted(candidate_xrefs)
+        
+        # Then parse the objects that hold a Space
+        return self._parse_space_xrefs(candidate_xrefs, page_space_map)
+    
+    def _parse_space_xrefs(self, xrefs, page_space_map: Dict[int, int]) -> List[BlueBeamSpace]:
+        """
+        Parse the given objects, skipping any that are not Spaces.
         
-        # Then find all Space objects
-        for xref in range(1, self.doc.xref_length()):
+        Args:
+            xrefs: Iterable of xref numbers in the desired output order
+            page_space_map: Mapping of Space xref to page number
+            
+        Returns:
+            List of untransformed BlueBeamSpace objects
+        """
+        spaces = []
+        
+        for xref in xrefs:
             try:
                 obj_str = self.doc.xref_object(xref)
                 if obj_str and '/Type /Space' in obj_str:
@@ -105,12 +287,181 @@ class BlueBeamSpaceHandler:
                 print(f"Error processing xref {xref}: {e}")
                 continue
         
-        # Apply coordinate transformations to all spaces
-        for space in spaces:
+        return spaces
+    
+    def _detect_spaces_parallel(self, shards: List[Tuple[int, int]], workers: int) -> List[BlueBeamSpace]:
+        """
+        Run a "full_scan" _collect_spaces for each xref shard in a process pool.
+        
+        The Space -> page map is built once here and handed to every worker,
+        so the shards are disjoint and their results only need concatenating.
+        
+        Returns:
+            List of untransformed BlueBeamSpace objects ordered by xref
+        """
+        page_space_map = self._map_spaces_to_pages()
+        spaces = []
+        
+        with ProcessPoolExecutor(max_workers=min(workers, len(shards)), mp_context=POOL_CONTEXT) as executor:
+            futures = [
+                executor.submit(_collect_spaces_worker, self.pdf_path, start, stop, page_space_map)
+                for start, stop in shards
+            ]
+            for future in futures:
+                spaces.extend(future.result())
+        
+        return spaces
+    
+    def compute_page_fingerprints(self) -> List[Optional[Dict[str, str]]]:
+        """
+        Fingerprint every page for incremental re-detection.
+        
+        'page_hash' covers the page dictionary (MediaBox, Rotate and the
+        /BSISpaces reference); 'spaces_hash' covers the /BSISpaces array and
+        the source of every Space object it references.
+        
+        Returns:
+            One fingerprint dictionary per page (None if the page could not be read)
+        """
+        if not self.doc:
+            self.doc = self._open_document()
+        
+        fingerprints = []
+        
+        for page_num in range(self.doc.page_count):
+            try:
+                page_xref = self.doc.page_xref(page_num)
+                spaces_hash = hashlib.blake2b(digest_size=16)
+                for space_ref in self._get_bsi_space_references(page_xref):
+                    spaces_hash.update(f"{space_ref} 0 obj".encode())
+                    spaces_hash.update(self.doc.xref_object(space_ref).encode())
+                
+                fingerprints.append({
+                    'page_hash': hashlib.blake2b(self.doc.xref_object(page_xref).encode(),
+                                                 digest_size=16).hexdigest(),
+                    'spaces_hash': spaces_hash.hexdigest()
+                })
+            except Exception as e:
+                print(f"Error fingerprinting page {page_num}: {e}")
+                fingerprints.append(None)
+        
+        return fingerprints
+    
+    def detect_spaces_incremental(self, previous_spaces: List[BlueBeamSpace],
+                                  previous_fingerprints: List[Optional[Dict[str, str]]],
+                                  fingerprints: Optional[List[Optional[Dict[str, str]]]] = None
+                                  ) -> Tuple[List[BlueBeamSpace], List[int]]:
+        """
+        Re-detect Spaces only on pages whose fingerprints changed.
+        
+        Spaces of unchanged pages are reused from a previous detection of an
+        earlier revision of the same drawing set. Uses the "targeted" mode
+        semantics: only Spaces referenced from /BSISpaces arrays are found.
+        
+        Args:
+            previous_spaces: Spaces detected in the previous revision
+            previous_fingerprints: compute_page_fingerprints() of the previous revision
+            fingerprints: Fingerprints of this document, computed if not given
+            
+        Returns:
+            Tuple of (spaces ordered by xref, sorted list of recomputed page numbers)
+        """
+        if not self.doc:
+            self.doc = self._open_document()
+        
+        if fingerprints is None:
+            fingerprints = self.compute_page_fingerprints()
+        
+        changed_pages = {
+            page_num for page_num, fingerprint in enumerate(fingerprints)
+            if fingerprint is None
+            or page_num >= len(previous_fingerprints)
+            or previous_fingerprints[page_num] != fingerprint
+        }
+        
+        page_space_map = self._map_spaces_to_pages()
+        
+        # Reuse spaces that still belong to an unchanged page
+        reused = [
+            space for space in previous_spaces
+            if space.page_number not in changed_pages
+            and page_space_map.get(space.xref) == space.page_number
+        ]
+        
+        # Parse spaces of changed pages plus any only referenced from the catalog
+        candidate_xrefs = {xref for xref, page_num in page_space_map.items() if page_num in changed_pages}
+        candidate_xrefs.update(
+            xref for xref in self._get_catalog_space_references() if xref not in page_space_map
+        )
+        recomputed = self._parse_space_xrefs(sorted(candidate_xrefs), page_space_map)
+        
+        for space in recomputed:
             self._transform_space_coordinates(space)
         
+        spaces = sorted(reused + recomputed, key=lambda space: space.xref)
+        _assign_polygon_areas(spaces)
         self.spaces = spaces
-        return spaces
+        return spaces, sorted(changed_pages)
+    
+    def _map_spaces_to_pages(self, start: int = 0, stop: Optional[int] = None) -> Dict[int, int]:
+        """
+        Map Space xrefs to the pages whose /BSISpaces arrays reference them.
+        
+        Args:
+            start: First page to inspect
+            stop: End of the page range (exclusive), defaults to the page count
+        
+        Returns:
+            Dictionary of Space xref -> zero-based page number
+        """
+        page_space_map = {}
+        
+        if stop is None:
+            stop = self.doc.page_count
+        
+        for page_num in range(start, stop):
+            try:
+                page_xref = self.doc.page_xref(page_num)
+                for space_ref in self._get_bsi_space_references(page_xref):
+                    page_space_map[space_ref] = page_num
+            except Exception as e:
+                print(f"Error processing page {page_num}: {e}")
+                continue
+        
+        return page_space_map
+    
+    def _get_catalog_space_references(self) -> List[int]:
+        """
+        Get Space references stored in a /BSISpaces array on the document catalog.
+        
+        Returns:
+            List of xref numbers (empty if the catalog has no such array)
+        """
+        try:
+            return self._get_bsi_space_references(self.doc.pdf_catalog())
+        except Exception as e:
+            print(f"Error reading catalog BSISpaces: {e}")
+            return []
+    
+    def _get_bsi_space_references(self, xref: int) -> List[int]:
+        """
+        Resolve the /BSISpaces entry of a dictionary object to Space xrefs.
+        
+        Args:
+            xref: Cross-reference number of a page or catalog dictionary
+            
+        Returns:
+            List of xref numbers referenced by the BSISpaces array
+        """
+        key_type, value = self.doc.xref_get_key(xref, "BSISpaces")
+        
+        if key_type == 'xref':
+            # Indirect array object: "12 0 R"
+            value = self.doc.xref_object(int(value.split()[0]))
+        elif key_type != 'array':
+            return []
+        
+        return self._extract_space_references(value) if value else []
     
     def _extract_space_references(self, bsi_obj_str: str) -> List[int]:
         """
@@ -133,6 +484,10 @@ class BlueBeamSpaceHandler:
         """
         Parse a Space object string into a BlueBeamSpace.
         
+        The object string is scanned once with precompiled patterns and the
+        path is converted by NumPy. Unusual encodings (escaped or hex titles,
+        non-pair paths) fall back to PyMuPDF's own parser via xref_get_key.
+        
         Args:
             xref: Cross-reference number of the object
             obj_str: String representation of the Space object
@@ -142,47 +497,25 @@ class BlueBeamSpaceHandler:
             BlueBeamSpace object or None if parsing fails
         """
         try:
-            # Extract title
-            title_match = re.search(r'/Title\s*\((.*?)\)', obj_str)
-            title = title_match.group(1) if title_match else f"Space_{xref}"
-            
             # Extract path coordinates
-            path_start = obj_str.find('/Path')
-            if path_start == -1:
-                return None
-            
-            # Find the opening bracket for the path array
-            bracket_start = obj_str.find('[', path_start)
-            if bracket_start == -1:
-                return None
-            
-            # Find matching closing bracket using bracket counting
-            bracket_count = 0
-            bracket_end = -1
-            for i in range(bracket_start, len(obj_str)):
-                if obj_str[i] == '[':
-                    bracket_count += 1
-                elif obj_str[i] == ']':
-                    bracket_count -= 1
-                    if bracket_count == 0:
-                        bracket_end = i
-                        break
-            
-            if bracket_end == -1:
+            points = self._extract_path_coordinates(xref, obj_str)
+            if points is None or not len(points):
                 return None
             
-            # Extract and parse coordinates
-            path_str = obj_str[bracket_start + 1:bracket_end]
-            coordinates = self._extract_path_coordinates(path_str)
-            
-            if not coordinates:
-                return None
+            # Extract title
+            title_match = _TITLE_RE.search(obj_str)
+            if title_match and '\\' not in title_match.group(1):
+                title = title_match.group(1)
+            else:
+                title_type, title = self.doc.xref_get_key(xref, "Title")
+                if title_type != 'string':
+                    title = f"Space_{xref}"
             
             # Determine page number
             page_number = page_map.get(xref, 0)
             
             # Extract color (default to blue if not found)
-            color_match = re.search(r'/C\s*\[([\d\.\s]+)\]', obj_str)
+            color_match = _COLOR_RE.search(obj_str)
             color = [0.0, 0.0, 1.0]  # Default blue
             if color_match:
                 color_vals = [float(x) for x in color_match.group(1).split()]
@@ -190,82 +523,68 @@ class BlueBeamSpaceHandler:
                     color = color_vals[:3]
             
             # Extract opacity (default to 0.25)
-            opacity_match = re.search(r'/CA\s*([\d\.]+)', obj_str)
+            opacity_match = _OPACITY_RE.search(obj_str)
             opacity = float(opacity_match.group(1)) if opacity_match else 0.25
             
-            # Calculate bounds and area
-            x_coords = [coord[0] for coord in coordinates]
-            y_coords = [coord[1] for coord in coordinates]
-            bounds = {
-                'min_x': min(x_coords),
-                'min_y': min(y_coords),
-                'max_x': max(x_coords),
-                'max_y': max(y_coords)
-            }
-            
-            # Simple area calculation (bounding rectangle)
-            area = (bounds['max_x'] - bounds['min_x']) * (bounds['max_y'] - bounds['min_y'])
-            
+            # Bounds are computed from the vertex array, area later for all spaces at once
             return BlueBeamSpace(
                 xref=xref,
                 title=title,
-                coordinates=coordinates,
+                vertices=points,
                 page_number=page_number,
                 color=color,
-                opacity=opacity,
-                bounds=bounds,
-                area=area
+                opacity=opacity
             )
             
         except Exception as e:
             print(f"Error parsing space {xref}: {e}")
             return None
     
-    def _extract_path_coordinates(self, path_str: str) -> List[List[float]]:
+    def _extract_path_coordinates(self, xref: int, obj_str: str) -> Optional[np.ndarray]:
         """
-        Extract coordinate pairs from path string.
+        Extract the /Path coordinate pairs of a Space object.
+        
+        BlueBeam writes paths as an array of [x y] pairs. That layout is
+        located with two regex searches and converted by NumPy in one pass.
+        Anything else is re-read with xref_get_key and the first two numbers
+        of every innermost array are used, skipping malformed ones.
         
         Args:
-            path_str: String containing coordinate arrays
+            xref: Cross-reference number of the object
+            obj_str: String representation of the Space object
             
         Returns:
-            List of [x, y] coordinate pairs
+            Nx2 float32 array of [x, y] coordinate pairs, or None without a /Path array
         """
-        coordinates = []
+        path_match = _PATH_START_RE.search(obj_str)
+        if not path_match:
+            return None
         
-        # Remove extra whitespace
-        path_str = re.sub(r'\s+', ' ', path_str.strip())
-        
-        # Find coordinate arrays marked by brackets
-        i = 0
-        while i < len(path_str):
-            if path_str[i] == '[':
-                # Found start of coordinate array
-                bracket_count = 1
-                start = i + 1
-                i += 1
-                
-                # Find matching closing bracket
-                while i < len(path_str) and bracket_count > 0:
-                    if path_str[i] == '[':
-                        bracket_count += 1
-                    elif path_str[i] == ']':
-                        bracket_count -= 1
-                    i += 1
-                
-                if bracket_count == 0:
-                    # Extract coordinates from this array
-                    coord_str = path_str[start:i-1]
-                    try:
-                        coords = [float(x) for x in coord_str.split()]
-                        if len(coords) >= 2:
-                            coordinates.append([coords[0], coords[1]])
-                    except ValueError:
-                        continue
-            else:
-                i += 1
+        # Fast path: the array of pairs ends at the first "] ]"
+        path_end = _PATH_END_RE.search(obj_str, path_match.end())
+        if path_end:
+            inner_str = obj_str[path_match.end():path_end.start() + 1]
+            try:
+                values = np.array(inner_str.translate(_BRACKETS_TO_SPACES).split(), dtype=np.float32)
+                if values.size == 2 * inner_str.count('[') == 2 * inner_str.count(']'):
+                    return values.reshape(-1, 2)
+            except ValueError:
+                pass
         
-        return coordinates
+        path_type, path_str = self.doc.xref_get_key(xref, "Path")
+        if path_type != 'array':
+            return None
+        
+        coordinates = []
+        for coord_str in _INNER_ARRAY_RE.findall(path_str.strip()[1:-1]):
+            try:
+                coords = [float(x) for x in coord_str.split()[:2]]
+                if len(coords) == 2:
+                    coordinates.append(coords)
+            except ValueError:
+                continue
+        
+        return np.array(coordinates, dtype=np.float32).reshape(-1, 2)
     
     def _transform_space_coordinates(self, space: BlueBeamSpace) -> None:
         """
@@ -275,13 +594,7 @@ class BlueBeamSpaceHandler:
         if not self.doc or space.page_number >= self.doc.page_count:
             return
         
-        x_coords = [coord[0] for coord in space.coordinates]
-        y_coords = [coord[1] for coord in space.coordinates]
-        
-        x0 = min(x_coords)
-        y0 = min(y_coords)
-        x1 = max(x_coords)
-        y1 = max(y_coords)
+        x0, y0, x1, y1 = space.bounds
         
         page = self.doc[space.page_number]
         
@@ -356,7 +669,7 @@ class BlueBeamSpaceHandler:
             JSON string of spaces data
         """
         spaces_data = {
-            'pdf_file': str(Path(self.pdf_path).name),
+            'pdf_file': str(Path(self.pdf_path).name) if self.pdf_path else None,
             'page_count': self.doc.page_count if self.doc else 0,
             'total_spaces': len(self.spaces),
             'spaces': [space.to_dict() for space in self.spaces],
@@ -381,6 +694,66 @@ class BlueBeamSpaceHandler:
         return json_str
 
 
+def _round_coordinates(values) -> np.ndarray:
+    """Round float32 coordinate values for JSON output."""
+    return np.round(np.asarray(values, dtype=np.float64), COORDINATE_DECIMALS)
+
+
+def polygon_areas(vertex_arrays: List[np.ndarray]) -> np.ndarray:
+    """
+    Shoelace area of many polygons in one vectorised pass.
+    
+    Args:
+        vertex_arrays: List of Nx2 vertex arrays (N >= 1)
+        
+    Returns:
+        Array with the absolute area of each polygon
+    """
+    if not vertex_arrays:
+        return np.zeros(0)
+    
+    counts = np.fromiter((len(v) for v in vertex_arrays), dtype=np.intp, count=len(vertex_arrays))
+    offsets = np.zeros(len(counts), dtype=np.intp)
+    np.cumsum(counts[:-1], out=offsets[1:])
+    
+    # Shift each polygon to its first vertex to avoid cancellation on large page coordinates
+    points = np.concatenate(vertex_arrays).astype(np.float64)
+    points -= np.repeat(points[offsets], counts, axis=0)
+    
+    # Index of the next vertex, wrapping around within each polygon
+    next_index = np.arange(len(points)) + 1
+    next_index[offsets + counts - 1] = offsets
+    
+    cross = points[:, 0] * points[next_index, 1] - points[next_index, 0] * points[:, 1]
+    return 0.5 * np.abs(np.add.reduceat(cross, offsets))
+
+
+def _assign_polygon_areas(spaces: List[BlueBeamSpace]) -> None:
+    """Set the area of every space from its polygon."""
+    for space, area in zip(spaces, polygon_areas([space.vertices for space in spaces]).tolist()):
+        space.area = area
+
+
+def _split_range(total: int, shards: int) -> List[Tuple[int, int]]:
+    """Split range(total) into at most `shards` contiguous (start, stop) ranges."""
+    shards = max(1, min(shards, total))
+    size, remainder = divmod(total, shards)
+    ranges = []
+    start = 0
+    for i in range(shards):
+        stop = start + size + (1 if i < remainder else 0)
+        ranges.append((start, stop))
+        start = stop
+    return ranges
+
+
+def _collect_spaces_worker(pdf_path: str, start: int, stop: int,
+                           page_space_map: Dict[int, int]) -> List[BlueBeamSpace]:
+    """Process pool entry point: scan one xref shard with its own document handle."""
+    with BlueBeamSpaceHandler(pdf_path) as handler:
+        return handler._collect_spaces("full_scan", start, stop, page_space_map)
+
+
 def main():
     """Command-line interface for testing."""
     import sys
@@ -407,9 +780,9 @@ def main():
                 print(f"  Color: RGB({space.color[0]:.2f}, {space.color[1]:.2f}, {space.color[2]:.2f})")
                 print(f"  Opacity: {space.opacity:.2f}")
                 print(f"  Area: {space.area:.1f} sq points")
-                print(f"  Bounds: ({space.bounds['min_x']:.1f}, {space.bounds['min_y']:.1f}) to "
-                      f"({space.bounds['max_x']:.1f}, {space.bounds['max_y']:.1f})")
-                print(f"  Coordinates: {len(space.coordinates)} points")
+                print(f"  Bounds: ({space.bounds[0]:.1f}, {space.bounds[1]:.1f}) to "
+                      f"({space.bounds[2]:.1f}, {space.bounds[3]:.1f})")
+                print(f"  Coordinates: {len(space.vertices)} points")
                 print("-" * 60)
             
             # Export to JSON
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Directory Listing Cache
+=======================
+
+Folder and PDF listings of directories for the file picker (/api/browse).
+
+A directory is read with os.scandir(), whose entries already know whether
+they are directories (and on Windows their size and modification time), so
+a listing costs one directory read plus at most one stat() per PDF instead
+of an isdir() and a stat() per entry. Listings are kept for a few seconds
+and dropped as soon as the directory's modification time changes, which
+makes paging and re-sorting a network folder with thousands of sheets a
+single stat() per request. Sorted orders are built once per listing.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+LISTED_EXTENSIONS = ('.pdf',)
+
+# Listings are reused for this long while the directory's mtime is unchanged;
+# it bounds how stale the size and date of a PDF rewritten in place can be
+LISTING_TTL_SECONDS = 30
+
+LISTING_CACHE_SIZE = 256
+
+SORT_KEYS = ('name', 'modified', 'size')
+
+
+def scan_directory(directory: str,
+                   extensions: Tuple[str, ...] = LISTED_EXTENSIONS) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    List the folders and matching files of a directory.
+    
+    Args:
+        directory: Directory to list
+        extensions: Lowercase extensions of the files to include
+    
+    Returns:
+        (folders, files): folders have 'name', 'path' and 'type', files also
+        'size' and 'modified' (seconds since the epoch); both unsorted
+    
+    Raises:
+        OSError: If the directory cannot be read
+    """
+    folders = []
+    files = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            try:
+                if entry.is_dir():
+                    folders.append({'name': entry.name, 'path': entry.path, 'type': 'folder'})
+                elif entry.name.lower().endswith(extensions):
+                    stat = entry.stat()
+                    files.append({
+                        'name': entry.name,
+                        'path': entry.path,
+                        'size': stat.st_size,
+                        'modified': stat.st_mtime,
+                        'type': 'file'
+                    })
+            except OSError:
+                # Broken links and entries removed while listing
+                continue
+    return folders, files
+
+
+class DirectoryListing:
+    """One directory's folders and files, with memoized sort orders."""
+    
+    def __init__(self, directory: str, mtime_ns: int, folders: List[Dict[str, Any]],
+                 files: List[Dict[str, Any]]):
+        self.directory = directory
+        self.mtime_ns = mtime_ns
+        self.listed_at = time.time()
+        self.folders = folders
+        self.files = files
+        self._sorted = {}
+        self._lock = threading.Lock()
+    
+    def sorted(self, sort: str = 'name', descending: bool = False) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Folders and files in display order.
+        
+        Folders have no size or date here, so they are always ordered by name
+        (reversed with descending); files by 'name', 'modified' or 'size',
+        ties broken by name. The returned lists are shared and must not be
+        modified.
+        """
+        if sort not in SORT_KEYS:
+            raise ValueError(f"sort must be one of {', '.join(SORT_KEYS)}")
+        with self._lock:
+            if (sort, descending) not in self._sorted:
+                folders = sorted(self.folders, key=lambda folder: folder['name'].lower(), reverse=descending)
+                if sort == 'name':
+                    files = sorted(self.files, key=lambda file: file['name'].lower(), reverse=descending)
+                else:
+                    files = sorted(self.files, key=lambda file: file['name'].lower())
+                    files.sort(key=lambda file: file[sort], reverse=descending)
+                self._sorted[(sort, descending)] = (folders, files)
+            return self._sorted[(sort, descending)]
+
+
+class DirectoryListingCache:
+    """Short-lived listings of recently browsed directories, dropped when the directory changes."""
+    
+    def __init__(self, ttl: float = LISTING_TTL_SECONDS, max_entries: int = LISTING_CACHE_SIZE,
+                 extensions: Tuple[str, ...] = LISTED_EXTENSIONS):
+        """
+        Args:
+            ttl: Seconds a listing is reused while the directory's mtime is unchanged
+            max_entries: Number of directories kept, least recently used dropped first
+            extensions: Lowercase extensions of the files to list
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.extensions = tuple(extensions)
+        self._listings = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+    
+    def listing(self, directory: str) -> DirectoryListing:
+        """
+        The listing of a directory, from the cache when it is still current.
+        
+        Raises:
+            OSError: If the directory cannot be read
+        """
+        directory = os.path.abspath(directory)
+        mtime_ns = os.stat(directory).st_mtime_ns
+        
+        with self._lock:
+            listing = self._listings.get(directory)
+            if listing is not None and listing.mtime_ns == mtime_ns and time.time() - listing.listed_at < self.ttl:
+                self._listings.move_to_end(directory)
+                self._hits += 1
+                return listing
+            self._misses += 1
+        
+        folders, files = scan_directory(directory, self.extensions)
+        listing = DirectoryListing(directory, mtime_ns, folders, files)
+        with self._lock:
+            self._listings[directory] = listing
+            self._listings.move_to_end(directory)
+            while len(self._listings) > self.max_entries:
+                self._listings.popitem(last=False)
+        return listing
+    
+    def invalidate(self, directory: Optional[str] = None):
+        """Drop one directory's listing, or every listing."""
+        with self._lock:
+            if directory is None:
+                self._listings.clear()
+            else:
+                self._listings.pop(os.path.abspath(directory), None)
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'directories': len(self._listings),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'hits': self._hits,
+                'misses': self._misses
+            }
@@ -0,0 +1,992 @@
+#!/usr/bin/env python3
+"""
+Consolidated Equipment PDFs
+===========================
+
+Builds one PDF per equipment folder of an export, combining PNG extractions
+and full pages copied from the original drawing set, sorted by extraction
+type. Equipment types are independent, so they can be built in parallel
+worker processes.
+"""
+
+import fitz  # PyMuPDF
+import numpy as np
+import hashlib
+import json
+import os
+import shutil
+import struct
+import time
+import zlib
+from itertools import repeat
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+
+from process_pools import POOL_CONTEXT
+
+# Extraction type priority order (SCHEDULE first, DRAWING second, DETAIL third, others after)
+EXTRACTION_TYPE_PRIORITY = ['schedule', 'drawing', 'detail', 'table', 'specification', 'other']
+
+# Image resolution MuPDF assumes for PNGs without a pHYs chunk, and the
+# resolution range it accepts from pHYs (values outside fall back to 72)
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+PNG_DEFAULT_DPI = 96
+PNG_MIN_DPI = 72
+PNG_MAX_DPI = 4800
+
+# Bumped when the page keys in consolidated PDF manifests change meaning
+MANIFEST_VERSION = 1
+
+# Recompression profiles for PNG extractions. 'original' inserts the PNG as
+# it is; the others re-encode the pixels (composited onto white) into an
+# image XObject. 'rgb' keeps the source colours (gray stays gray).
+IMAGE_PROFILES = {
+    'original': {'encoding': None, 'colorspace': 'rgb'},
+    'lossless': {'encoding': 'flate', 'colorspace': 'rgb'},
+    'jpeg': {'encoding': 'jpeg', 'colorspace': 'rgb', 'quality': 80},
+    'grayscale': {'encoding': 'flate', 'colorspace': 'gray'},
+    'bilevel': {'encoding': 'flate', 'colorspace': 'bilevel', 'threshold': 160}
+}
+
+
+def get_extraction_type_priority(extraction_type: str) -> int:
+    """Get priority index for sorting (lower = higher priority)"""
+    try:
+        return EXTRACTION_TYPE_PRIORITY.index(extraction_type.lower())
+    except ValueError:
+        # Unknown extraction types go to the end
+        return len(EXTRACTION_TYPE_PRIORITY)
+
+
+def png_page_size(png_data: bytes) -> Optional[Tuple[float, float]]:
+    """
+    Page size in points that PyMuPDF gives a PNG, read from its header chunks.
+    
+    Only IHDR (pixel size) and pHYs (resolution) are read, so nothing is
+    decoded. The result matches fitz.open(png)[0].rect.
+    
+    Args:
+        png_data: Contents of the PNG file
+    
+    Returns:
+        (width, height) in points, or None if the header is not a plain
+        PNG header this function can interpret
+    """
+    if not png_data.startswith(PNG_SIGNATURE) or png_data[12:16] != b'IHDR':
+        return None
+    
+    width, height = struct.unpack_from('>II', png_data, 16)
+    dpi = PNG_DEFAULT_DPI
+    
+    # Walk the chunks before the image data looking for pHYs
+    offset = 33
+    while offset + 8 <= len(png_data):
+        length, chunk_type = struct.unpack_from('>I4s', png_data, offset)
+        if chunk_type == b'IDAT':
+            break
+        if chunk_type == b'pHYs':
+            if length != 9 or offset + 17 > len(png_data):
+                return None
+            x_ppm, y_ppm, unit = struct.unpack_from('>IIB', png_data, offset + 8)
+            if unit != 1 or x_ppm != y_ppm:
+                return None
+            # Pixels per metre to dots per inch, rounded the way MuPDF does
+            dpi = (x_ppm * 254 + 5000) // 10000
+            if not PNG_MIN_DPI <= dpi <= PNG_MAX_DPI:
+                dpi = PNG_MIN_DPI
+            break
+        offset += 12 + length
+    
+    return width * 72 / dpi, height * 72 / dpi
+
+
+def insert_png_page(doc: fitz.Document, png_path: str) -> None:
+    """
+    Append a page showing a PNG, sized like the image.
+    
+    The file is read once; its size comes from the PNG header, and the same
+    buffer is handed to insert_image.
+    """
+    with open(png_path, 'rb') as f:
+        png_data = f.read()
+    
+    size = png_page_size(png_data)
+    if size is None:
+        # Unusual header (e.g. anisotropic resolution): let MuPDF work it out from the buffer
+        with fitz.open(stream=png_data, filetype='png') as img:
+            size = (img[0].rect.width, img[0].rect.height)
+    
+    # Create a new page with the same dimensions as the image
+    page = doc.new_page(width=size[0], height=size[1])
+    page.insert_image(page.rect, stream=png_data, keep_proportion=True)
+
+
+def resolve_image_profile(name: str = 'original', max_dpi: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Build an image recompression profile.
+    
+    Args:
+        name: Profile name from IMAGE_PROFILES, optionally with a parameter
+            after a colon: 'jpeg:60' (JPEG quality 1-100) or 'bilevel:128'
+            (gray threshold 1-255 below which pixels turn black)
+        max_dpi: Downsample images whose resolution on their page exceeds
+            this (None disables downsampling)
+    
+    Returns:
+        Profile dictionary accepted by build_equipment_pdf()
+    
+    Raises:
+        ValueError: If the profile name or a parameter is invalid
+    """
+    base, _, parameter = (name or 'original').partition(':')
+    if base not in IMAGE_PROFILES:
+        raise ValueError(f"Unknown image profile '{base}', expected one of {list(IMAGE_PROFILES)}")
+    
+    profile = dict(IMAGE_PROFILES[base], name=name, max_dpi=float(max_dpi) if max_dpi else None)
+    
+    if parameter:
+        if base == 'jpeg' and parameter.isdigit() and 1 <= int(parameter) <= 100:
+            profile['quality'] = int(parameter)
+        elif base == 'bilevel' and parameter.isdigit() and 1 <= int(parameter) <= 255:
+            profile['threshold'] = int(parameter)
+        else:
+            raise ValueError(f"Invalid parameter '{parameter}' for image profile '{base}'")
+    
+    if profile['max_dpi'] is not None and profile['max_dpi'] <= 0:
+        raise ValueError(f"max_dpi must be positive, got {max_dpi}")
+    
+    return profile
+
+
+def _recompresses(profile: Dict[str, Any]) -> bool:
+    """Whether a profile re-encodes images (rather than inserting the PNGs as they are)."""
+    return profile['encoding'] is not None or profile['max_dpi'] is not None
+
+
+def _flate_image_rows(rows: np.ndarray) -> Tuple[bytes, bool]:
+    """
+    Flate-compress image rows, with or without the PNG 'Up' predictor.
+    
+    Rendered schedules and line art usually compress best unfiltered, while
+    photographic content gains from differencing against the row above, so
+    both are tried and the smaller result is kept.
+    
+    Args:
+        rows: H x row-bytes uint8 array
+    
+    Returns:
+        (data, predicted): Compressed data, and whether it needs
+        /Predictor 12 to decode
+    """
+    plain = zlib.compress(rows.tobytes(), 6)
+    
+    filtered = np.empty((rows.shape[0], rows.shape[1] + 1), dtype=np.uint8)
+    filtered[:, 0] = 2  # PNG filter type 2: difference from the row above
+    filtered[0, 1:] = rows[0]
+    np.subtract(rows[1:], rows[:-1], out=filtered[1:, 1:])
+    predicted = zlib.compress(filtered.tobytes(), 6)
+    
+    return (predicted, True) if len(predicted) < len(plain) else (plain, False)
+
+
+def encode_png_file(png_path: str, profile: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Re-encode a PNG extraction according to a recompression profile.
+    
+    Runs in worker processes, so it only takes and returns plain data. When
+    re-encoding an image that was not downsampled gives no saving, the PNG is
+    kept: 'kept' is True and no image data is returned.
+    
+    Args:
+        png_path: PNG file to encode
+        profile: Profile from resolve_image_profile()
+    
+    Returns:
+        Dictionary with 'page_size' (points), 'bytes_in', 'bytes_out',
+        'seconds', 'kept' and the image XObject fields 'width', 'height',
+        'colorspace', 'bpc', 'filter', 'decode_parms' and 'data'
+    """
+    start_time = time.perf_counter()
+    with open(png_path, 'rb') as f:
+        png_data = f.read()
+    
+    pix = fitz.Pixmap(png_data)
+    page_size = png_page_size(png_data)
+    if page_size is None:
+        with fitz.open(stream=png_data, filetype='png') as img:
+            page_size = (img[0].rect.width, img[0].rect.height)
+    
+    if pix.colorspace is None or pix.colorspace.n not in (1, 3):
+        pix = fitz.Pixmap(fitz.csRGB, pix)
+    
+    # Downsample to the maximum resolution on the page
+    downsampled = False
+    if profile['max_dpi'] is not None:
+        dpi = pix.width * 72 / page_size[0]
+        if dpi > profile['max_dpi']:
+            scale = profile['max_dpi'] / dpi
+            pix = fitz.Pixmap(pix, max(1, round(pix.width * scale)), max(1, round(pix.height * scale)), None)
+            downsampled = True
+    
+    width, height = pix.width, pix.height
+    samples = np.frombuffer(pix.samples, dtype=np.uint8).reshape(height, width, pix.n)
+    
+    # Composite transparent pixels onto white
+    if pix.alpha:
+        alpha = samples[:, :, -1:].astype(np.float32) / 255
+        pixels = samples[:, :, :-1] * alpha + 255 * (1 - alpha)
+        samples = np.rint(pixels).astype(np.uint8)
+    
+    if profile['colorspace'] in ('gray', 'bilevel') and samples.shape[2] == 3:
+        gray = samples @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+        samples = np.rint(gray).astype(np.uint8)[:, :, None]
+    
+    encoded = {
+        'page_size': page_size,
+        'bytes_in': len(png_data),
+        'width': width,
+        'height': height,
+        'colorspace': 'DeviceRGB' if samples.shape[2] == 3 else 'DeviceGray',
+        'bpc': 8,
+        'decode_parms': None,
+        'kept': False
+    }
+    
+    if profile['colorspace'] == 'bilevel':
+        rows = np.packbits(samples[:, :, 0] >= profile['threshold'], axis=1)
+        encoded['bpc'] = 1
+        encoded['filter'] = 'FlateDecode'
+        encoded['data'], predicted = _flate_image_rows(rows)
+        if predicted:
+            encoded['decode_parms'] = f"<< /Predictor 12 /Colors 1 /BitsPerComponent 1 /Columns {width} >>"
+    elif profile['encoding'] == 'jpeg':
+        colorspace = fitz.csRGB if samples.shape[2] == 3 else fitz.csGRAY
+        flat = fitz.Pixmap(colorspace, width, height, samples.tobytes(), False)
+        encoded['filter'] = 'DCTDecode'
+        encoded['data'] = flat.tobytes('jpg', jpg_quality=profile['quality'])
+    else:
+        channels = samples.shape[2]
+        encoded['filter'] = 'FlateDecode'
+        encoded['data'], predicted = _flate_image_rows(samples.reshape(height, width * channels))
+        if predicted:
+            encoded['decode_parms'] = f"<< /Predictor 12 /Colors {channels} /BitsPerComponent 8 /Columns {width} >>"
+    
+    encoded['bytes_out'] = len(encoded['data'])
+    if not downsampled and encoded['bytes_out'] >= encoded['bytes_in']:
+        # No smaller than the PNG (already well compressed): insert that instead
+        encoded = {'page_size': page_size, 'bytes_in': len(png_data), 'bytes_out': len(png_data), 'kept': True}
+    encoded['seconds'] = time.perf_counter() - start_time
+    return encoded
+
+
+def insert_encoded_image_page(doc: fitz.Document, encoded: Dict[str, Any]) -> None:
+    """Append a page showing an image from encode_png_file(), embedding its data unchanged."""
+    xref = doc.get_new_xref()
+    doc.update_object(xref, (
+        f"<< /Type /XObject /Subtype /Image /Width {encoded['width']} /Height {encoded['height']} "
+        f"/ColorSpace /{encoded['colorspace']} /BitsPerComponent {encoded['bpc']} >>"
+    ))
+    doc.update_stream(xref, encoded['data'], compress=False)
+    doc.xref_set_key(xref, 'Filter', f"/{encoded['filter']}")
+    if encoded['decode_parms']:
+        doc.xref_set_key(xref, 'DecodeParms', encoded['decode_parms'])
+    
+    page = doc.new_page(width=encoded['page_size'][0], height=encoded['page_size'][1])
+    page.insert_image(page.rect, xref=xref, keep_proportion=False)
+
+
+class SourcePdf:
+    """Lazily opened original drawing set, shared by every equipment PDF built from it."""
+    
+    def __init__(self, pdf_path: Optional[str]):
+        self.pdf_path = pdf_path
+        self.doc = None
+        self.opens = 0
+    
+    def get(self) -> Optional[fitz.Document]:
+        """Open the PDF on first use; None if it is unavailable."""
+        if self.doc is None:
+            if not self.pdf_path or not os.path.exists(self.pdf_path):
+                return None
+            self.doc = fitz.open(self.pdf_path)
+            self.opens += 1
+            print(f"Opened original PDF: {self.pdf_path}", flush=True)
+        return self.doc
+    
+    def signature(self) -> Optional[str]:
+        """Size and modification time of the PDF, identifying its revision in page keys."""
+        if not self.pdf_path or not os.path.exists(self.pdf_path):
+            return None
+        stat = os.stat(self.pdf_path)
+        return f"{stat.st_size}-{stat.st_mtime_ns}"
+    
+    def close(self) -> None:
+        if self.doc is not None:
+            self.doc.close()
+            self.doc = None
+
+
+def flatten_page(inserted_page: fitz.Page) -> None:
+    """Flatten annotations, widgets and layers of a copied page and clean its content."""
+    # Step 1: Flatten annotations, form fields, and interactive elements
+    # Remove all annotations (flatten them into the page content)
+    annots_to_remove = []
+    for annot in inserted_page.annots():
+        annots_to_remove.append(annot)
+    
+    for annot in annots_to_remove:
+        # Apply redaction to flatten annotation content
+        try:
+            annot.update()  # Ensure annotation is rendered
+        except:
+            pass
+        inserted_page.delete_annot(annot)
+    
+    # Step 2: Remove form fields and widgets
+    for widget in inserted_page.widgets():
+        try:
+            inserted_page.delete_widget(widget)
+        except:
+            pass
+    
+    # Step 3: Clean and optimize page content streams
+    inserted_page.clean_contents()  # Optimize content stream
+    
+    # Step 4: Remove optional content groups (layers) by flattening them
+    try:
+        # Get the page's resources and remove optional content references
+        page_resources = inserted_page.get_contents()
+        if page_resources:
+            # This helps flatten any layer-based content
+            inserted_page.wrap_contents()
+    except Exception as e:
+        print(f"Note: Could not optimize page layers: {str(e)}", flush=True)
+
+
+def optimize_document(doc: fitz.Document) -> None:
+    """Scrub a consolidated PDF and clean the content of every page."""
+    # Document-level optimization and scrubbing
+    print("Applying document-level optimizations...", flush=True)
+    
+    # Step 5: Scrub the document to remove sensitive data and optimize structure
+    # This removes unused objects, optimizes cross-reference table, and removes metadata
+    try:
+        doc.scrub(attached_files=True, clean_pages=True,
+                 remove_links=False, reset_fields=True,
+                 reset_responses=True)
+        print("Document scrubbing completed", flush=True)
+    except Exception as e:
+        print(f"Note: Document scrubbing had issues: {str(e)}", flush=True)
+    
+    # Step 6: Final garbage collection and resource cleanup
+    # Remove any remaining unused fonts, images, and objects
+    try:
+        # Additional cleanup - remove unused resources
+        for page_num in range(len(doc)):
+            page = doc[page_num]
+            # Clean any remaining content issues
+            page.clean_contents()
+        print("Final page content optimization completed", flush=True)
+    except Exception as e:
+        print(f"Note: Final optimization had issues: {str(e)}", flush=True)
+
+
+def save_optimized(doc: fitz.Document, pdf_path: str) -> None:
+    """Save a consolidated PDF with maximum compression."""
+    # Save the consolidated PDF with maximum compression and optimization
+    print("Saving optimized PDF...", flush=True)
+    doc.save(pdf_path,
+            garbage=4,          # Garbage collect unused objects (maximum level)
+            deflate=True,       # Enable deflate compression for streams
+            clean=True,         # Clean and optimize the PDF structure
+            pretty=False,       # Compress structure (no pretty formatting)
+            encryption=fitz.PDF_ENCRYPT_NONE,  # No encryption overhead
+            permissions=-1,     # No permission restrictions
+            expand=False)       # Keep compressed streams compressed
+
+
+def load_extraction_metadata(export_folder_path: str) -> Optional[Dict[str, Any]]:
+    """
+    Read the extraction metadata of an export from its project_data.json.
+    
+    Args:
+        export_folder_path: Path to the export folder
+    
+    Returns:
+        Dictionary with 'original_pdf_path' and 'equipment' (equipment type ->
+        list of extraction entries), or None if there is no project_data.json
+    """
+    project_data_path = os.path.join(export_folder_path, 'project_data.json')
+    if not os.path.exists(project_data_path):
+        return None
+    
+    print(f"Loading extraction metadata from: {project_data_path}", flush=True)
+    with open(project_data_path, 'r') as f:
+        project_data = json.load(f)
+    
+    # Build complete extraction metadata (not just image files)
+    extraction_metadata = {}
+    for equipment_type, extractions in project_data.get('equipment', {}).items():
+        for extraction in extractions:
+            is_full_page = extraction.get('isFullPage', False)
+            
+            # Store metadata by equipment type and ID
+            extraction_metadata.setdefault(equipment_type, []).append({
+                'id': extraction.get('id', 0),
+                'type': extraction.get('extractionType', 'other'),
+                'name': extraction.get('extractionName', 'Unknown'),
+                'is_full_page': is_full_page,
+                'page_number': extraction.get('coordinates', {}).get('page', 1) if is_full_page else None,
+                'image_file': extraction.get('files', {}).get('image') if not is_full_page else None
+            })
+    
+    return {
+        'original_pdf_path': project_data.get('originalPdfPath'),
+        'equipment': extraction_metadata
+    }
+
+
+def list_png_extractions(equipment_dir: str) -> List[Dict[str, Any]]:
+    """Extraction entries for the PNG files of an equipment folder (no metadata available)."""
+    return [
+        {
+            'id': 0,
+            'type': 'other',
+            'name': os.path.splitext(file)[0],
+            'is_full_page': False,
+            'page_number': None,
+            'image_file': file
+        }
+        for file in os.listdir(equipment_dir) if file.lower().endswith('.png')
+    ]
+
+
+def manifest_path(pdf_path: str) -> str:
+    """Path of the manifest written next to a consolidated PDF."""
+    return os.path.splitext(pdf_path)[0] + '.manifest.json'
+
+
+def load_manifest(pdf_path: str) -> Optional[Dict[str, Any]]:
+    """Read the manifest of a consolidated PDF; None if it is missing or unreadable."""
+    try:
+        with open(manifest_path(pdf_path), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _png_path(extraction: Dict[str, Any], equipment_dir: str) -> Optional[str]:
+    """Path of an extraction's PNG, or None if it has none (warnings are printed when it is inserted)."""
+    if extraction['is_full_page'] or not extraction['image_file']:
+        return None
+    png_path = os.path.join(equipment_dir, os.path.basename(extraction['image_file']))
+    return png_path if os.path.exists(png_path) else None
+
+
+def _page_key(extraction: Dict[str, Any], equipment_dir: str, source: SourcePdf) -> Optional[str]:
+    """
+    Key identifying the page an extraction produces.
+    
+    Combines the extraction id and type with the PNG contents, or with the
+    page number and revision of the original PDF for full page extractions.
+    
+    Returns:
+        str: Page key, or None if the extraction cannot produce a page
+    """
+    if extraction['is_full_page']:
+        signature = source.signature()
+        if signature is None:
+            return None
+        return f"page:{extraction['id']}:{extraction['type']}:{extraction['page_number']}:{signature}"
+    
+    png_path = _png_path(extraction, equipment_dir)
+    if png_path is None:
+        return None
+    
+    digest = hashlib.blake2b(digest_size=16)
+    with open(png_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return f"png:{extraction['id']}:{extraction['type']}:{digest.hexdigest()}"
+
+
+def _insert_page_runs(doc: fitz.Document, pages: List[Tuple[fitz.Document, int]]) -> None:
+    """Append (document, page index) pages, copying runs of consecutive pages with one insert_pdf call."""
+    run_start = 0
+    for i in range(1, len(pages) + 1):
+        if i == len(pages) or pages[i][0] is not pages[i - 1][0] or pages[i][1] != pages[i - 1][1] + 1:
+            doc.insert_pdf(pages[run_start][0], from_page=pages[run_start][1], to_page=pages[i - 1][1])
+            run_start = i
+
+
+def _build_pages(doc: fitz.Document, extractions_list: List[Dict[str, Any]], equipment_dir: str,
+                 source: SourcePdf, image_profile: Dict[str, Any],
+                 image_executor: Optional[ProcessPoolExecutor], stats: Dict[str, Any]) -> List[int]:
+    """
+    Append a page for each extraction that can produce one.
+    
+    Returns:
+        Positions in extractions_list of the extractions that were
+        inserted, in page order
+    """
+    recompress = _recompresses(image_profile)
+    inserted = []
+    
+    def insert_source_pages(page_nums):
+        """Copy a run of consecutive 0-based source pages with one insert_pdf call, then flatten them."""
+        first, last = page_nums[0], page_nums[-1]
+        print(f"Inserting full PDF pages {first + 1}-{last + 1} from {source.pdf_path}", flush=True)
+        
+        doc.insert_pdf(source.get(), from_page=first, to_page=last)
+        stats['source_insert_calls'] += 1
+        stats['source_pages_inserted'] += len(page_nums)
+        
+        print(f"Flattening and optimizing pages {first + 1}-{last + 1}...", flush=True)
+        for page_idx in range(len(doc) - len(page_nums), len(doc)):
+            flatten_page(doc[page_idx])
+    
+    if recompress:
+        # Encode every PNG up front (in parallel when given a pool); results arrive in page order
+        png_paths = [path for path in (_png_path(x, equipment_dir) for x in extractions_list) if path]
+        if image_executor is not None:
+            encoded_images = image_executor.map(encode_png_file, png_paths, repeat(image_profile), chunksize=4)
+        else:
+            encoded_images = map(encode_png_file, png_paths, repeat(image_profile))
+    
+    # Consecutive source pages waiting to be inserted with one insert_pdf call
+    pending_run = []
+    
+    for position, extraction in enumerate(extractions_list):
+        print(f"Adding page: {extraction['name']} ({extraction['type']})", flush=True)
+        
+        if extraction['is_full_page']:
+            # Handle full page extraction
+            source_doc = source.get()
+            if source_doc is None:
+                print(f"⚠️  Original PDF not found for full page extraction: {extraction['name']}", flush=True)
+                continue
+            
+            page_num = extraction['page_number'] - 1  # Convert to 0-based indexing
+            
+            if page_num < 0 or page_num >= len(source_doc):
+                print(f"❌ Invalid page number {extraction['page_number']} for {extraction['name']}", flush=True)
+                continue
+            
+            # Extend the run if this page follows the previous one, otherwise start a new run
+            if pending_run and page_num != pending_run[-1] + 1:
+                insert_source_pages(pending_run)
+                pending_run = []
+            pending_run.append(page_num)
+            inserted.append(position)
+        
+        else:
+            # Keep page order: insert any pending source pages before the image
+            if pending_run:
+                insert_source_pages(pending_run)
+                pending_run = []
+            
+            # Handle PNG-based extraction
+            if not extraction['image_file']:
+                print(f"⚠️  No image file found for extraction: {extraction['name']}", flush=True)
+                continue
+            
+            png_path = os.path.join(equipment_dir, os.path.basename(extraction['image_file']))
+            
+            if not os.path.exists(png_path):
+                print(f"⚠️  PNG file not found: {png_path}", flush=True)
+                continue
+            
+            stats['images'] += 1
+            if recompress:
+                encoded = next(encoded_images)
+                if encoded['kept']:
+                    insert_png_page(doc, png_path)
+                    stats['images_kept'] += 1
+                else:
+                    insert_encoded_image_page(doc, encoded)
+                stats['image_bytes_in'] += encoded['bytes_in']
+                stats['image_bytes_out'] += encoded['bytes_out']
+                stats['image_encode_seconds'] += encoded['seconds']
+            else:
+                stats['image_bytes_in'] += os.path.getsize(png_path)
+                insert_png_page(doc, png_path)
+            inserted.append(position)
+    
+    if pending_run:
+        insert_source_pages(pending_run)
+    
+    return inserted
+
+
+def build_equipment_pdf(equipment_type: str, extractions_list: List[Dict[str, Any]],
+                        equipment_dir: str, source: SourcePdf,
+                        image_profile: Optional[Dict[str, Any]] = None,
+                        image_executor: Optional[ProcessPoolExecutor] = None,
+                        previous_pdf_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Build the consolidated PDF of one equipment type.
+    
+    A manifest of page keys (see _page_key) is written next to the PDF. When
+    previous_pdf_path points at an earlier build with a compatible manifest,
+    only pages whose key is new are built; the rest are copied from the
+    earlier PDF:
+    
+    - 'unchanged': same pages in the same order, the file is copied
+    - 'append': earlier pages kept in order with new ones after them, the
+      new pages are added to a copy of the file with an incremental save
+    - 'reassemble': pages removed or reordered, the PDF is reassembled from
+      earlier and new pages
+    - 'full': no usable earlier build (or a different image profile), every
+      page is built
+    
+    Args:
+        equipment_type: Equipment type (also the folder and file name prefix)
+        extractions_list: Extraction entries from load_extraction_metadata()
+            or list_png_extractions()
+        equipment_dir: Equipment folder the PDF and PNG files live in
+        source: Original drawing set for full page extractions
+        image_profile: Recompression profile from resolve_image_profile()
+            (default: insert the PNGs as they are)
+        image_executor: Optional process pool the PNGs are encoded in
+        previous_pdf_path: Consolidated PDF of the same equipment type from
+            an earlier export
+    
+    Returns:
+        Dictionary with 'equipment_type', 'success', 'pdf_path', 'mode',
+        'pages', 'pages_reused', 'pages_built', 'size_bytes', 'seconds',
+        'source_pages_inserted', 'source_insert_calls', 'images',
+        'image_bytes_in', 'image_bytes_out' (None when the PNGs are inserted
+        as they are), 'images_kept' (PNGs inserted as they are because
+        re-encoding did not make them smaller), 'image_encode_seconds' and
+        'error'
+    """
+    image_profile = image_profile or resolve_image_profile()
+    start_time = time.perf_counter()
+    consolidated_pdf_path = os.path.join(equipment_dir, f"{equipment_type}_extractions.pdf")
+    stats = {
+        'equipment_type': equipment_type,
+        'success': False,
+        'pdf_path': consolidated_pdf_path,
+        'mode': 'full',
+        'pages': 0,
+        'pages_reused': 0,
+        'pages_built': 0,
+        'size_bytes': 0,
+        'seconds': 0.0,
+        'source_pages_inserted': 0,
+        'source_insert_calls': 0,
+        'images': 0,
+        'image_bytes_in': 0,
+        'image_bytes_out': 0 if _recompresses(image_profile) else None,
+        'images_kept': 0,
+        'image_encode_seconds': 0.0,
+        'error': None
+    }
+    
+    # Sort extractions by type priority, then by ID for consistency
+    extractions_list = sorted(extractions_list, key=lambda x: (get_extraction_type_priority(x['type']), x['id']))
+    
+    print(f"Creating consolidated PDF for {equipment_type} with {len(extractions_list)} extractions:", flush=True)
+    for extraction in extractions_list:
+        content_type = "Full Page" if extraction['is_full_page'] else "PNG Extraction"
+        print(f"  - {extraction['type'].upper()}: {extraction['name']} ({content_type})", flush=True)
+    
+    try:
+        keys = [_page_key(extraction, equipment_dir, source) for extraction in extractions_list]
+        
+        # Map page keys to the pages of the previous build, if it can be reused
+        previous_pages = {}
+        previous = load_manifest(previous_pdf_path) if previous_pdf_path and os.path.exists(previous_pdf_path) else None
+        if (previous and previous.get('version') == MANIFEST_VERSION
+                and previous.get('image_profile') == image_profile
+                and len(set(previous['entries'])) == len(previous['entries'])):
+            with fitz.open(previous_pdf_path) as previous_doc:
+                if len(previous_doc) == len(previous['entries']):
+                    previous_pages = {key: page for page, key in enumerate(previous['entries'])}
+        
+        plan = [previous_pages.get(key) if key else None for key in keys]
+        new_positions = [position for position, page in enumerate(plan) if page is None]
+        reused = [(position, page) for position, page in enumerate(plan) if page is not None]
+        
+        # Build the new pages
+        fresh = fitz.open()
+        inserted = _build_pages(fresh, [extractions_list[p] for p in new_positions], equipment_dir,
+                                source, image_profile, image_executor, stats)
+        fresh_pages = {new_positions[j]: page for page, j in enumerate(inserted)}
+        if len(fresh):
+            optimize_document(fresh)
+        
+        order = sorted([position for position, _ in reused] + list(fresh_pages))
+        kept_in_order = [page for _, page in reused] == list(range(len(previous_pages)))
+        
+        if not reused:
+            stats['mode'] = 'full'
+        elif kept_in_order and not fresh_pages:
+            stats['mode'] = 'unchanged'
+        elif kept_in_order and max(p for p, _ in reused) < min(fresh_pages):
+            stats['mode'] = 'append'
+        else:
+            stats['mode'] = 'reassemble'
+        
+        if stats['mode'] == 'full':
+            save_optimized(fresh, consolidated_pdf_path)
+        elif stats['mode'] == 'unchanged':
+            shutil.copyfile(previous_pdf_path, consolidated_pdf_path)
+        elif stats['mode'] == 'append':
+            try:
+                shutil.copyfile(previous_pdf_path, consolidated_pdf_path)
+                with fitz.open(consolidated_pdf_path) as doc:
+                    doc.insert_pdf(fresh)
+                    doc.save(consolidated_pdf_path, incremental=True, encryption=fitz.PDF_ENCRYPT_KEEP)
+            except Exception as append_error:
+                # Drop the half-written copy and rebuild the file from the earlier pages instead
+                print(f"⚠️  Incremental save failed for {equipment_type}, reassembling: {append_error}",
+                      flush=True)
+                if os.path.exists(consolidated_pdf_path):
+                    os.remove(consolidated_pdf_path)
+                stats['mode'] = 'reassemble'
+        
+        if stats['mode'] == 'reassemble':
+            with fitz.open(previous_pdf_path) as previous_doc:
+                doc = fitz.open()
+                _insert_page_runs(doc, [
+                    (previous_doc, plan[position]) if plan[position] is not None else (fresh, fresh_pages[position])
+                    for position in order
+                ])
+                save_optimized(doc, consolidated_pdf_path)
+                doc.close()
+        
+        stats['pages'] = len(order)
+        stats['pages_reused'] = len(reused)
+        stats['pages_built'] = len(fresh_pages)
+        fresh.close()
+        
+        with open(manifest_path(consolidated_pdf_path), 'w') as f:
+            json.dump({
+                'version': MANIFEST_VERSION,
+                'image_profile': image_profile,
+                'entries': [keys[position] for position in order]
+            }, f, indent=2)
+        
+        stats['size_bytes'] = os.path.getsize(consolidated_pdf_path)
+        stats['success'] = True
+        print(f"✅ Consolidated PDF created ({stats['mode']}, {stats['pages_reused']} page(s) reused): "
+              f"{consolidated_pdf_path}", flush=True)
+    
+    except Exception as pdf_error:
+        stats['error'] = str(pdf_error)
+        print(f"❌ Failed to create consolidated PDF for {equipment_type}: {str(pdf_error)}", flush=True)
+    
+    stats['seconds'] = time.perf_counter() - start_time
+    return stats
+
+
+def _build_counting_opens(equipment_type: str, extractions_list: List[Dict[str, Any]],
+                          equipment_dir: str, source: SourcePdf, image_profile: Dict[str, Any],
+                          image_executor: Optional[ProcessPoolExecutor] = None,
+                          previous_pdf_path: Optional[str] = None) -> Dict[str, Any]:
+    """build_equipment_pdf(), also reporting whether this build had to open the original PDF."""
+    opens_before = source.opens
+    stats = build_equipment_pdf(equipment_type, extractions_list, equipment_dir, source,
+                                image_profile, image_executor, previous_pdf_path)
+    stats['source_opens'] = source.opens - opens_before
+    return stats
+
+
+# Original PDF handles of a worker process, reused by every job it runs
+_worker_sources: Dict[Optional[str], SourcePdf] = {}
+
+
+def _build_equipment_pdf_worker(equipment_type: str, extractions_list: List[Dict[str, Any]],
+                                equipment_dir: str, original_pdf_path: Optional[str],
+                                image_profile: Dict[str, Any],
+                                previous_pdf_path: Optional[str] = None) -> Dict[str, Any]:
+    """Process pool entry point: build one equipment PDF, opening the original PDF at most once per worker."""
+    source = _worker_sources.get(original_pdf_path)
+    if source is None:
+        source = _worker_sources[original_pdf_path] = SourcePdf(original_pdf_path)
+    return _build_counting_opens(equipment_type, extractions_list, equipment_dir, source, image_profile,
+                                 previous_pdf_path=previous_pdf_path)
+
+
+def create_consolidated_equipment_pdfs(export_folder_path: str, workers: int = 1,
+                                       image_profile: Optional[Dict[str, Any]] = None,
+                                       previous_export_path: Optional[str] = None,
+                                       progress: Optional[Callable[[int, int, str], None]] = None,
+                                       should_cancel: Optional[Callable[[], bool]] = None) -> Dict[str, Any]:
+    """
+    Create consolidated PDF files for each equipment type folder with extraction type sorting.
+    
+    Args:
+        export_folder_path: Path to the export folder containing equipment directories
+        workers: Number of worker processes. Values above 1 build the
+            equipment PDFs in parallel, each worker opening the original PDF
+            at most once. When there are fewer equipment types than workers
+            and images are recompressed, the PDFs are built one at a time and
+            their images are encoded in parallel instead.
+        image_profile: Recompression profile from resolve_image_profile()
+            (default: insert the PNGs as they are)
+        previous_export_path: Earlier export folder of the same drawing set.
+            Pages of its consolidated PDFs that are still current are reused
+            instead of being rebuilt (see build_equipment_pdf)
+        progress: Optional callback receiving (PDFs finished, total PDFs,
+            equipment type) after each equipment PDF
+        should_cancel: Optional callback checked before each equipment PDF;
+            when it returns True the remaining PDFs are not built and the
+            result has 'cancelled' set
+    
+    Returns:
+        Dictionary with 'pdfs_created', 'source_opens' (times the original
+        PDF was opened), 'source_pages_inserted', 'source_insert_calls'
+        (insert_pdf calls for runs of consecutive pages), 'pages_reused',
+        'pages_built', 'image_profile',
+        'parallelism' ('equipment', 'images' or None), 'workers', 'seconds',
+        'cancelled' and 'equipment' (per-type stats from build_equipment_pdf)
+    """
+    start_time = time.perf_counter()
+    image_profile = image_profile or resolve_image_profile()
+    result = {
+        'pdfs_created': 0,
+        'source_opens': 0,
+        'source_pages_inserted': 0,
+        'source_insert_calls': 0,
+        'pages_reused': 0,
+        'pages_built': 0,
+        'image_profile': image_profile['name'],
+        'parallelism': None,
+        'workers': 1,
+        'seconds': 0.0,
+        'cancelled': False,
+        'equipment': []
+    }
+    
+    try:
+        # Look for project_data.json to get extraction metadata
+        metadata = load_extraction_metadata(export_folder_path)
+        
+        jobs = []
+        if metadata is not None:
+            # Use metadata-driven approach for equipment types with extractions
+            original_pdf_path = metadata['original_pdf_path']
+            for equipment_type, extractions_list in metadata['equipment'].items():
+                equipment_dir = os.path.join(export_folder_path, equipment_type)
+                
+                # Skip if equipment directory doesn't exist
+                if not os.path.isdir(equipment_dir):
+                    continue
+                
+                if not extractions_list:
+                    print(f"No extractions found for {equipment_type}, skipping", flush=True)
+                    continue
+                
+                jobs.append((equipment_type, extractions_list, equipment_dir))
+        else:
+            # Fallback to old PNG-only approach for backwards compatibility
+            print("No project_data.json found, using PNG-only processing", flush=True)
+            original_pdf_path = None
+            
+            for item in os.listdir(export_folder_path):
+                equipment_dir = os.path.join(export_folder_path, item)
+                
+                # Skip files, only process directories (equipment folders)
+                if not os.path.isdir(equipment_dir):
+                    continue
+                
+                png_files = list_png_extractions(equipment_dir)
+                if not png_files:
+                    print(f"No PNG files found in {item}, skipping", flush=True)
+                    continue
+                
+                jobs.append((item, png_files, equipment_dir))
+        
+        # Consolidated PDF of each equipment type in the previous export, if any
+        previous_pdf_paths = {}
+        if previous_export_path:
+            for equipment_type, _, _ in jobs:
+                previous_pdf_path = os.path.join(previous_export_path, equipment_type,
+                                                 f"{equipment_type}_extractions.pdf")
+                if os.path.exists(previous_pdf_path):
+                    previous_pdf_paths[equipment_type] = previous_pdf_path
+        
+        # Parallelise across equipment types, or across the images of each
+        # PDF when there are too few types to keep the workers busy
+        if workers > 1 and _recompresses(image_profile) and len(jobs) < workers:
+            result['parallelism'] = 'images'
+        elif workers > 1 and len(jobs) > 1:
+            result['parallelism'] = 'equipment'
+            workers = min(workers, len(jobs))
+        else:
+            workers = 1
+        result['workers'] = workers
+        
+        if result['parallelism'] == 'equipment':
+            print(f"Building {len(jobs)} equipment PDFs with {workers} worker processes", flush=True)
+            with ProcessPoolExecutor(max_workers=workers, mp_context=POOL_CONTEXT) as executor:
+                futures = [
+                    executor.submit(_build_equipment_pdf_worker, equipment_type, extractions_list,
+                                    equipment_dir, original_pdf_path, image_profile,
+                                    previous_pdf_paths.get(equipment_type))
+                    for equipment_type, extractions_list, equipment_dir in jobs
+                ]
+                equipment_stats = []
+                for future, (equipment_type, _, _) in zip(futures, jobs):
+                    if should_cancel and should_cancel():
+                        # Drop the PDFs no worker has started; running ones finish
+                        for pending in futures:
+                            pending.cancel()
+                        result['cancelled'] = True
+                        break
+                    equipment_stats.append(future.result())
+                    if progress:
+                        progress(len(equipment_stats), len(jobs), equipment_type)
+        else:
+            source = SourcePdf(original_pdf_path)
+            image_executor = None
+            try:
+                if result['parallelism'] == 'images':
+                    print(f"Encoding images with {workers} worker processes", flush=True)
+                    image_executor = ProcessPoolExecutor(max_workers=workers, mp_context=POOL_CONTEXT)
+                
+                equipment_stats = []
+                for equipment_type, extractions_list, equipment_dir in jobs:
+                    if should_cancel and should_cancel():
+                        result['cancelled'] = True
+                        break
+                    print(f"Processing equipment directory: {equipment_type}", flush=True)
+                    equipment_stats.append(_build_counting_opens(equipment_type, extractions_list,
+                                                                 equipment_dir, source, image_profile,
+                                                                 image_executor,
+                                                                 previous_pdf_paths.get(equipment_type)))
+                    if progress:
+                        progress(len(equipment_stats), len(jobs), equipment_type)
+            finally:
+                source.close()
+                if image_executor is not None:
+                    image_executor.shutdown()
+        
+        for stats in equipment_stats:
+            result['pdfs_created'] += stats['success']
+            result['source_opens'] += stats['source_opens']
+            result['source_pages_inserted'] += stats['source_pages_inserted']
+            result['source_insert_calls'] += stats['source_insert_calls']
+            result['pages_reused'] += stats['pages_reused']
+            result['pages_built'] += stats['pages_built']
+            images = ''
+            if stats['image_bytes_out'] is not None:
+                images = (f", images {stats['image_bytes_in'] / 1024:.0f} KB -> "
+                          f"{stats['image_bytes_out'] / 1024:.0f} KB ({stats['images_kept']} kept)")
+            print(f"  {stats['equipment_type']}: {stats['pages']} pages ({stats['mode']}, "
+                  f"{stats['pages_reused']} reused), "
+                  f"{stats['size_bytes'] / 1024:.0f} KB in {stats['seconds']:.2f}s{images}", flush=True)
+        result['equipment'] = equipment_stats
+        if result['cancelled']:
+            print(f"⚠️  Cancelled after {len(equipment_stats)} of {len(jobs)} equipment PDFs", flush=True)
+    
+    except Exception as e:
+        print(f"❌ Error in consolidated PDF creation: {str(e)}", flush=True)
+    
+    result['seconds'] = time.perf_counter() - start_time
+    print(f"Original PDF opened {result['source_opens']} time(s), {result['source_pages_inserted']} page(s) "
+          f"copied in {result['source_insert_calls']} insert_pdf call(s); "
+          f"{result['pdfs_created']} PDF(s) in {result['seconds']:.2f}s", flush=True)
+    return result
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+File Hashing Helpers
+====================
+
+SHA-256 hashing tuned for large drawing sets on slow (network) storage, and
+a persistent stat-keyed index that skips re-hashing files that have not
+changed since they were last hashed.
+"""
+
+import hashlib
+import mmap
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple, Any
+
+# 1MB reads keep the number of round trips low on SMB/NFS mounts
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(file_path: str, chunk_size: int = HASH_CHUNK_SIZE, use_mmap: bool = False) -> str:
+    """
+    Compute the SHA-256 of a file.
+    
+    Args:
+        file_path: Path to the file
+        chunk_size: Size of each read when not using mmap
+        use_mmap: Hash a memory map of the file instead of reading it in
+            chunks. Fastest on local disks; avoid on network mounts.
+    
+    Returns:
+        str: Hex digest of the file contents
+    """
+    sha256_hash = hashlib.sha256()
+    
+    with open(file_path, 'rb') as f:
+        if use_mmap and os.fstat(f.fileno()).st_size > 0:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                sha256_hash.update(mapped)
+        else:
+            buffer = bytearray(chunk_size)
+            view = memoryview(buffer)
+            while True:
+                read = f.readinto(buffer)
+                if not read:
+                    break
+                sha256_hash.update(view[:read])
+    
+    return sha256_hash.hexdigest()
+
+
+class FileHashIndex:
+    """Persistent (path, size, mtime, inode) -> SHA-256 index."""
+    
+    def __init__(self, db_path: str, use_mmap: bool = False):
+        """
+        Initialize the index, creating the database if needed.
+        
+        Args:
+            db_path: Path to the SQLite database file
+            use_mmap: Passed to hash_file when a file has to be hashed
+        """
+        self.db_path = db_path
+        self.use_mmap = use_mmap
+        self.hits = 0
+        self.misses = 0
+        self._memory: Dict[str, Tuple[Tuple[int, int, int], str]] = {}
+        self._lock = threading.Lock()
+        
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS file_hashes (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    inode INTEGER NOT NULL,
+                    file_hash TEXT NOT NULL,
+                    hashed_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_file_hashes_file_hash ON file_hashes(file_hash)')
+    
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection for one operation; this keeps the index safe across threads."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+    
+    def get_hash(self, file_path: str) -> str:
+        """
+        Return the SHA-256 of a file, hashing it only if it changed.
+        
+        A file is considered unchanged while its size, modification time and
+        inode match the values recorded when it was hashed, so a cache hit
+        costs a single stat() call instead of reading the whole file.
+        
+        Args:
+            file_path: Path to the file
+        
+        Returns:
+            str: Hex digest of the file contents
+        """
+        path = os.path.realpath(file_path)
+        stat = os.stat(path)
+        signature = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+        
+        with self._lock:
+            cached = self._memory.get(path)
+        if cached and cached[0] == signature:
+            self.hits += 1
+            return cached[1]
+        
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT size, mtime_ns, inode, file_hash FROM file_hashes WHERE path = ?', (path,)
+            ).fetchone()
+        
+        if row and tuple(row[:3]) == signature:
+            file_hash = row[3]
+            self.hits += 1
+        else:
+            file_hash = hash_file(path, use_mmap=self.use_mmap)
+            self.misses += 1
+            with self._connect() as conn:
+                conn.execute('''
+                    INSERT OR REPLACE INTO file_hashes (path, size, mtime_ns, inode, file_hash, hashed_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (path, *signature, file_hash, time.time()))
+        
+        with self._lock:
+            self._memory[path] = (signature, file_hash)
+        
+        return file_hash
+    
+    def get_recorded_hash(self, file_path: str) -> Optional[str]:
+        """
+        Return the hash last recorded for a path without checking whether it is current.
+        
+        Used to find the previous revision of a drawing set that was replaced in place.
+        """
+        path = os.path.realpath(file_path)
+        with self._connect() as conn:
+            row = conn.execute('SELECT file_hash FROM file_hashes WHERE path = ?', (path,)).fetchone()
+        return row[0] if row else None
+    
+    def find_path(self, file_hash: str) -> Optional[str]:
+        """
+        Return a path that currently holds the file with this hash.
+        
+        Only paths whose size, modification time and inode still match the
+        values recorded when they were hashed are returned.
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT path, size, mtime_ns, inode FROM file_hashes WHERE file_hash = ? ORDER BY hashed_at DESC',
+                (file_hash,)
+            ).fetchall()
+        
+        for path, size, mtime_ns, inode in rows:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if (stat.st_size, stat.st_mtime_ns, stat.st_ino) == (size, mtime_ns, inode):
+                return path
+        return None
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get index statistics."""
+        with self._connect() as conn:
+            count = conn.execute('SELECT COUNT(*) FROM file_hashes').fetchone()[0]
+        
+        return {
+            'indexed_files': count,
+            'hits': self.hits,
+            'misses': self.misses
+        }
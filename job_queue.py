@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+Background Job Queue
+====================
+
+Runs long operations (export extraction, consolidated PDF generation) on a
+thread pool outside the request that started them. Each job is split into
+named stages with their own progress and timings, can be cancelled, and is
+recorded in SQLite so its state survives a server restart: jobs that were
+still queued or running when the server stopped are reported as
+'interrupted' instead of disappearing.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# Job states; the last four are final
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_COMPLETE = 'complete'
+JOB_FAILED = 'failed'
+JOB_CANCELLED = 'cancelled'
+JOB_INTERRUPTED = 'interrupted'
+FINAL_STATES = (JOB_COMPLETE, JOB_FAILED, JOB_CANCELLED, JOB_INTERRUPTED)
+
+# Minimum time between progress writes to the database (status changes are always written)
+PROGRESS_WRITE_INTERVAL = 0.5
+
+
+class JobCancelled(Exception):
+    """Raised inside a job once cancellation has been requested."""
+
+
+class JobContext:
+    """Handle a running job uses to report stage progress and check for cancellation."""
+    
+    def __init__(self, queue: 'JobQueue', job_id: str):
+        self.queue = queue
+        self.job_id = job_id
+    
+    @contextmanager
+    def stage(self, name: str) -> Iterator['JobContext']:
+        """
+        Run one stage of the job, recording its start, end and outcome.
+        
+        Raises:
+            JobCancelled: If the job was cancelled before the stage started
+        """
+        self.check_cancelled()
+        self.queue._update_stage(self.job_id, name, status=JOB_RUNNING, progress=0.0,
+                                 started_at=time.time(), job_status=JOB_RUNNING)
+        start = time.perf_counter()
+        try:
+            yield self
+        except JobCancelled:
+            self.queue._update_stage(self.job_id, name, status=JOB_CANCELLED, finished_at=time.time(),
+                                     seconds=time.perf_counter() - start)
+            raise
+        except Exception:
+            self.queue._update_stage(self.job_id, name, status=JOB_FAILED, finished_at=time.time(),
+                                     seconds=time.perf_counter() - start)
+            raise
+        self.queue._update_stage(self.job_id, name, status=JOB_COMPLETE, progress=1.0, finished_at=time.time(),
+                                 seconds=time.perf_counter() - start)
+    
+    def progress(self, stage: str, fraction: Optional[float] = None, **detail: Any) -> None:
+        """
+        Report progress of a stage.
+        
+        Args:
+            stage: Stage name
+            fraction: Completed fraction between 0 and 1, if known
+            **detail: Extra values shown with the stage (counts, current item)
+        """
+        fields: Dict[str, Any] = {'detail': detail}
+        if fraction is not None:
+            fields['progress'] = round(min(max(fraction, 0.0), 1.0), 4)
+        self.queue._update_stage(self.job_id, stage, throttle=True, **fields)
+    
+    def skip(self, stage: str) -> None:
+        """Mark a stage that does not apply to this job as skipped."""
+        self.queue._update_stage(self.job_id, stage, status='skipped')
+    
+    def cancelled(self) -> bool:
+        return self.queue.cancel_requested(self.job_id)
+    
+    def check_cancelled(self) -> None:
+        """Raise JobCancelled if cancellation has been requested."""
+        if self.cancelled():
+            raise JobCancelled(f"Job {self.job_id} was cancelled")
+
+
+class JobQueue:
+    """Thread pool of background jobs with SQLite-persisted state."""
+    
+    def __init__(self, db_path: str, workers: int = 2, max_age_seconds: Optional[float] = 7 * 24 * 3600):
+        """
+        Initialize the queue, creating the database if needed.
+        
+        Finished jobs older than max_age_seconds are removed. Jobs left
+        queued or running by a previous server process are only marked
+        'interrupted' by recover_interrupted(): worker processes of a
+        process pool import the server module too, while its jobs run.
+        
+        Args:
+            db_path: Path to the SQLite database file
+            workers: Number of jobs run at the same time
+            max_age_seconds: Finished jobs older than this are deleted on
+                startup (None keeps them)
+        """
+        self.db_path = db_path
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._futures: Dict[str, Future] = {}
+        self._cancel_requested = set()
+        self._last_write: Dict[str, float] = {}
+        
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    stages TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs(created_at)')
+            
+            if max_age_seconds is not None:
+                conn.execute('DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?',
+                             (time.time() - max_age_seconds,))
+    
+    def recover_interrupted(self) -> int:
+        """
+        Mark the jobs a previous server process left queued or running as 'interrupted'.
+        
+        Call once when the server starts, before any job is submitted.
+        
+        Returns:
+            int: Number of jobs marked
+        """
+        with self._connect() as conn:
+            interrupted = conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE status IN (?, ?)",
+                (JOB_INTERRUPTED, 'Server stopped before the job finished', time.time(), JOB_QUEUED, JOB_RUNNING)
+            ).rowcount
+        if interrupted:
+            print(f"⚠️  {interrupted} job(s) were interrupted by a server restart", flush=True)
+        return interrupted
+    
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection for one operation; this keeps the queue safe across threads."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+    
+    def _write(self, job: Dict[str, Any]) -> None:
+        with self._connect() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO jobs (job_id, kind, status, params, stages, result, error,
+                                             cancel_requested, created_at, started_at, finished_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (job['job_id'], job['kind'], job['status'], json.dumps(job['params']), json.dumps(job['stages']),
+                  json.dumps(job['result']) if job['result'] is not None else None, job['error'],
+                  int(job['cancel_requested']), job['created_at'], job['started_at'], job['finished_at']))
+        self._last_write[job['job_id']] = time.monotonic()
+    
+    @staticmethod
+    def _from_row(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job['params'] = json.loads(job['params'])
+        job['stages'] = json.loads(job['stages'])
+        job['result'] = json.loads(job['result']) if job['result'] is not None else None
+        job['cancel_requested'] = bool(job['cancel_requested'])
+        return job
+    
+    def create(self, kind: str, params: Dict[str, Any], stages: List[str]) -> JobContext:
+        """
+        Record a new queued job.
+        
+        Args:
+            kind: Job type, e.g. 'export'
+            params: JSON-serializable parameters shown with the job
+            stages: Names of the job's stages, in order
+        
+        Returns:
+            JobContext: Handle for running stages in the calling thread
+            before the job is handed to the pool with start()
+        """
+        job = {
+            'job_id': uuid.uuid4().hex,
+            'kind': kind,
+            'status': JOB_QUEUED,
+            'params': params,
+            'stages': [{'name': name, 'status': 'pending', 'progress': 0.0, 'detail': {},
+                        'started_at': None, 'finished_at': None, 'seconds': None} for name in stages],
+            'result': None,
+            'error': None,
+            'cancel_requested': False,
+            'created_at': time.time(),
+            'started_at': None,
+            'finished_at': None
+        }
+        with self._lock:
+            self._jobs[job['job_id']] = job
+            self._write(job)
+        return JobContext(self, job['job_id'])
+    
+    def start(self, context: JobContext, func: Callable[[JobContext], Any]) -> None:
+        """
+        Run func(context) on the pool; its return value becomes the job result.
+        
+        func raises JobCancelled (see JobContext.check_cancelled) to stop
+        early; any other exception fails the job.
+        """
+        future = self._executor.submit(self._run, context, func)
+        with self._lock:
+            self._futures[context.job_id] = future
+    
+    def submit(self, kind: str, params: Dict[str, Any], stages: List[str],
+               func: Callable[[JobContext], Any]) -> str:
+        """Create a job and start it on the pool; returns the job id."""
+        context = self.create(kind, params, stages)
+        self.start(context, func)
+        return context.job_id
+    
+    def run_inline(self, context: JobContext, func: Callable[[JobContext], Any]) -> Any:
+        """
+        Run part of a job in the calling thread, finishing the job if it fails or is cancelled.
+        
+        Used for stages that must happen inside the request that created the
+        job, such as receiving an upload. Exceptions are re-raised.
+        """
+        try:
+            return func(context)
+        except JobCancelled:
+            self._finish(context.job_id, JOB_CANCELLED)
+            raise
+        except Exception as e:
+            self._finish(context.job_id, JOB_FAILED, error=str(e))
+            raise
+    
+    def _run(self, context: JobContext, func: Callable[[JobContext], Any]) -> None:
+        job_id = context.job_id
+        if self.cancel_requested(job_id):
+            self._finish(job_id, JOB_CANCELLED)
+            return
+        
+        with self._lock:
+            job = self._jobs[job_id]
+            job['status'] = JOB_RUNNING
+            job['started_at'] = job['started_at'] or time.time()
+            self._write(job)
+        
+        try:
+            result = func(context)
+        except JobCancelled:
+            self._finish(job_id, JOB_CANCELLED)
+        except Exception as e:
+            print(f"❌ Job {job_id} failed: {str(e)}", flush=True)
+            self._finish(job_id, JOB_FAILED, error=str(e))
+        else:
+            self._finish(job_id, JOB_COMPLETE, result=result)
+    
+    def _finish(self, job_id: str, status: str, result: Any = None, error: Optional[str] = None) -> None:
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+            self._futures.pop(job_id, None)
+            self._cancel_requested.discard(job_id)
+            self._last_write.pop(job_id, None)
+            if job is None:
+                return
+            job['status'] = status
+            job['result'] = result
+            job['error'] = error
+            job['finished_at'] = time.time()
+            # Stages that never ran stay 'pending'; close the ones that were cut short
+            for stage in job['stages']:
+                if stage['status'] == JOB_RUNNING:
+                    stage['status'] = status
+            self._write(job)
+        
+        print(f"Job {job_id} ({job['kind']}) {status}", flush=True)
+    
+    def _update_stage(self, job_id: str, name: str, throttle: bool = False,
+                      job_status: Optional[str] = None, **fields: Any) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            stage = next((s for s in job['stages'] if s['name'] == name), None)
+            if stage is None:
+                stage = {'name': name, 'status': 'pending', 'progress': 0.0, 'detail': {},
+                         'started_at': None, 'finished_at': None, 'seconds': None}
+                job['stages'].append(stage)
+            stage.update(fields)
+            if job_status and job['status'] != job_status:
+                job['status'] = job_status
+                job['started_at'] = job['started_at'] or time.time()
+            
+            if not throttle or time.monotonic() - self._last_write.get(job_id, 0.0) >= PROGRESS_WRITE_INTERVAL:
+                self._write(job)
+    
+    def cancel_requested(self, job_id: str) -> bool:
+        with self._lock:
+            return job_id in self._cancel_requested
+    
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Request cancellation of a job.
+        
+        A queued job is cancelled immediately; a running job stops at its
+        next cancellation check.
+        
+        Returns:
+            The job's state, or None if the job does not exist
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                self._cancel_requested.add(job_id)
+                job['cancel_requested'] = True
+                self._write(job)
+                future = self._futures.get(job_id)
+        
+        if job is None:
+            return self.get(job_id)
+        
+        # A job still waiting for a worker never starts
+        if future is not None and future.cancel():
+            self._finish(job_id, JOB_CANCELLED)
+        
+        return self.get(job_id)
+    
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get the current state of a job (live state for running jobs)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return json.loads(json.dumps(job))
+        
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute('SELECT * FROM jobs WHERE job_id = ?', (job_id,)).fetchone()
+        return self._from_row(row) if row else None
+    
+    def list(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """List jobs, most recent first, without their results."""
+        query = 'SELECT job_id, kind, status, error, created_at, started_at, finished_at FROM jobs'
+        args: List[Any] = []
+        if status:
+            query += ' WHERE status = ?'
+            args.append(status)
+        query += ' ORDER BY created_at DESC LIMIT ?'
+        args.append(limit)
+        
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            jobs = [dict(row) for row in conn.execute(query, args)]
+        
+        # Running jobs are only written to the database now and then
+        with self._lock:
+            for job in jobs:
+                live = self._jobs.get(job['job_id'])
+                if live is not None:
+                    job['status'] = live['status']
+        return jobs
+    
+    def stats(self) -> Dict[str, Any]:
+        """Count jobs by status."""
+        with self._connect() as conn:
+            counts = dict(conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
+        with self._lock:
+            active = len(self._jobs)
+        return {'workers': self.workers, 'active': active, 'by_status': counts}
@@ -0,0 +1,571 @@
+#!/usr/bin/env python3
+"""
+Server-Side Page Rendering
+==========================
+
+Rasterises selection regions of PDF pages with PyMuPDF, rendering only the
+clip rectangle instead of the whole sheet, and caches the images in SQLite
+keyed by file hash, page, rectangle and resolution. A small pool of open
+documents avoids re-parsing large drawing sets for every request.
+
+Whole extraction lists are rendered in batches: regions are grouped by page
+so each page is interpreted once into a display list that every region of
+the page is rasterised from, and pages are spread across worker processes
+that each open the document once.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import fitz  # PyMuPDF
+
+from process_pools import POOL_CONTEXT
+
+# 3x the 72 dpi of PDF user space, the scale the frontend captures extractions at
+DEFAULT_REGION_DPI = 216
+MIN_RENDER_DPI = 18
+MAX_RENDER_DPI = 1200
+
+# Largest image a single render may produce (a 36x48in sheet at 216 dpi is ~81 megapixels)
+MAX_RENDER_PIXELS = 150_000_000
+
+IMAGE_FORMATS = {'png': 'image/png', 'jpeg': 'image/jpeg'}
+DEFAULT_JPEG_QUALITY = 85
+
+# Rectangles are rounded to this many decimals of a point in cache keys
+RECT_KEY_DECIMALS = 2
+
+
+def parse_region(region: Union[Dict[str, Any], Sequence[float], None]) -> Optional[fitz.Rect]:
+    """
+    Parse a selection rectangle in page display coordinates.
+    
+    Accepts the frontend's selection format ({'x', 'y', 'width', 'height'} in
+    points at scale 1, origin at the top left of the page as displayed) or an
+    [x0, y0, x1, y1] list. None means the whole page.
+    
+    Raises:
+        ValueError: If the rectangle is malformed or empty
+    """
+    if region is None:
+        return None
+    
+    try:
+        if isinstance(region, dict):
+            x, y = float(region['x']), float(region['y'])
+            rect = fitz.Rect(x, y, x + float(region['width']), y + float(region['height']))
+        else:
+            if len(region) != 4:
+                raise ValueError('rect must have 4 values')
+            rect = fitz.Rect(*(float(value) for value in region))
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Invalid rect: {e}")
+    
+    rect.normalize()
+    if rect.is_empty:
+        raise ValueError('rect is empty')
+    return rect
+
+
+def region_cache_key(file_hash: str, page_number: int, rect: Optional[fitz.Rect], dpi: float,
+                     image_format: str) -> str:
+    """Cache key of a rendered region; rect None is the whole page."""
+    if rect is None:
+        rect_key = 'page'
+    else:
+        rect_key = ','.join(f"{value:.{RECT_KEY_DECIMALS}f}" for value in rect)
+    return f"region:{file_hash}:{page_number}:{rect_key}:{dpi:g}:{image_format}"
+
+
+def render_region(page: fitz.Page, rect: Optional[fitz.Rect], dpi: float = DEFAULT_REGION_DPI,
+                  image_format: str = 'png', jpeg_quality: int = DEFAULT_JPEG_QUALITY,
+                  display_list: Optional[fitz.DisplayList] = None) -> Dict[str, Any]:
+    """
+    Rasterise one region of a page.
+    
+    Only the clip rectangle is rendered, so the cost follows the size of the
+    selection rather than the size of the sheet.
+    
+    Args:
+        page: Page to render
+        rect: Region in page display coordinates (rotation applied, origin at
+            the top left of the crop box), or None for the whole page
+        dpi: Output resolution
+        image_format: 'png' or 'jpeg'
+        jpeg_quality: JPEG quality when image_format is 'jpeg'
+        display_list: The page's display list, to render several regions
+            without interpreting the page's content stream each time
+    
+    Returns:
+        Dictionary with 'data' (encoded image), 'content_type', 'width' and
+        'height'
+    
+    Raises:
+        ValueError: For an unknown format, a resolution out of range, a
+            region outside the page, or an image over MAX_RENDER_PIXELS
+    """
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(f"Unknown image format '{image_format}', expected one of {sorted(IMAGE_FORMATS)}")
+    if not MIN_RENDER_DPI <= dpi <= MAX_RENDER_DPI:
+        raise ValueError(f"dpi must be between {MIN_RENDER_DPI} and {MAX_RENDER_DPI}")
+    
+    clip = page.rect if rect is None else fitz.Rect(rect) & page.rect
+    if clip.is_empty:
+        raise ValueError('rect does not overlap the page')
+    
+    matrix = fitz.Matrix(dpi / 72, dpi / 72)
+    pixels = (clip * matrix).irect
+    if pixels.width * pixels.height > MAX_RENDER_PIXELS:
+        raise ValueError(f"Region would render {pixels.width}x{pixels.height} pixels, "
+                         f"over the limit of {MAX_RENDER_PIXELS}")
+    
+    pix = (display_list or page).get_pixmap(matrix=matrix, clip=clip, alpha=False)
+    if image_format == 'jpeg':
+        data = pix.tobytes('jpg', jpg_quality=jpeg_quality)
+    else:
+        data = pix.tobytes('png')
+    
+    return {'data': data, 'content_type': IMAGE_FORMATS[image_format], 'width': pix.width, 'height': pix.height}
+
+
+def extraction_filename(extraction: Dict[str, Any], image_format: str = 'png') -> str:
+    """
+    Relative image path of an extraction, as the frontend's export names it.
+    
+    Uses files.image of an exported extraction (project_data.json), otherwise
+    <equipment type>/<name>_page<page>.<ext>.
+    """
+    extension = 'jpg' if image_format == 'jpeg' else image_format
+    image_path = (extraction.get('files') or {}).get('image')
+    if image_path:
+        return f"{os.path.splitext(image_path)[0]}.{extension}"
+    
+    equipment_type = extraction.get('equipmentType') or 'UNKNOWN'
+    safe_name = re.sub(r'[^a-z0-9]', '_', extraction.get('extractionName') or str(extraction.get('id')),
+                       flags=re.IGNORECASE).lower()
+    page_number = (extraction.get('coordinates') or {}).get('page', 'unknown')
+    return f"{equipment_type}/{safe_name}_page{page_number}.{extension}"
+
+
+def extraction_regions(extractions: Sequence[Dict[str, Any]], image_format: str = 'png') -> List[Dict[str, Any]]:
+    """
+    Convert a session's extraction list to regions for render_regions_batch().
+    
+    Args:
+        extractions: Extractions from a session file or project_data.json,
+            with 'coordinates' ({'page', 'x', 'y', 'width', 'height'} at
+            scale 1, or {'page', 'isFullPage'})
+        image_format: Format the regions will be rendered in (for file names)
+    
+    Returns:
+        Regions with 'id', 'page' (1-based), 'rect' ((x0, y0, x1, y1) in
+        page display coordinates, None for the whole page) and 'filename'
+    
+    Raises:
+        ValueError: If an extraction has no page or a malformed rectangle
+    """
+    regions = []
+    for extraction in extractions:
+        coordinates = extraction.get('coordinates') or {}
+        if coordinates.get('page') is None:
+            raise ValueError(f"Extraction {extraction.get('id')} has no page coordinates")
+        
+        if extraction.get('isFullPage') or coordinates.get('isFullPage'):
+            rect = None
+        else:
+            try:
+                rect = tuple(parse_region(coordinates))
+            except ValueError as e:
+                raise ValueError(f"Extraction {extraction.get('id')}: {e}")
+        
+        regions.append({
+            'id': extraction.get('id'),
+            'page': int(coordinates['page']),
+            'rect': rect,
+            'filename': extraction_filename(extraction, image_format)
+        })
+    return regions
+
+
+def group_regions_by_page(regions: Sequence[Dict[str, Any]]) -> 'OrderedDict[int, List[int]]':
+    """Indexes of the regions on each page, pages in order of first appearance."""
+    pages: 'OrderedDict[int, List[int]]' = OrderedDict()
+    for index, region in enumerate(regions):
+        pages.setdefault(int(region['page']), []).append(index)
+    return pages
+
+
+def render_page_regions(doc: fitz.Document, page_number: int, regions: Sequence[Dict[str, Any]],
+                        dpi: float = DEFAULT_REGION_DPI, image_format: str = 'png',
+                        jpeg_quality: int = DEFAULT_JPEG_QUALITY,
+                        output_dir: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Rasterise every region of one page from a single display list.
+    
+    The page's content stream is interpreted once; each region is then
+    rasterised from the recorded display list.
+    
+    Args:
+        doc: Open document
+        page_number: 1-based page number
+        regions: Regions of this page (see extraction_regions())
+        dpi: Output resolution
+        image_format: 'png' or 'jpeg'
+        jpeg_quality: JPEG quality when image_format is 'jpeg'
+        output_dir: Write each image to output_dir/<filename> instead of
+            returning its data
+    
+    Returns:
+        One result per region, in order, with 'id', 'page', 'content_type',
+        'width', 'height' and 'data' (or 'path' and 'size_bytes' with
+        output_dir), or 'id', 'page' and 'error' if it could not be rendered
+    """
+    if not 1 <= page_number <= len(doc):
+        error = f'Page {page_number} out of range (document has {len(doc)} pages)'
+        return [{'id': region.get('id'), 'page': page_number, 'error': error} for region in regions]
+    
+    page = doc[page_number - 1]
+    display_list = page.get_displaylist()
+    
+    results = []
+    for region in regions:
+        result: Dict[str, Any] = {'id': region.get('id'), 'page': page_number}
+        try:
+            path = region_output_path(output_dir, region, image_format) if output_dir else None
+            rect = None if region.get('rect') is None else fitz.Rect(region['rect'])
+            image = render_region(page, rect, dpi, image_format, jpeg_quality, display_list=display_list)
+            
+            if path:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, 'wb') as f:
+                    f.write(image['data'])
+                result.update(path=path, size_bytes=len(image['data']))
+            else:
+                result['data'] = image['data']
+        except (OSError, ValueError) as e:
+            result['error'] = str(e)
+        else:
+            result.update(content_type=image['content_type'], width=image['width'], height=image['height'])
+        results.append(result)
+    return results
+
+
+def region_output_path(output_dir: str, region: Dict[str, Any], image_format: str) -> str:
+    """
+    Path of a region's image file under output_dir.
+    
+    Raises:
+        ValueError: If the region's file name leads outside output_dir
+    """
+    filename = region.get('filename')
+    if not filename:
+        extension = 'jpg' if image_format == 'jpeg' else image_format
+        filename = f"region_{region.get('id')}.{extension}"
+    
+    root = os.path.abspath(output_dir)
+    path = os.path.abspath(os.path.join(root, filename))
+    if os.path.commonpath([root, path]) != root:
+        raise ValueError(f"Output file name '{filename}' leaves the output folder")
+    return path
+
+
+# Documents opened by a worker process, reused for every page it renders
+_worker_documents: Dict[str, fitz.Document] = {}
+
+
+def _render_page_worker(pdf_path: str, page_number: int, regions: List[Dict[str, Any]], dpi: float,
+                        image_format: str, jpeg_quality: int, output_dir: Optional[str]) -> List[Dict[str, Any]]:
+    """Process pool entry point: render one page's regions, opening the PDF at most once per worker."""
+    doc = _worker_documents.get(pdf_path)
+    if doc is None:
+        doc = _worker_documents[pdf_path] = fitz.open(pdf_path)
+    return render_page_regions(doc, page_number, regions, dpi, image_format, jpeg_quality, output_dir)
+
+
+def render_regions_batch(pdf_path: str, regions: Sequence[Dict[str, Any]], dpi: float = DEFAULT_REGION_DPI,
+                         image_format: str = 'png', jpeg_quality: int = DEFAULT_JPEG_QUALITY,
+                         workers: int = 1, output_dir: Optional[str] = None,
+                         progress: Optional[Callable[[int, int], None]] = None,
+                         should_cancel: Optional[Callable[[], bool]] = None) -> Dict[str, Any]:
+    """
+    Rasterise a whole list of regions of one PDF.
+    
+    Regions are grouped by page and each page's display list is built once.
+    With more than one worker the pages are spread across a process pool,
+    pages with the most regions first; each worker opens the PDF once.
+    
+    Args:
+        pdf_path: Path of the PDF
+        regions: Regions with 'id', 'page' (1-based), 'rect' and optionally
+            'filename' (see extraction_regions())
+        dpi: Output resolution
+        image_format: 'png' or 'jpeg'
+        jpeg_quality: JPEG quality when image_format is 'jpeg'
+        workers: Number of worker processes (1 renders in this process)
+        output_dir: Write the images under this folder instead of returning
+            their data
+        progress: Called with (regions done, total regions) after each page
+        should_cancel: Checked after each page; returning True stops the
+            batch, leaving the remaining regions out of the results
+    
+    Returns:
+        Dictionary with 'images' (render_page_regions() results in the order
+        of regions, each with its 'index' in regions), 'regions', 'pages', 'rendered', 'failed', 'workers',
+        'cancelled' and 'seconds'
+    
+    Raises:
+        ValueError: For an unknown format or a resolution out of range
+    """
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(f"Unknown image format '{image_format}', expected one of {sorted(IMAGE_FORMATS)}")
+    if not MIN_RENDER_DPI <= dpi <= MAX_RENDER_DPI:
+        raise ValueError(f"dpi must be between {MIN_RENDER_DPI} and {MAX_RENDER_DPI}")
+    
+    start = time.perf_counter()
+    pages = group_regions_by_page(regions)
+    # Busiest pages first so the pool does not end waiting on one large page
+    page_order = sorted(pages, key=lambda page_number: len(pages[page_number]), reverse=True)
+    workers = max(1, min(workers, len(pages)))
+    
+    results: List[Optional[Dict[str, Any]]] = [None] * len(regions)
+    done = 0
+    cancelled = False
+    
+    def collect(page_number: int, page_results: Optional[List[Dict[str, Any]]], error: Optional[str] = None) -> None:
+        nonlocal done
+        for position, index in enumerate(pages[page_number]):
+            if page_results is not None:
+                results[index] = page_results[position]
+            else:
+                results[index] = {'id': regions[index].get('id'), 'page': page_number, 'error': error}
+        done += len(pages[page_number])
+        if progress:
+            progress(done, len(regions))
+    
+    def page_regions(page_number: int) -> List[Dict[str, Any]]:
+        return [regions[index] for index in pages[page_number]]
+    
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=POOL_CONTEXT) as executor:
+            futures = {
+                executor.submit(_render_page_worker, pdf_path, page_number, page_regions(page_number), dpi,
+                                image_format, jpeg_quality, output_dir): page_number
+                for page_number in page_order
+            }
+            for future in as_completed(futures):
+                try:
+                    collect(futures[future], future.result())
+                except Exception as e:
+                    collect(futures[future], None, str(e))
+                if should_cancel and should_cancel():
+                    cancelled = True
+                    for pending in futures:
+                        pending.cancel()
+                    break
+    else:
+        with fitz.open(pdf_path) as doc:
+            for page_number in page_order:
+                if should_cancel and should_cancel():
+                    cancelled = True
+                    break
+                try:
+                    collect(page_number, render_page_regions(doc, page_number, page_regions(page_number), dpi,
+                                                             image_format, jpeg_quality, output_dir))
+                except Exception as e:
+                    collect(page_number, None, str(e))
+    
+    images = []
+    for index, result in enumerate(results):
+        if result is not None:
+            result['index'] = index
+            images.append(result)
+    failed = sum(1 for result in images if 'error' in result)
+    return {
+        'images': images,
+        'regions': len(regions),
+        'pages': len(pages),
+        'rendered': len(images) - failed,
+        'failed': failed,
+        'workers': workers,
+        'cancelled': cancelled,
+        'seconds': round(time.perf_counter() - start, 3)
+    }
+
+
+class DocumentPool:
+    """Open documents by file hash, least recently used closed first, each with its own lock."""
+    
+    def __init__(self, max_open: int = 4):
+        """
+        Args:
+            max_open: Number of documents kept open
+        """
+        self.max_open = max_open
+        self.opens = 0
+        self._documents: 'OrderedDict[str, Tuple[fitz.Document, threading.Lock]]' = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @contextmanager
+    def document(self, file_hash: str, pdf_path: str) -> Iterator[fitz.Document]:
+        """
+        Use an open document exclusively (PyMuPDF documents are not thread-safe).
+        
+        Args:
+            file_hash: SHA-256 of the PDF, identifying its revision
+            pdf_path: Path the document is opened from on first use
+        """
+        with self._lock:
+            entry = self._documents.get(file_hash)
+            if entry is None:
+                entry = (fitz.open(pdf_path), threading.Lock())
+                self.opens += 1
+                self._documents[file_hash] = entry
+                while len(self._documents) > self.max_open:
+                    _, (old_doc, old_lock) = self._documents.popitem(last=False)
+                    with old_lock:
+                        old_doc.close()
+            else:
+                self._documents.move_to_end(file_hash)
+        
+        doc, doc_lock = entry
+        with doc_lock:
+            yield doc
+    
+    def clear(self) -> None:
+        """Close every open document."""
+        with self._lock:
+            while self._documents:
+                _, (doc, doc_lock) = self._documents.popitem(last=False)
+                with doc_lock:
+                    doc.close()
+
+
+class RenderCache:
+    """Persistent LRU cache of rendered images."""
+    
+    def __init__(self, db_path: str, max_bytes: int = 1024 * 1024 * 1024):
+        """
+        Initialize the cache, creating the database if needed.
+        
+        Args:
+            db_path: Path to the SQLite database file
+            max_bytes: Maximum total size of the cached images
+        """
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS images (
+                    cache_key TEXT PRIMARY KEY,
+                    file_hash TEXT NOT NULL,
+                    content_type TEXT NOT NULL,
+                    data BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    width INTEGER NOT NULL,
+                    height INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    last_accessed REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_images_last_accessed ON images(last_accessed)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_images_file_hash ON images(file_hash)')
+    
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection for one operation; this keeps the cache safe across threads."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+    
+    def get(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a rendered image.
+        
+        Returns:
+            Dictionary with 'data', 'content_type', 'width' and 'height', or
+            None on a miss
+        """
+        with self._connect() as conn:
+            row = conn.execute('SELECT data, content_type, width, height FROM images WHERE cache_key = ?',
+                               (cache_key,)).fetchone()
+            if row:
+                conn.execute('UPDATE images SET last_accessed = ? WHERE cache_key = ?', (time.time(), cache_key))
+        
+        if not row:
+            self.misses += 1
+            return None
+        
+        self.hits += 1
+        return {'data': row[0], 'content_type': row[1], 'width': row[2], 'height': row[3]}
+    
+    def contains(self, cache_key: str) -> bool:
+        """Check for an image without reading it or touching the LRU order."""
+        with self._connect() as conn:
+            return conn.execute('SELECT 1 FROM images WHERE cache_key = ?', (cache_key,)).fetchone() is not None
+    
+    def put(self, cache_key: str, file_hash: str, image: Dict[str, Any]) -> None:
+        """Store a rendered image from render_region() and evict old entries if over max_bytes."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO images (cache_key, file_hash, content_type, data, size, width, height,
+                                               created, last_accessed)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (cache_key, file_hash, image['content_type'], image['data'], len(image['data']),
+                  image['width'], image['height'], now, now))
+            self._evict(conn)
+    
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Drop least-recently-used images until under max_bytes."""
+        total_size = conn.execute('SELECT COALESCE(SUM(size), 0) FROM images').fetchone()[0]
+        if total_size <= self.max_bytes:
+            return
+        
+        for cache_key, size in conn.execute('SELECT cache_key, size FROM images ORDER BY last_accessed ASC').fetchall():
+            if total_size <= self.max_bytes:
+                break
+            conn.execute('DELETE FROM images WHERE cache_key = ?', (cache_key,))
+            total_size -= size
+    
+    def clear(self, file_hash: Optional[str] = None) -> None:
+        """Remove every cached image, or only those of one file."""
+        with self._connect() as conn:
+            if file_hash:
+                conn.execute('DELETE FROM images WHERE file_hash = ?', (file_hash,))
+            else:
+                conn.execute('DELETE FROM images')
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        with self._connect() as conn:
+            count, total_size, files = conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0), COUNT(DISTINCT file_hash) FROM images'
+            ).fetchone()
+        
+        lookups = self.hits + self.misses
+        return {
+            'cached_images': count,
+            'cached_files': files,
+            'size_bytes': total_size,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'db_path': self.db_path
+        }
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Page Thumbnails and Tile Pyramids
+=================================
+
+Renders low-resolution thumbnails of every page and fixed-size tiles of a
+page at successive zoom levels, so a viewer only ever fetches the pixels it
+shows instead of rasterising a whole drawing sheet.
+
+Level 0 fits the page's longest side into one tile; each level doubles the
+scale, up to MAX_TILE_SCALE. Tiles are addressed by (level, column, row) in
+page display coordinates (rotation applied, origin at the top left), the
+same coordinates the frontend's selections use. Images are cached in a
+page_render.RenderCache keyed by file hash.
+"""
+
+import math
+from typing import Any, Dict, List, Tuple
+
+import fitz  # PyMuPDF
+
+from page_render import DEFAULT_JPEG_QUALITY, IMAGE_FORMATS
+
+TILE_SIZE = 512
+THUMBNAIL_SIZE = 256  # Longest side of a thumbnail in pixels
+MIN_THUMBNAIL_SIZE = 32
+MAX_THUMBNAIL_SIZE = 1024
+
+# Deepest level renders at no more than 8x (576 dpi), enough for fine print on a full-size sheet
+MAX_TILE_SCALE = 8.0
+
+
+def level_count(width: float, height: float, tile_size: int = TILE_SIZE, max_scale: float = MAX_TILE_SCALE) -> int:
+    """Number of zoom levels of a page, level 0 fitting the page into one tile."""
+    base_scale = tile_size / max(width, height)
+    if base_scale >= max_scale:
+        return 1
+    return int(math.floor(math.log2(max_scale / base_scale))) + 1
+
+
+def level_scale(width: float, height: float, level: int, tile_size: int = TILE_SIZE) -> float:
+    """Pixels per point at a zoom level."""
+    return tile_size / max(width, height) * (2 ** level)
+
+
+def tile_grid(width: float, height: float, level: int, tile_size: int = TILE_SIZE) -> Tuple[int, int]:
+    """(columns, rows) of tiles covering the page at a zoom level."""
+    scale = level_scale(width, height, level, tile_size)
+    return math.ceil(width * scale / tile_size), math.ceil(height * scale / tile_size)
+
+
+def page_layout(doc: fitz.Document, tile_size: int = TILE_SIZE) -> List[Dict[str, Any]]:
+    """
+    Describe the tile pyramid of every page.
+    
+    Returns:
+        One dictionary per page with 'page' (1-based), 'width' and 'height'
+        (display size in points), 'rotation' and 'levels' (each with
+        'level', 'scale', 'columns' and 'rows')
+    """
+    layout = []
+    for page in doc:
+        width, height = page.rect.width, page.rect.height
+        levels = []
+        for level in range(level_count(width, height, tile_size)):
+            columns, rows = tile_grid(width, height, level, tile_size)
+            levels.append({'level': level, 'scale': round(level_scale(width, height, level, tile_size), 6),
+                           'columns': columns, 'rows': rows})
+        layout.append({'page': page.number + 1, 'width': round(width, 3), 'height': round(height, 3),
+                       'rotation': page.rotation, 'levels': levels})
+    return layout
+
+
+def tile_cache_key(file_hash: str, page_number: int, level: int, column: int, row: int, image_format: str,
+                   tile_size: int = TILE_SIZE) -> str:
+    return f"tile:{file_hash}:{page_number}:{tile_size}:{level}:{column}:{row}:{image_format}"
+
+
+def thumbnail_cache_key(file_hash: str, page_number: int, size: int = THUMBNAIL_SIZE) -> str:
+    return f"thumbnail:{file_hash}:{page_number}:{size}"
+
+
+def _encode(pix: fitz.Pixmap, image_format: str, jpeg_quality: int) -> Dict[str, Any]:
+    if image_format == 'jpeg':
+        data = pix.tobytes('jpg', jpg_quality=jpeg_quality)
+    else:
+        data = pix.tobytes('png')
+    return {'data': data, 'content_type': IMAGE_FORMATS[image_format], 'width': pix.width, 'height': pix.height}
+
+
+def render_tile(page: fitz.Page, level: int, column: int, row: int, image_format: str = 'png',
+                tile_size: int = TILE_SIZE, jpeg_quality: int = DEFAULT_JPEG_QUALITY) -> Dict[str, Any]:
+    """
+    Rasterise one tile of a page.
+    
+    Tiles are tile_size pixels square except along the right and bottom edges
+    of the page. Their bounds fall on whole pixels of the level, so adjacent
+    tiles join without seams.
+    
+    Returns:
+        Dictionary with 'data', 'content_type', 'width' and 'height'
+    
+    Raises:
+        ValueError: For an unknown format or a level or tile outside the page
+    """
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(f"Unknown image format '{image_format}', expected one of {sorted(IMAGE_FORMATS)}")
+    
+    width, height = page.rect.width, page.rect.height
+    levels = level_count(width, height, tile_size)
+    if not 0 <= level < levels:
+        raise ValueError(f'Level {level} out of range (page has {levels} levels)')
+    columns, rows = tile_grid(width, height, level, tile_size)
+    if not (0 <= column < columns and 0 <= row < rows):
+        raise ValueError(f'Tile {column},{row} out of range (level {level} is {columns}x{rows} tiles)')
+    
+    scale = level_scale(width, height, level, tile_size)
+    clip = fitz.Rect(column * tile_size, row * tile_size, (column + 1) * tile_size, (row + 1) * tile_size)
+    clip = (clip * (1 / scale)) & page.rect
+    
+    pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), clip=clip, alpha=False)
+    return _encode(pix, image_format, jpeg_quality)
+
+
+def render_thumbnail(page: fitz.Page, size: int = THUMBNAIL_SIZE) -> Dict[str, Any]:
+    """
+    Rasterise a whole page with its longest side size pixels, as JPEG.
+    
+    Raises:
+        ValueError: If size is outside MIN_THUMBNAIL_SIZE..MAX_THUMBNAIL_SIZE
+    """
+    if not MIN_THUMBNAIL_SIZE <= size <= MAX_THUMBNAIL_SIZE:
+        raise ValueError(f"Thumbnail size must be between {MIN_THUMBNAIL_SIZE} and {MAX_THUMBNAIL_SIZE}")
+    
+    scale = size / max(page.rect.width, page.rect.height)
+    pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), alpha=False)
+    return _encode(pix, 'jpeg', DEFAULT_JPEG_QUALITY)
@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+"""
+File Path Index
+===============
+
+Name -> paths index of the files under a set of root directories, used to
+find where a file the browser opened lives on disk (the browser only knows
+its name, size and modification time).
+
+The index is built by a background crawl and persisted in SQLite, so after
+a restart lookups are answered from the last snapshot straight away while
+the next crawl brings it up to date. Crawls are incremental: a directory is
+only listed again when its modification time changed. Lookups are a
+dictionary access by file name followed by a stat() of the few candidates,
+which also catches files rewritten in place since the last crawl.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from project_catalog import removed_directories
+
+# Only these files are indexed; /api/find-file looks up drawing sets
+INDEXED_EXTENSIONS = ('.pdf',)
+
+MAX_CRAWL_DEPTH = 12
+
+# Directories that never hold drawing sets and can be large; Windows profile
+# junctions ("Application Data", "My Documents") are skipped as symlinks
+SKIPPED_DIRECTORIES = {'AppData', 'node_modules', '__pycache__', '$RECYCLE.BIN', 'System Volume Information'}
+
+# Files whose size differs by more than this are not the file being looked for
+SIZE_TOLERANCE = 100
+
+# Browsers report modification times in whole milliseconds, FAT volumes in 2s steps
+MTIME_TOLERANCE_MS = 2000
+
+
+def name_key(file_name: str) -> str:
+    """Lookup key of a file name; Windows file names are case-insensitive."""
+    return file_name.lower()
+
+
+class PathIndex:
+    """Persistent index of the files under configured roots, by file name."""
+    
+    def __init__(self, db_path: str, roots: Sequence[str] = (), poll_interval: float = 600.0,
+                 max_depth: int = MAX_CRAWL_DEPTH, extensions: Sequence[str] = INDEXED_EXTENSIONS):
+        """
+        Initialize the index, creating the database if needed and loading the
+        last snapshot.
+        
+        Args:
+            db_path: Path to the SQLite database file
+            roots: Directories always indexed, in addition to roots added
+                with add_root(); missing directories are skipped
+            poll_interval: Seconds between crawls of the background crawler
+            max_depth: Deepest directory level below a root that is crawled
+            extensions: Lower-case extensions of the files indexed
+        """
+        self.db_path = db_path
+        self.poll_interval = poll_interval
+        self.max_depth = max_depth
+        self.extensions = tuple(extensions)
+        self.crawls = 0
+        self.last_crawl: Optional[Dict[str, Any]] = None
+        self.crawling = False
+        self._crawl_lock = threading.Lock()
+        self._memory_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._crawler: Optional[threading.Thread] = None
+        # name key -> {path: (size, mtime_ns)}
+        self._by_name: Dict[str, Dict[str, Tuple[int, int]]] = {}
+        
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS roots (
+                    root_path TEXT PRIMARY KEY,
+                    added_at REAL NOT NULL,
+                    crawled_at REAL,
+                    crawl_seconds REAL
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS directories (
+                    dir_path TEXT PRIMARY KEY,
+                    root_path TEXT NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    subdirs TEXT NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_directories_root_path ON directories(root_path)')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS files (
+                    path TEXT PRIMARY KEY,
+                    dir_path TEXT NOT NULL,
+                    name_key TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_files_dir_path ON files(dir_path)')
+            
+            for path, key, size, mtime_ns in conn.execute('SELECT path, name_key, size, mtime_ns FROM files'):
+                self._by_name.setdefault(key, {})[path] = (size, mtime_ns)
+        
+        for root in roots:
+            if os.path.isdir(root):
+                self.add_root(root)
+    
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection for one operation; this keeps the index safe across threads."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+    
+    # ------------------------------------------------------------------
+    # Roots
+    # ------------------------------------------------------------------
+    
+    def add_root(self, root_path: str) -> bool:
+        """
+        Add a directory to index; it is crawled on the crawler's next pass.
+        
+        Returns:
+            bool: True if the root was not configured yet
+        
+        Raises:
+            ValueError: If the path is not a directory
+        """
+        root_path = os.path.abspath(root_path)
+        if not os.path.isdir(root_path):
+            raise ValueError(f'Path index root is not a directory: {root_path}')
+        
+        with self._connect() as conn:
+            added = conn.execute('INSERT OR IGNORE INTO roots (root_path, added_at) VALUES (?, ?)',
+                                 (root_path, time.time())).rowcount > 0
+        if added:
+            print(f"Path index root added: {root_path}", flush=True)
+            self.wake()
+        return added
+    
+    def remove_root(self, root_path: str) -> bool:
+        """
+        Stop indexing a directory and drop its files.
+        
+        Returns:
+            bool: True if the root was configured
+        """
+        root_path = os.path.abspath(root_path)
+        with self._crawl_lock:
+            with self._connect() as conn:
+                removed = conn.execute('DELETE FROM roots WHERE root_path = ?', (root_path,)).rowcount > 0
+                dirs = [row[0] for row in conn.execute(
+                    'SELECT dir_path FROM directories WHERE root_path = ?', (root_path,))]
+                self._forget_directories(conn, dirs)
+                conn.execute('DELETE FROM directories WHERE root_path = ?', (root_path,))
+        return removed
+    
+    def roots(self) -> List[Dict[str, Any]]:
+        """Configured roots with their last crawl time and duration."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT root_path, added_at, crawled_at, crawl_seconds FROM roots ORDER BY root_path'
+            ).fetchall()
+        return [{'path': path, 'added_at': added_at, 'crawled_at': crawled_at, 'crawl_seconds': crawl_seconds}
+                for path, added_at, crawled_at, crawl_seconds in rows]
+    
+    # ------------------------------------------------------------------
+    # Crawling
+    # ------------------------------------------------------------------
+    
+    def crawl(self) -> Dict[str, Any]:
+        """
+        Bring the index up to date with every root.
+        
+        Returns:
+            Dictionary with counts of 'directories_listed' (read again because
+            they changed), 'directories_unchanged', 'directories_removed' and
+            'files' in the index, and the crawl time in 'seconds'
+        """
+        with self._crawl_lock:
+            self.crawling = True
+            try:
+                start = time.perf_counter()
+                stats = {'directories_listed': 0, 'directories_unchanged': 0, 'directories_removed': 0}
+                
+                with self._connect() as conn:
+                    roots = [row[0] for row in conn.execute('SELECT root_path FROM roots ORDER BY root_path')]
+                
+                # A directory under two roots belongs to the first one crawled
+                claimed = set()
+                for root in roots:
+                    root_start = time.perf_counter()
+                    if not self._crawl_root(root, stats, claimed):
+                        continue
+                    with self._connect() as conn:
+                        conn.execute('UPDATE roots SET crawled_at = ?, crawl_seconds = ? WHERE root_path = ?',
+                                     (time.time(), round(time.perf_counter() - root_start, 3), root))
+                
+                stats['files'] = self.file_count()
+                stats['roots'] = len(roots)
+                stats['seconds'] = round(time.perf_counter() - start, 3)
+                self.crawls += 1
+                self.last_crawl = dict(stats, finished_at=time.time())
+            finally:
+                self.crawling = False
+        
+        if stats['directories_listed'] or stats['directories_removed']:
+            print(f"✅ Path index crawl: {stats['directories_listed']} directories listed, "
+                  f"{stats['files']} files ({stats['seconds']}s)", flush=True)
+        return stats
+    
+    def _crawl_root(self, root: str, stats: Dict[str, Any], claimed: set) -> bool:
+        """Crawl one root; returns False if the root could not be reached."""
+        # An unreachable root (a dropped network share) keeps its persisted snapshot
+        try:
+            os.stat(root)
+        except OSError as e:
+            print(f"⚠️  Skipping unreachable path index root {root}: {e}", flush=True)
+            return False
+        
+        with self._connect() as conn:
+            listings = {row[0]: (row[1], json.loads(row[2])) for row in conn.execute(
+                'SELECT dir_path, mtime_ns, subdirs FROM directories WHERE root_path = ?', (root,))}
+        
+        changed = {}
+        listed = {}
+        pending = [(root, 0)]
+        while pending:
+            dir_path, depth = pending.pop()
+            if dir_path in claimed:
+                continue
+            claimed.add(dir_path)
+            try:
+                mtime_ns = os.stat(dir_path).st_mtime_ns
+            except OSError:
+                continue
+            
+            cached = listings.get(dir_path)
+            if cached and cached[0] == mtime_ns:
+                subdirs = cached[1]
+                stats['directories_unchanged'] += 1
+                listed[dir_path] = subdirs
+            else:
+                listing = self._list_directory(dir_path)
+                if listing is not None:
+                    subdirs, files = listing
+                    changed[dir_path] = (mtime_ns, subdirs, files)
+                    stats['directories_listed'] += 1
+                    listed[dir_path] = subdirs
+                elif cached:
+                    # Keep the stored listing and files; nothing below it is known to be gone
+                    subdirs = cached[1]
+                else:
+                    continue
+            
+            if depth < self.max_depth:
+                pending.extend((os.path.join(dir_path, name), depth + 1) for name in subdirs)
+        
+        removed = sorted(removed_directories(listings, listed))
+        stats['directories_removed'] += len(removed)
+        if not changed and not removed:
+            return True
+        
+        # One transaction per root; a first crawl lists every directory
+        with self._connect() as conn:
+            self._forget_directories(conn, list(changed) + removed)
+            conn.executemany('DELETE FROM directories WHERE dir_path = ? AND root_path = ?',
+                             [(path, root) for path in removed])
+            conn.executemany('INSERT OR REPLACE INTO directories (dir_path, root_path, mtime_ns, subdirs) '
+                             'VALUES (?, ?, ?, ?)',
+                             [(path, root, mtime_ns, json.dumps(subdirs))
+                              for path, (mtime_ns, subdirs, _) in changed.items()])
+            conn.executemany(
+                'INSERT OR REPLACE INTO files (path, dir_path, name_key, size, mtime_ns) VALUES (?, ?, ?, ?, ?)',
+                [(os.path.join(dir_path, name), dir_path, name_key(name), size, file_mtime_ns)
+                 for dir_path, (_, _, files) in changed.items() for name, size, file_mtime_ns in files])
+        
+        with self._memory_lock:
+            for dir_path, (_, _, files) in changed.items():
+                for name, size, file_mtime_ns in files:
+                    self._by_name.setdefault(name_key(name), {})[os.path.join(dir_path, name)] = (size, file_mtime_ns)
+        return True
+    
+    def _list_directory(self, dir_path: str):
+        """Subdirectory names of a directory and (name, size, mtime_ns) of its indexed files; None if unreadable."""
+        subdirs = []
+        files = []
+        try:
+            with os.scandir(dir_path) as entries:
+                for entry in entries:
+                    if entry.name.startswith('.'):
+                        continue
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in SKIPPED_DIRECTORIES:
+                                subdirs.append(entry.name)
+                        elif entry.name.lower().endswith(self.extensions):
+                            stat = entry.stat()
+                            files.append((entry.name, stat.st_size, stat.st_mtime_ns))
+                    except OSError:
+                        continue
+        except OSError as e:
+            print(f"⚠️  Could not list {dir_path}: {e}", flush=True)
+            return None
+        return sorted(subdirs), files
+    
+    def _forget_directories(self, conn: sqlite3.Connection, dir_paths: Sequence[str]) -> None:
+        """Drop the files of some directories from the database and from memory."""
+        for dir_path in dir_paths:
+            rows = conn.execute('SELECT path, name_key FROM files WHERE dir_path = ?', (dir_path,)).fetchall()
+            if not rows:
+                continue
+            conn.execute('DELETE FROM files WHERE dir_path = ?', (dir_path,))
+            with self._memory_lock:
+                for path, key in rows:
+                    paths = self._by_name.get(key)
+                    if paths is not None:
+                        paths.pop(path, None)
+                        if not paths:
+                            del self._by_name[key]
+    
+    # ------------------------------------------------------------------
+    # Crawler
+    # ------------------------------------------------------------------
+    
+    def start(self) -> None:
+        """Start the background crawler (a no-op if it is running)."""
+        if self._crawler and self._crawler.is_alive():
+            return
+        self._stop.clear()
+        self._crawler = threading.Thread(target=self._run, name='path-index', daemon=True)
+        self._crawler.start()
+    
+    def stop(self) -> None:
+        """Stop the background crawler."""
+        self._stop.set()
+        self._wake.set()
+    
+    def wake(self) -> None:
+        """Make the crawler crawl now instead of at the end of its interval."""
+        self._wake.set()
+    
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                self.crawl()
+            except Exception as e:
+                print(f"❌ Path index crawl failed: {e}", flush=True)
+            self._wake.wait(self.poll_interval)
+    
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+    
+    def find(self, file_name: str, size: Optional[int] = None,
+             modified_ms: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Find the indexed files with a name, best match first.
+        
+        Candidates are stat()ed, so files removed since the last crawl are
+        skipped and files rewritten in place report their current size and
+        modification time.
+        
+        Args:
+            file_name: File name (case-insensitive)
+            size: Size in bytes; files more than SIZE_TOLERANCE bytes off
+                are left out
+            modified_ms: Modification time in milliseconds since the epoch,
+                as browsers report it
+        
+        Returns:
+            List of dictionaries with 'path', 'size', 'modified' (seconds),
+            'exact_match' (size equal) and 'mtime_match', ordered by exact
+            match, then modification time match, then most recent
+        """
+        with self._memory_lock:
+            candidates = list(self._by_name.get(name_key(file_name), {}).items())
+        
+        matches = []
+        for path, (indexed_size, indexed_mtime_ns) in candidates:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if (stat.st_size, stat.st_mtime_ns) != (indexed_size, indexed_mtime_ns):
+                with self._memory_lock:
+                    paths = self._by_name.get(name_key(file_name))
+                    if paths is not None and path in paths:
+                        paths[path] = (stat.st_size, stat.st_mtime_ns)
+            if size and abs(stat.st_size - size) > SIZE_TOLERANCE:
+                continue
+            matches.append({
+                'path': path,
+                'size': stat.st_size,
+                'modified': stat.st_mtime,
+                'exact_match': stat.st_size == size if size else True,
+                'mtime_match': abs(stat.st_mtime_ns / 1e6 - modified_ms) <= MTIME_TOLERANCE_MS
+                if modified_ms else False
+            })
+        
+        matches.sort(key=lambda match: (match['exact_match'], match['mtime_match'], match['modified']), reverse=True)
+        return matches
+    
+    def file_count(self) -> int:
+        with self._memory_lock:
+            return sum(len(paths) for paths in self._by_name.values())
+    
+    def status(self) -> Dict[str, Any]:
+        """
+        Freshness of the index.
+        
+        Returns:
+            Dictionary with 'ready' (a crawl finished, now or before a
+            restart), 'crawling', 'age_seconds' (since the least recently
+            crawled root finished crawling), 'files', 'roots', 'last_crawl'
+            (statistics of this process's last crawl) and 'poll_interval'
+        """
+        roots = self.roots()
+        crawled = [root['crawled_at'] for root in roots]
+        ready = bool(roots) and all(crawled)
+        return {
+            'ready': ready,
+            'crawling': self.crawling,
+            'age_seconds': round(time.time() - min(crawled), 1) if ready else None,
+            'files': self.file_count(),
+            'roots': roots,
+            'crawls': self.crawls,
+            'last_crawl': self.last_crawl,
+            'poll_interval': self.poll_interval,
+            'db_path': self.db_path
+        }
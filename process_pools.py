@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Process Pools
+=============
+
+Multiprocessing context shared by the worker pools of Space detection,
+consolidated PDF builds and batch region rendering.
+
+The API server runs request, job and crawler threads, and a child forked
+from it could inherit a lock held mid-operation by one of them, so workers
+are started by a forkserver (spawn where that is unavailable) instead.
+Python only runs one forkserver per process, so its preload list lives
+here: the forkserver imports the worker modules once and every worker is
+forked from it with them already loaded, rather than the forkserver
+importing the server module and building its state.
+"""
+
+import multiprocessing
+
+# Modules holding the pool entry points
+WORKER_MODULES = ['bluebeam_space_handler', 'equipment_pdfs', 'page_render']
+
+if 'forkserver' in multiprocessing.get_all_start_methods():
+    POOL_CONTEXT = multiprocessing.get_context('forkserver')
+    POOL_CONTEXT.set_forkserver_preload(WORKER_MODULES)
+else:
+    POOL_CONTEXT = multiprocessing.get_context('spawn')
@@ -0,0 +1,518 @@
+#!/usr/bin/env python3
+"""
+Project Catalog
+===============
+
+Keeps track of every export folder (a directory holding project_data.json)
+under a set of configured root directories, so extractions can be searched
+across all jobs at once instead of one folder at a time.
+
+Crawls are incremental: a directory is only listed again when its
+modification time changed (an entry was added, removed or renamed), and a
+project is only re-read when its project_data.json changed size or
+modification time. Catalogued folders are indexed in an
+ExtractionSearchIndex, which answers the actual queries.
+
+A background watcher re-crawls every poll interval, or sooner when woken.
+It polls rather than subscribing to filesystem events because the roots
+are typically Windows drives seen through WSL (/mnt/c) or network shares,
+where inotify reports nothing; with directory mtimes an unchanged tree
+costs one stat() per directory.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from search_index import ExtractionSearchIndex
+
+PROJECT_FILE = 'project_data.json'
+
+# Export folders hold equipment folders a few levels down from a job directory
+MAX_CRAWL_DEPTH = 8
+
+# Directories that never hold exports and can be large
+SKIPPED_DIRECTORIES = {'node_modules', '__pycache__', '$RECYCLE.BIN', 'System Volume Information'}
+
+
+def removed_directories(stored: Sequence[str], listed: Dict[str, List[str]]) -> set:
+    """
+    Stored directories that are really gone: their parent was listed again
+    without them, or the parent itself is gone. Directories under a parent
+    that could not be listed this time are kept.
+    """
+    removed = set()
+    for path in sorted(stored, key=len):
+        if path in listed:
+            continue
+        parent = os.path.dirname(path)
+        if parent in removed or (parent in listed and os.path.basename(path) not in listed[parent]):
+            removed.add(path)
+    return removed
+
+
+def project_summary(project_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Catalog fields of a loaded project_data.json."""
+    equipment = project_data.get('equipment') or {}
+    return {
+        'project': project_data.get('project') or '',
+        'original_pdf_path': project_data.get('originalPdfPath'),
+        'export_date': project_data.get('exportDate'),
+        'equipment_types': sorted(equipment),
+        'extraction_count': sum(len(extractions) for extractions in equipment.values())
+    }
+
+
+class ProjectCatalog:
+    """Persistent catalog of the export folders under configured roots."""
+    
+    def __init__(self, db_path: str, search_index: ExtractionSearchIndex, roots: Sequence[str] = (),
+                 poll_interval: float = 60.0, max_depth: int = MAX_CRAWL_DEPTH):
+        """
+        Initialize the catalog, creating the database if needed.
+        
+        Args:
+            db_path: Path to the SQLite database file
+            search_index: Index the catalogued folders are kept in
+            roots: Directories always crawled, in addition to roots added
+                with add_root()
+            poll_interval: Seconds between crawls of the background watcher
+            max_depth: Deepest directory level below a root that is crawled
+        """
+        self.db_path = db_path
+        self.search_index = search_index
+        self.poll_interval = poll_interval
+        self.max_depth = max_depth
+        self.crawls = 0
+        self.last_crawl: Optional[Dict[str, Any]] = None
+        self._crawl_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS roots (
+                    root_path TEXT PRIMARY KEY,
+                    added_at REAL NOT NULL,
+                    crawled_at REAL
+                )
+            ''')
+            # Listing of every crawled directory, reused while its mtime is unchanged
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS directories (
+                    dir_path TEXT PRIMARY KEY,
+                    root_path TEXT NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    subdirs TEXT NOT NULL,
+                    has_project INTEGER NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_directories_root_path ON directories(root_path)')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS projects (
+                    folder_path TEXT PRIMARY KEY,
+                    root_path TEXT NOT NULL,
+                    project TEXT NOT NULL,
+                    original_pdf_path TEXT,
+                    export_date TEXT,
+                    equipment_types TEXT NOT NULL,
+                    extraction_count INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    indexed_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_projects_root_path ON projects(root_path)')
+        
+        for root in roots:
+            self.add_root(root)
+    
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection for one operation; this keeps the catalog safe across threads."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+    
+    # ------------------------------------------------------------------
+    # Roots
+    # ------------------------------------------------------------------
+    
+    def add_root(self, root_path: str) -> bool:
+        """
+        Add a directory to crawl; it is crawled on the watcher's next pass.
+        
+        Returns:
+            bool: True if the root was not configured yet
+        
+        Raises:
+            ValueError: If the path is not a directory
+        """
+        root_path = os.path.abspath(root_path)
+        if not os.path.isdir(root_path):
+            raise ValueError(f'Catalog root is not a directory: {root_path}')
+        
+        with self._connect() as conn:
+            added = conn.execute('INSERT OR IGNORE INTO roots (root_path, added_at) VALUES (?, ?)',
+                                 (root_path, time.time())).rowcount > 0
+        if added:
+            print(f"Catalog root added: {root_path}", flush=True)
+            self.wake()
+        return added
+    
+    def remove_root(self, root_path: str) -> bool:
+        """
+        Stop crawling a directory and drop its projects from the catalog.
+        
+        Returns:
+            bool: True if the root was configured
+        """
+        root_path = os.path.abspath(root_path)
+        with self._crawl_lock:
+            with self._connect() as conn:
+                removed = conn.execute('DELETE FROM roots WHERE root_path = ?', (root_path,)).rowcount > 0
+                folders = [row[0] for row in conn.execute(
+                    'SELECT folder_path FROM projects WHERE root_path = ?', (root_path,))]
+                conn.execute('DELETE FROM projects WHERE root_path = ?', (root_path,))
+                conn.execute('DELETE FROM directories WHERE root_path = ?', (root_path,))
+            for folder in folders:
+                self.search_index.remove(folder)
+        return removed
+    
+    def roots(self) -> List[Dict[str, Any]]:
+        """Configured roots with their project counts and last crawl time."""
+        with self._connect() as conn:
+            rows = conn.execute('''
+                SELECT roots.root_path, roots.added_at, roots.crawled_at, COUNT(projects.folder_path)
+                FROM roots LEFT JOIN projects ON projects.root_path = roots.root_path
+                GROUP BY roots.root_path ORDER BY roots.root_path
+            ''').fetchall()
+        return [{'path': path, 'added_at': added_at, 'crawled_at': crawled_at, 'projects': projects}
+                for path, added_at, crawled_at, projects in rows]
+    
+    # ------------------------------------------------------------------
+    # Crawling
+    # ------------------------------------------------------------------
+    
+    def crawl(self) -> Dict[str, Any]:
+        """
+        Bring the catalog up to date with every root.
+        
+        Returns:
+            Dictionary with counts of 'directories_listed' (read again because
+            they changed), 'directories_unchanged', 'projects_indexed' (new or
+            changed), 'projects_removed' and 'projects' in the catalog, and
+            the crawl time in 'seconds'
+        """
+        with self._crawl_lock:
+            start = time.perf_counter()
+            stats = {'directories_listed': 0, 'directories_unchanged': 0, 'projects_indexed': 0}
+            
+            with self._connect() as conn:
+                roots = [row[0] for row in conn.execute('SELECT root_path FROM roots ORDER BY root_path')]
+            
+            # Projects the search index lost (rebuilt or cleared) are re-indexed like changed ones
+            indexed = self.search_index.indexed_folders()
+            
+            # A folder under two roots belongs to the first one crawled
+            claimed = set()
+            found = set()
+            removed = set()
+            for root in roots:
+                root_found, root_removed = self._crawl_root(root, stats, claimed, indexed)
+                found.update(root_found)
+                removed.update(root_removed)
+            
+            removed -= found
+            for folder in removed:
+                self.search_index.remove(folder)
+            stats['projects_removed'] = len(removed)
+            
+            with self._connect() as conn:
+                stats['projects'] = conn.execute('SELECT COUNT(*) FROM projects').fetchone()[0]
+            stats['roots'] = len(roots)
+            stats['seconds'] = round(time.perf_counter() - start, 3)
+            self.crawls += 1
+            self.last_crawl = dict(stats, finished_at=time.time())
+        
+        if stats['projects_indexed'] or stats['projects_removed']:
+            print(f"✅ Catalog crawl: {stats['projects_indexed']} projects indexed, "
+                  f"{stats['projects_removed']} removed, {stats['projects']} total ({stats['seconds']}s)",
+                  flush=True)
+        return stats
+    
+    def _crawl_root(self, root: str, stats: Dict[str, Any], claimed: set, indexed: Dict[str, Any]):
+        """Crawl one root; returns the project folders found and those no longer found."""
+        with self._connect() as conn:
+            listings = {row[0]: (row[1], json.loads(row[2]), bool(row[3])) for row in conn.execute(
+                'SELECT dir_path, mtime_ns, subdirs, has_project FROM directories WHERE root_path = ?', (root,))}
+            known = {row[0]: (row[1], row[2]) for row in conn.execute(
+                'SELECT folder_path, size, mtime_ns FROM projects WHERE root_path = ?', (root,))}
+        
+        # An unreachable root (a dropped network share) keeps everything stored under it
+        try:
+            os.stat(root)
+        except OSError as e:
+            print(f"⚠️  Skipping unreachable catalog root {root}: {e}", flush=True)
+            return set(), []
+        
+        changed_listings = {}
+        listed_dirs = {}
+        found = set()
+        pending = [(root, 0)]
+        
+        while pending:
+            dir_path, depth = pending.pop()
+            if dir_path in claimed:
+                continue
+            claimed.add(dir_path)
+            try:
+                mtime_ns = os.stat(dir_path).st_mtime_ns
+            except OSError:
+                continue
+            
+            cached = listings.get(dir_path)
+            if cached and cached[0] == mtime_ns:
+                subdirs, has_project = cached[1], cached[2]
+                stats['directories_unchanged'] += 1
+                listed_dirs[dir_path] = subdirs
+            else:
+                listing = self._list_directory(dir_path)
+                if listing is not None:
+                    subdirs, has_project = listing
+                    changed_listings[dir_path] = (mtime_ns, subdirs, has_project)
+                    stats['directories_listed'] += 1
+                    listed_dirs[dir_path] = subdirs
+                elif cached:
+                    # Keep the stored listing; nothing below it is known to be gone
+                    subdirs, has_project = cached[1], cached[2]
+                else:
+                    continue
+            
+            if has_project:
+                found.add(dir_path)
+                # Equipment folders inside an export never hold further exports
+                continue
+            if depth < self.max_depth:
+                pending.extend((os.path.join(dir_path, name), depth + 1) for name in subdirs)
+        
+        for folder in sorted(found):
+            signature = known.get(folder)
+            if signature and indexed.get(folder) != tuple(signature):
+                signature = None
+            if self._refresh_project(folder, root, signature):
+                stats['projects_indexed'] += 1
+        
+        removed_dirs = removed_directories(listings, listed_dirs)
+        # A project is gone once its folder was re-listed without one, or the folder itself is gone
+        removed = [folder for folder in known if folder not in found
+                   and (folder in listed_dirs or folder in removed_dirs)]
+        with self._connect() as conn:
+            conn.executemany('''
+                INSERT OR REPLACE INTO directories (dir_path, root_path, mtime_ns, subdirs, has_project)
+                VALUES (?, ?, ?, ?, ?)
+            ''', [(path, root, mtime_ns, json.dumps(subdirs), int(has_project))
+                  for path, (mtime_ns, subdirs, has_project) in changed_listings.items()])
+            conn.executemany('DELETE FROM directories WHERE dir_path = ? AND root_path = ?',
+                             [(path, root) for path in removed_dirs])
+            conn.executemany('DELETE FROM projects WHERE folder_path = ? AND root_path = ?',
+                             [(folder, root) for folder in removed])
+            conn.execute('UPDATE roots SET crawled_at = ? WHERE root_path = ?', (time.time(), root))
+        
+        return found, removed
+    
+    @staticmethod
+    def _list_directory(dir_path: str):
+        """Subdirectory names of a directory and whether it holds project_data.json; None if unreadable."""
+        subdirs = []
+        has_project = False
+        try:
+            with os.scandir(dir_path) as entries:
+                for entry in entries:
+                    if entry.name == PROJECT_FILE:
+                        has_project = True
+                    elif (not entry.name.startswith('.') and entry.name not in SKIPPED_DIRECTORIES
+                          and entry.is_dir(follow_symlinks=False)):
+                        subdirs.append(entry.name)
+        except OSError as e:
+            print(f"⚠️  Could not list {dir_path}: {e}", flush=True)
+            return None
+        return sorted(subdirs), has_project
+    
+    def _refresh_project(self, folder: str, root: str, signature=None) -> bool:
+        """Re-read and re-index a project whose project_data.json changed; returns True if it did."""
+        project_file = os.path.join(folder, PROJECT_FILE)
+        try:
+            stat = os.stat(project_file)
+            if signature and tuple(signature) == (stat.st_size, stat.st_mtime_ns):
+                return False
+            with open(project_file, 'r', encoding='utf-8') as f:
+                summary = project_summary(json.load(f))
+            self.search_index.refresh(folder)
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Skipping catalog project {folder}: {e}", flush=True)
+            return False
+        
+        with self._connect() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO projects (folder_path, root_path, project, original_pdf_path, export_date,
+                                                 equipment_types, extraction_count, size, mtime_ns, indexed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (folder, root, summary['project'], summary['original_pdf_path'], summary['export_date'],
+                  json.dumps(summary['equipment_types']), summary['extraction_count'],
+                  stat.st_size, stat.st_mtime_ns, time.time()))
+        return True
+    
+    def refresh_project(self, folder_path: str) -> bool:
+        """
+        Catalog one export folder right away, e.g. just after an export.
+        
+        The folder must be under a configured root, otherwise the next crawl
+        drops it again.
+        
+        Returns:
+            bool: True if the folder was (re-)indexed
+        """
+        folder_path = os.path.abspath(folder_path)
+        with self._connect() as conn:
+            roots = [row[0] for row in conn.execute('SELECT root_path FROM roots')]
+        root = next((root for root in sorted(roots) if folder_path.startswith(root.rstrip(os.sep) + os.sep)), None)
+        if root is None:
+            return False
+        with self._crawl_lock:
+            return self._refresh_project(folder_path, root)
+    
+    # ------------------------------------------------------------------
+    # Watcher
+    # ------------------------------------------------------------------
+    
+    def start(self) -> None:
+        """Start the background watcher (a no-op if it is running)."""
+        if self._watcher and self._watcher.is_alive():
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, name='project-catalog', daemon=True)
+        self._watcher.start()
+    
+    def stop(self) -> None:
+        """Stop the background watcher."""
+        self._stop.set()
+        self._wake.set()
+    
+    def wake(self) -> None:
+        """Make the watcher crawl now instead of at the end of its interval."""
+        self._wake.set()
+    
+    def _watch(self) -> None:
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                self.crawl()
+                # Column indexes are built here rather than on the first condition query
+                self.search_index.load_schedule_indexes([project['path'] for project in self.projects()])
+            except Exception as e:
+                print(f"❌ Catalog crawl failed: {e}", flush=True)
+            self._wake.wait(self.poll_interval)
+    
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    
+    def projects(self, roots: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """Catalogued export folders, most recently changed first, optionally only under some roots."""
+        sql = '''SELECT folder_path, root_path, project, original_pdf_path, export_date, equipment_types,
+                        extraction_count, mtime_ns FROM projects'''
+        params: List[str] = []
+        if roots:
+            sql += f' WHERE root_path IN ({", ".join("?" * len(roots))})'
+            params = [os.path.abspath(root) for root in roots]
+        with self._connect() as conn:
+            rows = conn.execute(sql + ' ORDER BY mtime_ns DESC', params).fetchall()
+        return [{
+            'path': folder_path,
+            'name': os.path.basename(folder_path),
+            'root': root_path,
+            'project': project,
+            'original_pdf_path': original_pdf_path,
+            'export_date': export_date,
+            'equipment_types': json.loads(equipment_types),
+            'extraction_count': extraction_count,
+            'modified': mtime_ns / 1e9
+        } for (folder_path, root_path, project, original_pdf_path, export_date, equipment_types,
+               extraction_count, mtime_ns) in rows]
+    
+    def search(self, query: Optional[str] = None, equipment_types: Optional[Sequence[str]] = None,
+               extraction_types: Optional[Sequence[str]] = None, where: Optional[str] = None,
+               roots: Optional[Sequence[str]] = None, limit: int = 100, offset: int = 0) -> Dict[str, Any]:
+        """
+        Search the extractions of every catalogued folder.
+        
+        Args:
+            query: Full-text query (see search_index.build_match_query()),
+                or None to match every extraction that passes the filters
+            equipment_types: Only these equipment groups, e.g. ['FANS']
+            extraction_types: Only these extraction types, e.g. ['schedule']
+            where: Schedule table conditions, e.g. 'CFM > 5000' (see
+                schedule_tables)
+            roots: Only folders under these roots
+            limit: Maximum number of results
+            offset: Number of results to skip
+        
+        Returns:
+            Dictionary from ExtractionSearchIndex.search() plus
+            'folders_searched'
+        
+        Raises:
+            ValueError: If the query has no searchable words or the
+                conditions cannot be parsed
+        """
+        folders = [project['path'] for project in self.projects(roots)]
+        # The watcher keeps catalogued folders indexed, so a search costs no stat() per folder
+        found = self.search_index.search(query, folders, limit=limit, offset=offset,
+                                         equipment_types=equipment_types, extraction_types=extraction_types,
+                                         where=where, refresh=False)
+        found['folders_searched'] = len(folders)
+        return found
+    
+    def columns(self, roots: Optional[Sequence[str]] = None) -> Dict[str, int]:
+        """Schedule table columns of the catalogued folders with their row counts, most common first."""
+        return self.search_index.schedule_columns([project['path'] for project in self.projects(roots)],
+                                                  refresh=False)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get catalog statistics."""
+        with self._connect() as conn:
+            roots = conn.execute('SELECT COUNT(*) FROM roots').fetchone()[0]
+            directories = conn.execute('SELECT COUNT(*) FROM directories').fetchone()[0]
+            projects, extractions = conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(extraction_count), 0) FROM projects'
+            ).fetchone()
+        return {
+            'roots': roots,
+            'directories': directories,
+            'projects': projects,
+            'extractions': extractions,
+            'crawls': self.crawls,
+            'last_crawl': self.last_crawl,
+            'watching': bool(self._watcher and self._watcher.is_alive()),
+            'poll_interval': self.poll_interval,
+            'db_path': self.db_path
+        }
+    
+    def clear(self) -> None:
+        """Forget every crawled directory and project (roots are kept); the next crawl rebuilds them."""
+        with self._crawl_lock, self._connect() as conn:
+            conn.execute('DELETE FROM directories')
+            conn.execute('DELETE FROM projects')
+        self.wake()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+PDF Schedule Extractor - Batch Region Rendering
+
+Regenerates the images of every extraction in a session file
+(<pdf>.pdfextractor.json) or an export's project_data.json from the original
+PDF, for example at a new resolution. Regions are grouped by page so each
+page is interpreted once, and pages are spread across worker processes.
+
+Usage:
+    python render_regions.py drawings.pdf.pdfextractor.json --dpi 300
+    python render_regions.py export/project_data.json --in-place --workers 8
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from page_render import DEFAULT_REGION_DPI, IMAGE_FORMATS, extraction_regions, render_regions_batch
+
+
+def load_extractions(data_path: str):
+    """
+    Read the extractions and original PDF path of a session file or project_data.json.
+    
+    Returns:
+        tuple: (extractions, pdf_path) where pdf_path is None if the file does not record it
+    """
+    with open(data_path, 'r') as f:
+        data = json.load(f)
+    
+    if 'equipment' in data:
+        # project_data.json: extractions grouped by equipment type
+        extractions = []
+        for equipment_type, equipment_list in data['equipment'].items():
+            for extraction in equipment_list:
+                extractions.append(dict(extraction, equipmentType=extraction.get('equipmentType', equipment_type)))
+        return extractions, data.get('originalPdfPath')
+    
+    pdf_path = None
+    if data_path.endswith('.pdfextractor.json'):
+        pdf_path = data_path[:-len('.pdfextractor.json')]
+    return data.get('extractions', []), pdf_path
+
+
+def main():
+    """Main entry point for the batch rendering script."""
+    parser = argparse.ArgumentParser(
+        description='Re-render every extraction region of a session or export from the original PDF'
+    )
+    parser.add_argument('data', help='Session file (<pdf>.pdfextractor.json) or export project_data.json')
+    parser.add_argument('--pdf', help='Original PDF (default: the PDF the session or export belongs to)')
+    parser.add_argument('-o', '--output', help='Output folder (default: regions_<dpi>dpi next to the data file)')
+    parser.add_argument('--in-place', action='store_true',
+                        help="Overwrite the images of an export folder (project_data.json's folder)")
+    parser.add_argument('--dpi', type=float, default=DEFAULT_REGION_DPI,
+                        help=f'Output resolution (default: {DEFAULT_REGION_DPI})')
+    parser.add_argument('--format', choices=sorted(IMAGE_FORMATS), default='png', help='Image format')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes')
+    args = parser.parse_args()
+    
+    try:
+        extractions, pdf_path = load_extractions(args.data)
+    except (OSError, ValueError) as e:
+        print(f"❌ Could not read {args.data}: {e}")
+        sys.exit(1)
+    
+    pdf_path = args.pdf or pdf_path
+    if not pdf_path or not os.path.isfile(pdf_path):
+        print(f"❌ Original PDF not found{f': {pdf_path}' if pdf_path else ''} (pass it with --pdf)")
+        sys.exit(1)
+    
+    data_dir = os.path.dirname(os.path.abspath(args.data))
+    if args.in_place:
+        output_dir = data_dir
+    else:
+        output_dir = args.output or os.path.join(data_dir, f"regions_{args.dpi:g}dpi")
+    
+    try:
+        regions = extraction_regions(extractions, args.format)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    
+    if not regions:
+        print("⚠️  No extractions to render")
+        return
+    
+    print(f"Rendering {len(regions)} regions of {os.path.basename(pdf_path)} at {args.dpi:g} dpi "
+          f"with {args.workers} worker(s)...")
+    
+    def report(done, total):
+        print(f"  {done}/{total} regions", flush=True)
+    
+    result = render_regions_batch(pdf_path, regions, args.dpi, args.format, workers=args.workers,
+                                  output_dir=output_dir, progress=report)
+    
+    for image in result['images']:
+        if 'error' in image:
+            print(f"❌ Extraction {image['id']} (page {image['page']}): {image['error']}")
+    
+    print(f"\n✅ Rendered {result['rendered']} regions on {result['pages']} pages in {result['seconds']:.2f}s "
+          f"({result['workers']} worker(s))")
+    if result['failed']:
+        print(f"⚠️  {result['failed']} regions failed")
+    print(f"Output: {output_dir}")
+    
+    if result['failed']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,565 @@
+#!/usr/bin/env python3
+"""
+Schedule Tables
+===============
+
+Parses the markdown tables OCR providers return for equipment schedules
+(ocrData.markdown) into typed row records, and indexes those records per
+column so they can be filtered with conditions such as:
+
+    HP >= 5 AND VOLTAGE = 460
+    SUPPLY_CFM > 5000 OR (TAG ~ EF AND STATIC >= 1.5)
+
+Column names are the table headers in upper case with units dropped and
+punctuation replaced by underscores ("Supply CFM" -> SUPPLY_CFM). The
+fields people search for (CFM, HP, RPM, VOLTAGE, PHASE, HZ, MODEL, MCA,
+MOP, MOTOR, STATIC, TAG) are also recognised under their common spellings,
+so "Airflow (L/s)", "ESP (in. wg)" and "Motor kW" answer CFM, STATIC and
+HP. A combined "V/PH/HZ" column is split into VOLTAGE, PHASE and HZ.
+
+Numbers are read from cells such as "1,200", "1-1/2", "½ HP", "460V" or
+"460/3/60" and converted to the canonical unit of their field (CFM, HP,
+inches of water, volts), from a unit in the cell or else in the header.
+
+Operators: = != < <= > >= and ~ (text contains); AND, OR, NOT and
+parentheses. Numeric values compare numbers and other values compare text,
+case-insensitively. All conditions of a query apply to the same table row.
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Fields recognised under several spellings, first match wins
+PRESET_COLUMNS = (
+    ('TAG', r'^(TAG|MARK|SYMBOL|(UNIT|EQUIP|EQUIPMENT|FAN) (TAG|MARK|NO|NUMBER|ID))$'),
+    ('MODEL', r'\bMODEL\b'),
+    ('MCA', r'\bMCA\b|\bMIN(IMUM)? CIRCUIT AMP'),
+    ('MOP', r'\bMOC?P\b|\bMFS\b|\bMAX(IMUM)? (OVER ?CURRENT|FUSE)'),
+    ('CFM', r'\bCFM\b|\bAIR ?FLOW\b|\bL/S\b|\bM3/H\b'),
+    ('STATIC', r'\bSTATIC\b|\bE\.?S\.?P\b|\bT\.?S\.?P\b|^S\.?P\.?$'),
+    ('RPM', r'\bRPM\b|\bSPEED\b'),
+    ('HP', r'\bB?HP\b|\bHORSEPOWER\b|\bMOTOR K?W\b'),
+    ('PHASE', r'^(PH|PHASE)$'),
+    ('VOLTAGE', r'^(V|VOLTS?|VOLTAGE)$'),
+    ('HZ', r'^(HZ|HERTZ|CYCLES?)$'),
+    ('MOTOR', r'\bMOTOR\b'),
+)
+
+# Text-only fields; "EF-1" or "ABC-120" are not numbers
+TEXT_COLUMNS = {'TAG', 'MODEL'}
+
+# Factors converting a unit to the canonical unit of a field. Units are
+# compared in upper case without spaces or dots ("in. wg" -> "INWG").
+UNIT_CONVERSIONS = {
+    'CFM': {'CFM': 1.0, 'L/S': 2.11888, 'LPS': 2.11888, 'M3/H': 0.588578, 'CMH': 0.588578, 'M3/S': 2118.88},
+    'HP': {'HP': 1.0, 'BHP': 1.0, 'KW': 1.34102, 'W': 0.00134102},
+    'STATIC': {'INWG': 1.0, 'INWC': 1.0, 'IWC': 1.0, 'IN': 1.0, '"': 1.0, 'KPA': 4.01463, 'PA': 0.00401463},
+    'VOLTAGE': {'V': 1.0, 'KV': 1000.0},
+}
+
+# "V/PH/HZ", "VOLTS-PHASE-HZ", "ELECTRICAL (V/PH)"
+_COMBINED_ELECTRICAL = re.compile(r'\b(V|VOLTS?|VOLTAGE)\s*[/-]\s*(PH|PHASE)\b(\s*[/-]\s*(HZ|CYCLES?)\b)?')
+
+_FRACTIONS = {'½': '1/2', '¼': '1/4', '¾': '3/4', '⅓': '1/3', '⅔': '2/3', '⅛': '1/8', '⅜': '3/8', '⅝': '5/8',
+              '⅞': '7/8'}
+_NUMBER = re.compile(r'(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?|\.\d+')
+_FRACTION = re.compile(r'/(\d+)(?![\d.])')
+_MIXED_FRACTION = re.compile(r'(?:\s+|-)(\d+)/(\d+)(?![\d.])')
+_MISSING = {'', '-', '--', '---', '—', '–', 'N/A', 'NA', 'NONE', 'TBD', '?'}
+_HTML_TAG = re.compile(r'<[^>]+>')
+
+OPERATORS = ('<=', '>=', '!=', '=', '<', '>', '~')
+_WHERE_TOKEN = re.compile(r'\s*(?:(\()|(\))|(<=|>=|!=|=|<|>|~)|"([^"]*)"|\'([^\']*)\'|([^\s()<>=!~"\']+))')
+
+
+def column_name(header: str) -> str:
+    """Column name of a header or query field: upper case, units dropped, punctuation as underscores."""
+    name = re.sub(r'\([^)]*\)|\[[^\]]*\]', ' ', header.upper())
+    return re.sub(r'[^0-9A-Z]+', '_', name).strip('_')
+
+
+def _unit_key(text: str) -> str:
+    return re.sub(r'[\s.]+', '', text.upper().replace('³', '3'))
+
+
+def preset_column(header: str) -> Optional[str]:
+    """The preset field a header stands for (see PRESET_COLUMNS), or None."""
+    full = ' '.join(_HTML_TAG.sub(' ', header).upper().split())
+    stripped = ' '.join(re.sub(r'\([^)]*\)|\[[^\]]*\]', ' ', full).split())
+    for name, pattern in PRESET_COLUMNS:
+        if re.search(pattern, stripped) or re.search(pattern, full):
+            return name
+    return None
+
+
+def clean_cell(text: Any) -> Optional[str]:
+    """Cell text without markup and surrounding whitespace, or None for an empty or N/A cell."""
+    text = _HTML_TAG.sub(' ', str(text if text is not None else '')).replace('**', '').replace('\\|', '|')
+    text = ' '.join(text.split())
+    return None if text.upper() in _MISSING else text
+
+
+def parse_number(text: str, field: Optional[str] = None, header_unit: Optional[str] = None,
+                 anywhere: bool = False) -> Optional[float]:
+    """
+    Read the number a cell holds, in the canonical unit of its field.
+    
+    Args:
+        text: Cell text
+        field: Preset field of the column (selects the unit conversions)
+        header_unit: Unit key given in the column header, used when the
+            cell has none
+        anywhere: Accept a number after other text ("ECM, 1/2 HP"); by
+            default the number must lead the cell
+    
+    Returns:
+        float: The value, or None if the cell holds no number
+    """
+    for symbol, fraction in _FRACTIONS.items():
+        text = text.replace(symbol, f' {fraction}')
+    
+    match = _NUMBER.search(text)
+    if not match:
+        return None
+    lead = text[:match.start()].strip()
+    negative = lead.endswith(('-', '−')) and not lead[:-1].strip()
+    if not anywhere and lead and not negative and lead not in ('~', '±', '≈', '+'):
+        return None
+    
+    value = float(match.group().replace(',', ''))
+    end = match.end()
+    fraction = _FRACTION.match(text, end)
+    mixed = _MIXED_FRACTION.match(text, end)
+    # Proper fractions only, so "460/3/60" and "208-230/1/60" read as 460 and 208
+    if fraction and '.' not in match.group() and 0 < value < int(fraction.group(1)) <= 64:
+        value /= int(fraction.group(1))
+        end = fraction.end()
+    elif mixed and '.' not in match.group() and 0 < int(mixed.group(1)) < int(mixed.group(2)) <= 64:
+        value += int(mixed.group(1)) / int(mixed.group(2))
+        end = mixed.end()
+    if negative:
+        value = -value
+    
+    conversions = UNIT_CONVERSIONS.get(field)
+    if conversions:
+        unit = _unit_key(text[end:])
+        factor = next((conversions[key] for key in sorted(conversions, key=len, reverse=True)
+                       if unit.startswith(key) and not unit[len(key):len(key) + 1].isalpha()), None)
+        if factor is None and header_unit:
+            factor = conversions.get(header_unit)
+        if factor is not None and factor != 1.0:
+            value = round(value * factor, 6)
+    return value
+
+
+def parse_markdown_tables(markdown: str) -> List[Tuple[List[str], List[List[str]]]]:
+    """
+    Split markdown text into its pipe tables.
+    
+    Returns:
+        List of (headers, rows) tuples; rows are padded or cut to the
+        number of headers
+    """
+    tables = []
+    lines = [line.strip() for line in (markdown or '').splitlines()]
+    i = 0
+    while i + 1 < len(lines):
+        header, separator = lines[i], lines[i + 1]
+        if not (header.startswith('|') and re.fullmatch(r'\|?[\s:|-]*-[\s:|-]*\|?', separator)):
+            i += 1
+            continue
+        
+        headers = _split_row(header)
+        rows = []
+        i += 2
+        while i < len(lines) and lines[i].startswith('|'):
+            cells = _split_row(lines[i])
+            rows.append((cells + [''] * len(headers))[:len(headers)])
+            i += 1
+        tables.append((headers, rows))
+    return tables
+
+
+def _split_row(line: str) -> List[str]:
+    cells = re.split(r'(?<!\\)\|', line.strip())
+    if cells and not cells[0].strip():
+        cells = cells[1:]
+    if cells and not cells[-1].strip():
+        cells = cells[:-1]
+    return [cell.strip() for cell in cells]
+
+
+def _table_columns(headers: Sequence[str]) -> List[Dict[str, Any]]:
+    """Name, preset field and header unit of each column of a table."""
+    columns = []
+    used = set()
+    for position, header in enumerate(headers):
+        name = column_name(header) or f'COLUMN_{position + 1}'
+        while name in used:
+            name = f'{name}_{position + 1}'
+        used.add(name)
+        
+        upper = header.upper()
+        field = preset_column(header)
+        units = re.findall(r'\(([^)]*)\)', upper)
+        header_unit = _unit_key(units[-1]) if units else None
+        if field in UNIT_CONVERSIONS and header_unit is None:
+            # "Motor kW", "Supply L/s": the unit is a word of the header
+            words = {_unit_key(word) for word in re.split(r'[\s_]+', upper)}
+            header_unit = next((unit for unit in UNIT_CONVERSIONS[field] if unit in words), None)
+        
+        columns.append({'name': name, 'field': field, 'unit': header_unit,
+                        'electrical': bool(_COMBINED_ELECTRICAL.search(upper))})
+    return columns
+
+
+def table_records(headers: Sequence[str], rows: Sequence[Sequence[str]]) -> List[Dict[str, Any]]:
+    """
+    Typed records of a table's rows.
+    
+    Returns:
+        One dictionary per row with 'cells' ({column: [number or None,
+        text]}) and 'aliases' ({preset field: column} for fields whose
+        column has another name, e.g. CFM -> SUPPLY_CFM)
+    """
+    columns = _table_columns(headers)
+    names = {column['name'] for column in columns}
+    aliases = {}
+    for column in columns:
+        field = column['field']
+        if field and field not in names and field not in aliases:
+            aliases[field] = column['name']
+    
+    records = []
+    for row in rows:
+        cells = {}
+        for column, raw in zip(columns, row):
+            text = clean_cell(raw)
+            if text is None:
+                continue
+            field = column['field']
+            
+            if column['electrical']:
+                # "460/3/60" -> VOLTAGE, PHASE and HZ
+                parts = text.split('/') if '/' in text else text.split('-')
+                for part_field, part in zip(('VOLTAGE', 'PHASE', 'HZ'), parts):
+                    number = parse_number(part.strip(), part_field)
+                    if number is not None and part_field not in names:
+                        cells[part_field] = [number, part.strip()]
+            
+            number = None
+            if field not in TEXT_COLUMNS:
+                number = parse_number(text, field, column['unit'], anywhere=field is not None)
+            cells[column['name']] = [number, text]
+        if cells:
+            records.append({'cells': cells, 'aliases': {field: name for field, name in aliases.items()
+                                                        if name in cells}})
+    return records
+
+
+def extraction_records(extraction: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Typed records of every table row of an extraction.
+    
+    Reads ocrData.markdown, or ocrData.tableData when an extraction has no
+    markdown table.
+    """
+    ocr_data = extraction.get('ocrData') or {}
+    tables = parse_markdown_tables(ocr_data.get('markdown') or '')
+    table_data = ocr_data.get('tableData') or {}
+    if not tables and isinstance(table_data.get('headers'), list) and isinstance(table_data.get('data'), list):
+        headers = [str(header) for header in table_data['headers']]
+        tables = [(headers, [([str(cell) for cell in row] + [''] * len(headers))[:len(headers)]
+                             for row in table_data['data'] if isinstance(row, list)])]
+    
+    records = []
+    for headers, rows in tables:
+        records.extend(table_records(headers, rows))
+    return records
+
+
+def parse_where(where: str) -> Tuple:
+    """
+    Parse a condition string into a tree of tuples:
+    ('and', [...]), ('or', [...]), ('not', node) and
+    ('compare', column, operator, text, number), number being None for
+    values that are not numbers.
+    
+    Raises:
+        ValueError: If the conditions cannot be parsed
+    """
+    tokens = []
+    position = 0
+    where = where.strip()
+    while position < len(where):
+        match = _WHERE_TOKEN.match(where, position)
+        if not match or match.end() == position:
+            raise ValueError(f'Unexpected character in conditions at position {position}: {where[position:]!r}')
+        position = match.end()
+        open_paren, close_paren, operator, double_quoted, single_quoted, word = match.groups()
+        if open_paren or close_paren:
+            tokens.append(('paren', open_paren or close_paren))
+        elif operator:
+            tokens.append(('operator', operator))
+        elif double_quoted is not None or single_quoted is not None:
+            tokens.append(('string', double_quoted if double_quoted is not None else single_quoted))
+        elif word.upper() in ('AND', 'OR', 'NOT'):
+            tokens.append(('keyword', word.upper()))
+        else:
+            tokens.append(('word', word))
+    
+    parser = _ConditionParser(tokens)
+    tree = parser.parse_or()
+    if parser.position != len(tokens):
+        raise ValueError(f'Unexpected {tokens[parser.position][1]!r} in conditions')
+    return tree
+
+
+class _ConditionParser:
+    """Recursive descent over the tokens of parse_where(): OR binds loosest, then AND, then NOT."""
+    
+    def __init__(self, tokens: List[Tuple[str, str]]):
+        self.tokens = tokens
+        self.position = 0
+    
+    def _peek(self) -> Tuple[Optional[str], Optional[str]]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+    
+    def _take(self) -> Tuple[Optional[str], Optional[str]]:
+        """Next token, or (None, None) past the end (reported by the caller)."""
+        token = self._peek()
+        if token[0] is not None:
+            self.position += 1
+        return token
+    
+    @staticmethod
+    def _describe(token: Tuple[Optional[str], Optional[str]]) -> str:
+        return repr(token[1]) if token[0] is not None else 'end of conditions'
+    
+    def parse_or(self) -> Tuple:
+        nodes = [self.parse_and()]
+        while self._peek() == ('keyword', 'OR'):
+            self._take()
+            nodes.append(self.parse_and())
+        return nodes[0] if len(nodes) == 1 else ('or', nodes)
+    
+    def parse_and(self) -> Tuple:
+        nodes = [self.parse_not()]
+        while self._peek() == ('keyword', 'AND'):
+            self._take()
+            nodes.append(self.parse_not())
+        return nodes[0] if len(nodes) == 1 else ('and', nodes)
+    
+    def parse_not(self) -> Tuple:
+        if self._peek() == ('keyword', 'NOT'):
+            self._take()
+            return ('not', self.parse_not())
+        if self._peek() == ('paren', '('):
+            self._take()
+            node = self.parse_or()
+            token = self._take()
+            if token != ('paren', ')'):
+                raise ValueError(f'Missing ) in conditions, found {self._describe(token)}')
+            return node
+        return self.parse_comparison()
+    
+    def parse_comparison(self) -> Tuple:
+        token = self._take()
+        kind, column = token
+        if kind not in ('word', 'string'):
+            raise ValueError(f'Expected a column name, found {self._describe(token)}')
+        token = self._take()
+        kind, operator = token
+        if kind != 'operator':
+            raise ValueError(f'Expected one of {" ".join(OPERATORS)} after {column}, found {self._describe(token)}')
+        token = self._take()
+        kind, value = token
+        if kind not in ('word', 'string'):
+            raise ValueError(f'Expected a value after {column} {operator}, found {self._describe(token)}')
+        name = column_name(column)
+        if not name:
+            raise ValueError(f'Invalid column name {column!r}')
+        # Only unquoted values compare as numbers ("1/2", "1,200" and "460V" do)
+        number = parse_number(value) if kind == 'word' else None
+        return ('compare', name, operator, value, number)
+
+
+def where_columns(tree: Tuple) -> List[str]:
+    """Column names a condition tree refers to."""
+    if tree[0] == 'compare':
+        return [tree[1]]
+    if tree[0] == 'not':
+        return where_columns(tree[1])
+    return [name for node in tree[1] for name in where_columns(node)]
+
+
+def record_cells(entry_id: int, row_number: int, record: Dict[str, Any]) -> List[Tuple]:
+    """
+    Flatten a record from table_records() into the cells a ScheduleIndex is built from.
+    
+    Returns:
+        (entry id, row number, column, number or None, text, alias) tuples;
+        alias is the preset field a cell also answers to, or None
+    """
+    aliases = {name: field for field, name in record['aliases'].items()}
+    return [(entry_id, row_number, name, number, text, aliases.get(name))
+            for name, (number, text) in record['cells'].items()]
+
+
+class _Column:
+    """Values of one column over every row of a ScheduleIndex, sorted for range lookups."""
+    
+    def __init__(self, size: int, rows: np.ndarray, numbers: np.ndarray, texts: np.ndarray):
+        """
+        Args:
+            size: Number of rows of the index
+            rows: Row position of each value
+            numbers: Number of each value (NaN for text)
+            texts: Text of each value (object array)
+        """
+        self.present = np.zeros(size, dtype=bool)
+        self.present[rows] = True
+        
+        has_number = ~np.isnan(numbers)
+        number_rows, numbers = rows[has_number], numbers[has_number]
+        order = np.argsort(numbers, kind='stable')
+        self.number_rows = number_rows[order]
+        self.sorted_numbers = numbers[order]
+        self.text_positions = rows
+        self.texts = texts
+        self._text_rows: Optional[Dict[str, np.ndarray]] = None
+    
+    @property
+    def text_rows(self) -> Dict[str, np.ndarray]:
+        """Rows by lower-case text, built on the first text condition (most conditions compare numbers)."""
+        if self._text_rows is None:
+            grouped: Dict[str, List[int]] = {}
+            for position, text in zip(self.text_positions.tolist(), self.texts):
+                grouped.setdefault(text.lower(), []).append(position)
+            self._text_rows = {text: np.array(rows, dtype=np.int64) for text, rows in grouped.items()}
+        return self._text_rows
+
+
+class ScheduleIndex:
+    """
+    Per-column index over the table rows of a set of extractions.
+    
+    Numbers are kept sorted per column, so a range or equality condition is
+    a binary search; text equality is a dictionary lookup. Conditions are
+    combined as boolean masks over all rows.
+    """
+    
+    def __init__(self, cells: Sequence[Tuple]):
+        """
+        Build the index.
+        
+        Args:
+            cells: Tuples from record_cells(), ordered by entry id and row
+                number; each (entry id, row number) pair is one row
+        """
+        count = len(cells)
+        entry_ids, row_numbers, names, numbers, texts, aliases = zip(*cells) if count else ((),) * 6
+        entry_ids = np.array(entry_ids, dtype=np.int64)
+        row_numbers = np.array(row_numbers, dtype=np.int64)
+        
+        # A new row starts wherever the (entry id, row number) pair changes
+        starts = np.ones(count, dtype=bool)
+        starts[1:] = (entry_ids[1:] != entry_ids[:-1]) | (row_numbers[1:] != row_numbers[:-1])
+        positions = np.cumsum(starts) - 1
+        self.size = int(starts.sum())
+        self.entry_ids = entry_ids[starts]
+        self.row_numbers = row_numbers[starts]
+        
+        # Cells of each row, for row()
+        self._cell_bounds = np.append(np.flatnonzero(starts), count)
+        self._cell_names = names
+        self._cell_numbers = numbers
+        self._cell_texts = texts
+        
+        # Group the cells by column; a cell with an alias also belongs to that column
+        column_ids: Dict[str, int] = {}
+        cell_columns = [column_ids.setdefault(name, len(column_ids)) for name in names]
+        aliased = [cell for cell, alias in enumerate(aliases) if alias is not None]
+        cell_columns += [column_ids.setdefault(aliases[cell], len(column_ids)) for cell in aliased]
+        members = np.concatenate([np.arange(count), np.array(aliased, dtype=np.int64)])
+        cell_columns = np.array(cell_columns, dtype=np.int64)
+        
+        order = np.argsort(cell_columns, kind='stable')
+        bounds = np.searchsorted(cell_columns[order], np.arange(len(column_ids) + 1))
+        number_values = np.array(numbers, dtype=np.float64)
+        text_values = np.array(texts, dtype=object)
+        self.columns: Dict[str, _Column] = {}
+        for name, column_id in column_ids.items():
+            cells_of_column = members[order[bounds[column_id]:bounds[column_id + 1]]]
+            self.columns[name] = _Column(self.size, positions[cells_of_column], number_values[cells_of_column],
+                                         text_values[cells_of_column])
+    
+    def _rows_mask(self, rows: np.ndarray) -> np.ndarray:
+        mask = np.zeros(self.size, dtype=bool)
+        mask[rows] = True
+        return mask
+    
+    def _compare(self, name: str, operator: str, text: str, number: Optional[float]) -> np.ndarray:
+        column = self.columns.get(name)
+        if column is None:
+            return np.zeros(self.size, dtype=bool)
+        if operator == '!=':
+            return column.present & ~self._compare(name, '=', text, number)
+        
+        # Text columns such as TAG compare as text even for values like "1A"
+        if number is not None and operator != '~' and len(column.sorted_numbers):
+            values, value = column.sorted_numbers, number
+            bounds = {
+                '=': (np.searchsorted(values, value, 'left'), np.searchsorted(values, value, 'right')),
+                '<': (0, np.searchsorted(values, value, 'left')),
+                '<=': (0, np.searchsorted(values, value, 'right')),
+                '>': (np.searchsorted(values, value, 'right'), len(values)),
+                '>=': (np.searchsorted(values, value, 'left'), len(values)),
+            }[operator]
+            return self._rows_mask(column.number_rows[bounds[0]:bounds[1]])
+        
+        text = text.lower()
+        if operator == '~':
+            rows = [rows for key, rows in column.text_rows.items() if text in key]
+            return self._rows_mask(np.concatenate(rows)) if rows else np.zeros(self.size, dtype=bool)
+        if operator == '=':
+            return self._rows_mask(column.text_rows.get(text, np.empty(0, dtype=np.int64)))
+        # Ordering on text: compare strings
+        keys = [key for key in column.text_rows
+                if {'<': key < text, '<=': key <= text, '>': key > text, '>=': key >= text}[operator]]
+        return self._rows_mask(np.concatenate([column.text_rows[key] for key in keys])) if keys \
+            else np.zeros(self.size, dtype=bool)
+    
+    def evaluate(self, tree: Tuple) -> np.ndarray:
+        """Boolean mask of the rows matching a tree from parse_where()."""
+        kind = tree[0]
+        if kind == 'compare':
+            return self._compare(*tree[1:])
+        if kind == 'not':
+            return ~self.evaluate(tree[1])
+        masks = [self.evaluate(node) for node in tree[1]]
+        return np.logical_and.reduce(masks) if kind == 'and' else np.logical_or.reduce(masks)
+    
+    def query(self, tree: Tuple) -> Dict[int, List[int]]:
+        """
+        Rows matching a tree from parse_where(), grouped by entry.
+        
+        Returns:
+            {entry id: [positions of the matching rows]}
+        """
+        matched: Dict[int, List[int]] = {}
+        for position in np.flatnonzero(self.evaluate(tree)):
+            matched.setdefault(int(self.entry_ids[position]), []).append(int(position))
+        return matched
+    
+    def row(self, position: int) -> Dict[str, Any]:
+        """One row as {column: number, or text if not a number}."""
+        cells = range(self._cell_bounds[position], self._cell_bounds[position + 1])
+        return {self._cell_names[cell]: self._cell_numbers[cell] if self._cell_numbers[cell] is not None
+                else self._cell_texts[cell] for cell in cells}
+    
+    def column_counts(self) -> Dict[str, int]:
+        """Number of rows with a value in each column."""
+        return {name: int(column.present.sum()) for name, column in self.columns.items()}
@@ -0,0 +1,512 @@
+#!/usr/bin/env python3
+"""
+Extraction Search Index
+=======================
+
+Persistent SQLite FTS5 index of the extractions in export folders, so a
+search does not re-read every project_data.json. Each folder is indexed
+when first searched and re-indexed whenever its project_data.json changes
+(size or modification time). Results are ranked with BM25 and carry a
+highlighted snippet of the best-matching field.
+
+The rows of each extraction's schedule tables are stored as typed cells
+(see schedule_tables), one database row per cell, and can filter a search with conditions such as
+HP >= 5 AND VOLTAGE = 460; per-folder column indexes over them are kept
+in memory.
+
+Query syntax:
+    cfm static         both words (any order)
+    "supply fan"       exact phrase
+    vav*               prefix
+    ahu OR rtu         either word
+    -return            exclude a word
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from schedule_tables import ScheduleIndex, extraction_records, parse_where, record_cells
+
+# Indexed fields of an extraction with their BM25 weights
+SEARCH_FIELDS = (
+    ('name', 5.0),
+    ('equipment_type', 3.0),
+    ('extraction_type', 1.0),
+    ('description', 2.0),
+    ('raw_text', 1.0),
+    ('notes', 1.0),
+)
+
+SNIPPET_TOKENS = 12
+SNIPPET_MARKS = ('<mark>', '</mark>')
+
+# Bumped when the indexed fields or tokenizer change; older indexes are rebuilt
+# (2: schedule table rows, 3: schedule cells stored as typed columns)
+INDEX_VERSION = 3
+
+# Folders whose column indexes are kept in memory, most recently used last
+SCHEDULE_INDEX_CACHE_SIZE = 512
+
+_TABLES = ('extractions', 'schedule_rows', 'entries', 'folders')
+
+_QUERY_TOKEN = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def build_match_query(query: str) -> str:
+    """
+    Translate a search box query into an FTS5 MATCH expression.
+    
+    Every word is quoted, so punctuation in equipment tags (AHU-1, 3/4")
+    cannot break the FTS5 syntax; a trailing * makes a word a prefix, OR
+    between words is kept, and a leading - excludes a word.
+    
+    Raises:
+        ValueError: If the query has no searchable words
+    """
+    include: List[str] = []
+    exclude: List[str] = []
+    pending_or = False
+    
+    for match in _QUERY_TOKEN.finditer(query):
+        phrase, word = match.group(1), match.group(2)
+        if word == 'OR':
+            pending_or = bool(include)
+            continue
+        
+        negate = False
+        prefix = False
+        if phrase is None:
+            if word.startswith('-') and len(word) > 1:
+                negate, word = True, word[1:]
+            if word.endswith('*'):
+                prefix, word = True, word.rstrip('*')
+            phrase = word
+        
+        # FTS5 treats a doubled quote inside a string as a literal quote
+        phrase = phrase.replace('"', '""').strip()
+        if not re.search(r'\w', phrase):
+            continue
+        
+        term = f'"{phrase}"' + ('*' if prefix else '')
+        if negate:
+            exclude.append(term)
+        elif pending_or:
+            include[-1] = f"{include[-1]} OR {term}"
+            pending_or = False
+        else:
+            include.append(term)
+    
+    if not include:
+        raise ValueError('Search query has no searchable words')
+    
+    expression = ' AND '.join(f"({term})" if ' OR ' in term else term for term in include)
+    for term in exclude:
+        expression += f" NOT {term}"
+    return expression
+
+
+def extraction_fields(extraction: Dict[str, Any], equipment_type: str) -> Tuple[str, ...]:
+    """Text of the indexed fields of one extraction, in SEARCH_FIELDS order."""
+    ocr_data = extraction.get('ocrData') or {}
+    notes = (ocr_data.get('notes') or {}).get('entries') or []
+    return (
+        extraction.get('extractionName') or '',
+        extraction.get('equipmentType') or equipment_type or '',
+        extraction.get('extractionType') or '',
+        extraction.get('description') or '',
+        ocr_data.get('rawText') or '',
+        ' '.join(str(entry) for entry in notes)
+    )
+
+
+class ExtractionSearchIndex:
+    """Full-text index of the extractions of any number of export folders."""
+    
+    def __init__(self, db_path: str):
+        """
+        Initialize the index, creating the database if needed.
+        
+        Args:
+            db_path: Path to the SQLite database file
+        """
+        self.db_path = db_path
+        self.refreshes = 0
+        self._lock = threading.Lock()
+        self._schedule_indexes: 'OrderedDict[str, Tuple[Tuple[int, int], ScheduleIndex]]' = OrderedDict()
+        self._schedule_lock = threading.Lock()
+        
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+            if version != INDEX_VERSION:
+                for table in _TABLES:
+                    conn.execute(f'DROP TABLE IF EXISTS {table}')
+                conn.execute(f'PRAGMA user_version = {INDEX_VERSION}')
+            
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS folders (
+                    folder_id INTEGER PRIMARY KEY,
+                    folder_path TEXT NOT NULL UNIQUE,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    extraction_count INTEGER NOT NULL,
+                    indexed_at REAL NOT NULL
+                )
+            ''')
+            # Extraction identity lives outside the FTS table so folder filters use a B-tree index
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS entries (
+                    entry_id INTEGER PRIMARY KEY,
+                    folder_id INTEGER NOT NULL,
+                    extraction_id TEXT NOT NULL,
+                    group_type TEXT NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_entries_folder_id ON entries(folder_id)')
+            # One cell per row, typed, so column indexes load without parsing anything
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS schedule_rows (
+                    entry_id INTEGER NOT NULL,
+                    row_number INTEGER NOT NULL,
+                    column_name TEXT NOT NULL,
+                    number REAL,
+                    text TEXT NOT NULL,
+                    alias TEXT
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_schedule_rows_entry_id ON schedule_rows(entry_id, row_number)')
+            columns = ', '.join(name for name, _ in SEARCH_FIELDS)
+            conn.execute(f'''
+                CREATE VIRTUAL TABLE IF NOT EXISTS extractions USING fts5(
+                    {columns},
+                    tokenize = 'unicode61 remove_diacritics 2'
+                )
+            ''')
+    
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection for one operation; this keeps the index safe across threads."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+    
+    def refresh(self, folder_path: str) -> bool:
+        """
+        Re-index a folder if its project_data.json changed since it was indexed.
+        
+        A folder without project_data.json is removed from the index.
+        
+        Returns:
+            bool: True if the folder was (re-)indexed or removed
+        """
+        folder_path = os.path.abspath(folder_path)
+        project_file = os.path.join(folder_path, 'project_data.json')
+        try:
+            stat = os.stat(project_file)
+        except OSError:
+            return self.remove(folder_path)
+        signature = (stat.st_size, stat.st_mtime_ns)
+        
+        with self._connect() as conn:
+            row = conn.execute('SELECT size, mtime_ns FROM folders WHERE folder_path = ?',
+                               (folder_path,)).fetchone()
+        if row and tuple(row) == signature:
+            return False
+        
+        with open(project_file, 'r', encoding='utf-8') as f:
+            project_data = json.load(f)
+        
+        extractions = [(equipment_type, extraction)
+                       for equipment_type, equipment_list in (project_data.get('equipment') or {}).items()
+                       for extraction in equipment_list]
+        columns = ', '.join(name for name, _ in SEARCH_FIELDS)
+        placeholders = ', '.join('?' * len(SEARCH_FIELDS))
+        
+        # One writer at a time, so concurrent searches of a changed folder index it once
+        with self._lock, self._connect() as conn:
+            row = conn.execute('SELECT size, mtime_ns FROM folders WHERE folder_path = ?',
+                               (folder_path,)).fetchone()
+            if row and tuple(row) == signature:
+                return False
+            
+            self._delete_folder(conn, folder_path)
+            folder_id = conn.execute('''
+                INSERT INTO folders (folder_path, size, mtime_ns, extraction_count, indexed_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (folder_path, *signature, len(extractions), time.time())).lastrowid
+            
+            for equipment_type, extraction in extractions:
+                entry_id = conn.execute(
+                    'INSERT INTO entries (folder_id, extraction_id, group_type) VALUES (?, ?, ?)',
+                    (folder_id, json.dumps(extraction.get('id')), equipment_type)
+                ).lastrowid
+                conn.execute(f'INSERT INTO extractions (rowid, {columns}) VALUES (?, {placeholders})',
+                             (entry_id, *extraction_fields(extraction, equipment_type)))
+                conn.executemany('INSERT INTO schedule_rows (entry_id, row_number, column_name, number, text, alias) '
+                                 'VALUES (?, ?, ?, ?, ?, ?)',
+                                 [cell for row_number, record in enumerate(extraction_records(extraction))
+                                  for cell in record_cells(entry_id, row_number, record)])
+        
+        self.refreshes += 1
+        print(f"Indexed {len(extractions)} extractions of {folder_path}", flush=True)
+        return True
+    
+    def _delete_folder(self, conn: sqlite3.Connection, folder_path: str) -> bool:
+        """Delete a folder's rows and forget its column index; returns True if it was indexed."""
+        with self._schedule_lock:
+            self._schedule_indexes.pop(folder_path, None)
+        row = conn.execute('SELECT folder_id FROM folders WHERE folder_path = ?', (folder_path,)).fetchone()
+        if not row:
+            return False
+        for table, column in (('extractions', 'rowid'), ('schedule_rows', 'entry_id')):
+            conn.execute(f'DELETE FROM {table} WHERE {column} IN (SELECT entry_id FROM entries WHERE folder_id = ?)',
+                         (row[0],))
+        conn.execute('DELETE FROM entries WHERE folder_id = ?', (row[0],))
+        conn.execute('DELETE FROM folders WHERE folder_id = ?', (row[0],))
+        return True
+    
+    def indexed_folders(self) -> Dict[str, Tuple[int, int]]:
+        """(size, mtime_ns) of the project_data.json of every indexed folder, by folder path."""
+        with self._connect() as conn:
+            return {row[0]: (row[1], row[2]) for row in conn.execute('SELECT folder_path, size, mtime_ns FROM folders')}
+    
+    def remove(self, folder_path: str) -> bool:
+        """Drop a folder from the index; returns True if it was indexed."""
+        with self._lock, self._connect() as conn:
+            return self._delete_folder(conn, os.path.abspath(folder_path))
+    
+    def _schedule_index(self, conn: sqlite3.Connection, folder_id: int, folder_path: str,
+                        signature: Tuple) -> ScheduleIndex:
+        """Column index of a folder's schedule rows, built once per indexed version of the folder."""
+        with self._schedule_lock:
+            cached = self._schedule_indexes.get(folder_path)
+            if cached and cached[0] == signature:
+                self._schedule_indexes.move_to_end(folder_path)
+                return cached[1]
+        
+        cells = conn.execute('''
+            SELECT entry_id, row_number, column_name, number, text, alias FROM schedule_rows
+            WHERE entry_id IN (SELECT entry_id FROM entries WHERE folder_id = ?)
+            ORDER BY entry_id, row_number
+        ''', (folder_id,)).fetchall()
+        index = ScheduleIndex(cells)
+        
+        with self._schedule_lock:
+            self._schedule_indexes[folder_path] = (signature, index)
+            self._schedule_indexes.move_to_end(folder_path)
+            while len(self._schedule_indexes) > SCHEDULE_INDEX_CACHE_SIZE:
+                self._schedule_indexes.popitem(last=False)
+        return index
+    
+    def _folder_schedule_indexes(self, conn: sqlite3.Connection, folders: Sequence[str]) -> List[ScheduleIndex]:
+        rows = conn.execute(f'''
+            SELECT folder_id, folder_path, size, mtime_ns, indexed_at FROM folders
+            WHERE folder_path IN ({", ".join("?" * len(folders))})
+        ''', folders).fetchall()
+        return [self._schedule_index(conn, folder_id, folder_path, signature)
+                for folder_id, folder_path, *signature in rows]
+    
+    def load_schedule_indexes(self, folder_paths: Sequence[str]) -> int:
+        """
+        Build the column indexes of some folders ahead of their first condition query.
+        
+        At most SCHEDULE_INDEX_CACHE_SIZE folders are loaded, the first ones given.
+        
+        Returns:
+            int: Number of folders whose indexes are loaded
+        """
+        folders = [os.path.abspath(path) for path in folder_paths][:SCHEDULE_INDEX_CACHE_SIZE]
+        if not folders:
+            return 0
+        with self._connect() as conn:
+            return len(self._folder_schedule_indexes(conn, folders))
+    
+    def schedule_columns(self, folder_paths: Sequence[str], refresh: bool = True) -> Dict[str, int]:
+        """
+        Columns of the schedule tables of some folders, for writing conditions.
+        
+        Returns:
+            {column name: number of rows with a value}, most common first
+        """
+        folders = [os.path.abspath(path) for path in folder_paths]
+        if refresh:
+            for folder in folders:
+                self.refresh(folder)
+        if not folders:
+            return {}
+        
+        counts: Dict[str, int] = {}
+        with self._connect() as conn:
+            for index in self._folder_schedule_indexes(conn, folders):
+                for name, count in index.column_counts().items():
+                    counts[name] = counts.get(name, 0) + count
+        return dict(sorted(counts.items(), key=lambda item: (-item[1], item[0])))
+    
+    def search(self, query: Optional[str], folder_paths: Sequence[str], limit: int = 100, offset: int = 0,
+               equipment_types: Optional[Sequence[str]] = None, extraction_types: Optional[Sequence[str]] = None,
+               where: Optional[str] = None, refresh: bool = True) -> Dict[str, Any]:
+        """
+        Search the extractions of some folders, refreshing their index first.
+        
+        Matches are ranked with BM25 first; names and snippets are only read
+        for the page of results returned. Without a query every extraction
+        that passes the filters is returned, ordered by folder, equipment
+        type and name.
+        
+        Args:
+            query: Search box query (see build_match_query()), or None
+            folder_paths: Export folders to search
+            limit: Maximum number of results
+            offset: Number of results to skip
+            equipment_types: Only return extractions of these equipment
+                groups (case-insensitive)
+            extraction_types: Only return these extraction types
+                (case-insensitive)
+            where: Only return extractions with a schedule table row
+                matching these conditions (see schedule_tables), e.g.
+                "CFM > 5000"; each result then carries the matching 'rows'
+            refresh: Re-index changed folders first; callers that keep the
+                folders fresh themselves (the project catalog) skip this
+        
+        Returns:
+            Dictionary with 'results' (best first, each with 'id',
+            'extractionName', 'equipmentType', 'extractionType',
+            'folder_path', 'relevance' and 'snippet'), 'total_found' and
+            'folders_refreshed'
+        
+        Raises:
+            ValueError: If the query has no searchable words or the
+                conditions cannot be parsed
+        """
+        match = build_match_query(query) if query is not None else None
+        conditions_tree = parse_where(where) if where is not None else None
+        folders = [os.path.abspath(path) for path in folder_paths]
+        refreshed = sum(1 for folder in folders if self.refresh(folder)) if refresh else 0
+        if not folders:
+            return {'results': [], 'total_found': 0, 'folders_refreshed': refreshed}
+        
+        with self._connect() as conn:
+            folder_ids = [row[0] for row in conn.execute(
+                f'SELECT folder_id FROM folders WHERE folder_path IN ({", ".join("?" * len(folders))})', folders
+            )]
+            if not folder_ids:
+                return {'results': [], 'total_found': 0, 'folders_refreshed': refreshed}
+            
+            conditions = [f'entries.folder_id IN ({", ".join("?" * len(folder_ids))})']
+            params: List[Any] = list(folder_ids)
+            
+            # Matching rows by entry; row records are only built for the page of results returned
+            matched_rows: Dict[int, Tuple[ScheduleIndex, List[int]]] = {}
+            if conditions_tree is not None:
+                for index in self._folder_schedule_indexes(conn, folders):
+                    for entry_id, positions in index.query(conditions_tree).items():
+                        matched_rows[entry_id] = (index, positions)
+                if not matched_rows:
+                    return {'results': [], 'total_found': 0, 'folders_refreshed': refreshed}
+                # One JSON parameter instead of one per id, which could exceed SQLite's variable limit
+                conditions.append('entries.entry_id IN (SELECT value FROM json_each(?))')
+                params.append(json.dumps(list(matched_rows)))
+            if match is not None:
+                conditions.insert(0, 'extractions MATCH ?')
+                params.insert(0, match)
+            for column, values in (('entries.group_type', equipment_types),
+                                   ('extractions.extraction_type', extraction_types)):
+                if values:
+                    conditions.append(f'LOWER({column}) IN ({", ".join("?" * len(values))})')
+                    params.extend(str(value).lower() for value in values)
+            where = ' AND '.join(conditions)
+            
+            total = conn.execute(f'''
+                SELECT COUNT(*) FROM extractions JOIN entries ON entries.entry_id = extractions.rowid
+                WHERE {where}
+            ''', params).fetchone()[0]
+            if match is not None:
+                weights = ', '.join(str(weight) for _, weight in SEARCH_FIELDS)
+                ranked = conn.execute(f'''
+                    SELECT extractions.rowid, bm25(extractions, {weights}) AS score
+                    FROM extractions JOIN entries ON entries.entry_id = extractions.rowid
+                    WHERE {where}
+                    ORDER BY score LIMIT ? OFFSET ?
+                ''', (*params, limit, offset)).fetchall()
+            else:
+                ranked = conn.execute(f'''
+                    SELECT extractions.rowid, NULL
+                    FROM extractions JOIN entries ON entries.entry_id = extractions.rowid
+                    WHERE {where}
+                    ORDER BY entries.folder_id, entries.group_type, extractions.name LIMIT ? OFFSET ?
+                ''', (*params, limit, offset)).fetchall()
+            
+            details = {}
+            if ranked:
+                rowids = [rowid for rowid, _ in ranked]
+                # snippet() is only defined for rows found through MATCH
+                if match is not None:
+                    snippet, snippet_params = "snippet(extractions, -1, ?, ?, '…', ?)", [*SNIPPET_MARKS, SNIPPET_TOKENS]
+                    match_filter, match_params = 'extractions MATCH ? AND', [match]
+                else:
+                    snippet, snippet_params, match_filter, match_params = "''", [], '', []
+                details = {row[0]: row[1:] for row in conn.execute(f'''
+                    SELECT extractions.rowid, entries.extraction_id, extractions.name, entries.group_type,
+                           extractions.extraction_type, folders.folder_path, {snippet}
+                    FROM extractions
+                    JOIN entries ON entries.entry_id = extractions.rowid
+                    JOIN folders ON folders.folder_id = entries.folder_id
+                    WHERE {match_filter} extractions.rowid IN ({", ".join("?" * len(rowids))})
+                ''', (*snippet_params, *match_params, *rowids))}
+        
+        results = []
+        for rowid, score in ranked:
+            extraction_id, name, group_type, extraction_type, folder_path, snippet = details[rowid]
+            result = {
+                'id': json.loads(extraction_id),
+                'extractionName': name,
+                'equipmentType': group_type,
+                'extractionType': extraction_type,
+                'folder_path': folder_path,
+                # bm25() is lower for better matches
+                'relevance': round(-score, 4) if score is not None else None,
+                'snippet': snippet
+            }
+            if conditions_tree is not None:
+                index, positions = matched_rows[rowid]
+                result['rows'] = [index.row(position) for position in positions]
+            results.append(result)
+        
+        return {'results': results, 'total_found': total, 'folders_refreshed': refreshed}
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get index statistics."""
+        with self._connect() as conn:
+            folders, extractions = conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(extraction_count), 0) FROM folders'
+            ).fetchone()
+            schedule_rows = conn.execute(
+                'SELECT COUNT(*) FROM (SELECT DISTINCT entry_id, row_number FROM schedule_rows)').fetchone()[0]
+        return {
+            'indexed_folders': folders,
+            'indexed_extractions': extractions,
+            'schedule_rows': schedule_rows,
+            'schedule_indexes_loaded': len(self._schedule_indexes),
+            'refreshes': self.refreshes,
+            'db_path': self.db_path
+        }
+    
+    def clear(self) -> None:
+        """Remove every indexed folder."""
+        with self._lock, self._connect() as conn:
+            for table in _TABLES:
+                conn.execute(f'DELETE FROM {table}')
+        with self._schedule_lock:
+            self._schedule_indexes.clear()
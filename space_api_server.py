@@ -8,15 +8,34 @@ Provides REST API endpoints for detecting and managing BlueBeam Spaces.
 
 from flask import Flask, request, jsonify, send_file, make_response
 from flask_cors import CORS
+import io
 import os
 import json
+import shutil
 import tempfile
 import hashlib
 import base64
+import threading
+import uuid
+from collections import OrderedDict
 from datetime import datetime
 from pathlib import Path
 from werkzeug.utils import secure_filename
-from bluebeam_space_handler import BlueBeamSpaceHandler
+from bluebeam_space_handler import DETECTION_MODES, BlueBeamSpace, BlueBeamSpaceHandler
+from space_cache import SpaceCache
+from space_index import SpaceIndex
+from file_hashing import FileHashIndex
+from equipment_pdfs import create_consolidated_equipment_pdfs, resolve_image_profile
+from zip_stream import MultipartFileStream, extract_zip_stream
+from job_queue import JobCancelled, JobQueue, FINAL_STATES
+from page_render import (DEFAULT_REGION_DPI, DocumentPool, RenderCache, extraction_regions, parse_region,
+                         region_cache_key, region_output_path, render_region, render_regions_batch)
+from search_index import ExtractionSearchIndex
+from project_catalog import ProjectCatalog
+from path_index import PathIndex
+from directory_listing import LISTING_TTL_SECONDS, SORT_KEYS, DirectoryListing, DirectoryListingCache
+from page_tiles import (THUMBNAIL_SIZE, TILE_SIZE, page_layout, render_thumbnail, render_tile, thumbnail_cache_key,
+                        tile_cache_key)
 import fitz  # PyMuPDF for PDF generation
 
 app = Flask(__name__)
@@ -26,9 +45,88 @@ CORS(app, resources={r"/api/*": {"origins": "*", "methods": ["GET", "POST", "DEL
 UPLOAD_FOLDER = tempfile.gettempdir()
 ALLOWED_EXTENSIONS = {'pdf'}
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # Read uploads in 1MB chunks
+DETECTION_MODE = 'full_scan'  # Default Space detection mode (see BlueBeamSpaceHandler.detect_all_spaces)
+DETECTION_WORKERS = os.cpu_count() or 1  # Worker processes for full_scan detection of PDFs opened by path
+EXPORT_PDF_WORKERS = os.cpu_count() or 1  # Worker processes for consolidated equipment PDFs
+EXPORT_IMAGE_PROFILE = 'original'  # Default image recompression profile (see equipment_pdfs.IMAGE_PROFILES)
 
-# In-memory cache for detected spaces (production should use Redis/database)
-spaces_cache = {}
+# Persistent cache for detected spaces, shared across restarts and worker processes
+CACHE_DIR = os.path.expanduser('~/.pdfextractor_cache')
+SPACE_CACHE_MAX_BYTES = 512 * 1024 * 1024  # 512MB of compressed results
+SPACE_CACHE_MAX_AGE = 30 * 24 * 3600  # Evict results unused for 30 days
+spaces_cache = SpaceCache(os.path.join(CACHE_DIR, 'spaces.sqlite3'),
+                          max_bytes=SPACE_CACHE_MAX_BYTES,
+                          max_age_seconds=SPACE_CACHE_MAX_AGE)
+
+# (path, size, mtime, inode) -> SHA256 index so unchanged files are not re-read
+file_hash_index = FileHashIndex(os.path.join(CACHE_DIR, 'file_hashes.sqlite3'))
+
+# Bumped when the shape or meaning of cached detection results changes
+# (2: 'area' is the polygon area instead of the bounding box area,
+#  3: results record the 'detection_mode' they were detected with)
+SPACES_RESULT_VERSION = 3
+
+# Structures built from cached results (spatial indexes, per-page views),
+# most recently used last
+SPACE_INDEX_CACHE_SIZE = 16
+space_indexes = OrderedDict()
+space_page_views = OrderedDict()
+space_memo_lock = threading.Lock()
+
+# Result keys only kept in the cache, for incremental detection
+SPACES_INTERNAL_KEYS = ('page_fingerprints',)
+
+# Result keys left out of summary responses (the bulk of a large result)
+SPACES_SUMMARY_EXCLUDED_KEYS = ('spaces',) + SPACES_INTERNAL_KEYS
+
+# Background jobs (exports run with 'async'), persisted so a restart does not lose track of them
+JOB_WORKERS = 2
+job_queue = JobQueue(os.path.join(CACHE_DIR, 'jobs.sqlite3'), workers=JOB_WORKERS)
+
+# Server-side rendering of extraction regions: rendered images by (file hash, page, rect, dpi)
+RENDER_CACHE_MAX_BYTES = 1024 * 1024 * 1024  # 1GB of encoded images
+render_cache = RenderCache(os.path.join(CACHE_DIR, 'renders.sqlite3'), max_bytes=RENDER_CACHE_MAX_BYTES)
+open_documents = DocumentPool(max_open=4)
+RENDER_WORKERS = os.cpu_count() or 1  # Worker processes for batch region rendering
+TILE_BROWSER_CACHE_SECONDS = 7 * 24 * 3600  # Thumbnails and tiles never change for a given file hash
+
+# Full-text index of export folders for /api/search-extractions, refreshed when project_data.json changes
+search_index = ExtractionSearchIndex(os.path.join(CACHE_DIR, 'search.sqlite3'))
+SEARCH_RESULT_LIMIT = 100
+
+# Catalog of the export folders under these roots (plus roots added through /api/catalog/roots),
+# re-crawled in the background so /api/catalog/search covers every job
+CATALOG_ROOTS = [os.getcwd()]
+CATALOG_POLL_SECONDS = 60
+project_catalog = ProjectCatalog(os.path.join(CACHE_DIR, 'catalog.sqlite3'), search_index,
+                                 roots=CATALOG_ROOTS, poll_interval=CATALOG_POLL_SECONDS)
+
+
+def common_pdf_directories():
+    """Directories drawing sets are usually opened from."""
+    if os.path.exists('/mnt/c/Users'):
+        # WSL: every Windows user's folders
+        roots = ['/mnt/c/Users']
+    else:
+        home = Path.home()
+        roots = [str(home / 'Documents'), str(home / 'Downloads'), str(home / 'Desktop')]
+    return roots + [os.getcwd()]
+
+
+# Name -> paths index of the PDFs under these roots for /api/find-file, crawled in the background
+PATH_INDEX_ROOTS = common_pdf_directories()
+PATH_INDEX_POLL_SECONDS = 600
+path_index = PathIndex(os.path.join(CACHE_DIR, 'paths.sqlite3'), roots=PATH_INDEX_ROOTS,
+                       poll_interval=PATH_INDEX_POLL_SECONDS)
+
+# Directory listings for the file picker (/api/browse), reused while the directory is unchanged
+browse_cache = DirectoryListingCache(ttl=LISTING_TTL_SECONDS)
+
+# Progress of streamed exports by upload id, most recent last
+EXPORT_PROGRESS_SIZE = 64
+export_progress = OrderedDict()
+export_progress_lock = threading.Lock()
 
 
 def allowed_file(filename):
@@ -37,12 +135,203 @@ def allowed_file(filename):
 
 
 def get_file_hash(file_path):
-    """Generate SHA256 hash of file for caching."""
+    """Get SHA256 hash of file for caching, skipping the read if the file is unchanged."""
+    return file_hash_index.get_hash(file_path)
+
+
+def read_upload(stream, max_size):
+    """Read an upload stream once, hashing it as it is buffered.
+    
+    Args:
+        stream: File-like object to read from
+        max_size (int): Maximum number of bytes to accept
+        
+    Returns:
+        tuple: (data, file_hash) where data is a bytearray, or (None, None)
+        if the stream is larger than max_size
+    """
     sha256_hash = hashlib.sha256()
-    with open(file_path, "rb") as f:
-        for byte_block in iter(lambda: f.read(4096), b""):
-            sha256_hash.update(byte_block)
-    return sha256_hash.hexdigest()
+    data = bytearray()
+    
+    while True:
+        chunk = stream.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        if len(data) + len(chunk) > max_size:
+            return None, None
+        sha256_hash.update(chunk)
+        data += chunk
+    
+    return data, sha256_hash.hexdigest()
+
+
+def get_cached_spaces_result(file_hash, mode=None):
+    """Look up a cached detection result, ignoring results from older versions.
+    
+    Args:
+        file_hash (str): SHA256 of the PDF
+        mode (str): If given, results detected with another mode are ignored
+        
+    Returns:
+        dict: Cached detection result, or None
+    """
+    result = spaces_cache.get(file_hash)
+    if result is None or result.get('result_version') != SPACES_RESULT_VERSION:
+        return None
+    if mode is not None and result.get('detection_mode') != mode:
+        return None
+    return result
+
+
+def store_spaces_result(file_hash, result):
+    """Cache a detection result, dropping structures built from the one it replaces."""
+    spaces_cache.put(file_hash, result)
+    with space_memo_lock:
+        for key in [key for key in space_indexes if key[0] == file_hash]:
+            del space_indexes[key]
+        space_page_views.pop(file_hash, None)
+
+
+def get_detection_mode(value):
+    """Validate a requested detection mode, defaulting to DETECTION_MODE.
+    
+    Raises:
+        ValueError: If the mode is not one of DETECTION_MODES
+    """
+    mode = value or DETECTION_MODE
+    if mode not in DETECTION_MODES:
+        raise ValueError(f"Unknown detection mode '{mode}', expected one of {', '.join(DETECTION_MODES)}")
+    return mode
+
+
+def get_memoized(memo, key, file_hash, build):
+    """Get a structure derived from a cached detection result, building it on first use.
+    
+    Args:
+        memo (OrderedDict): LRU of built structures
+        key: Memo key
+        file_hash (str): SHA256 of the PDF whose cached result is used
+        build (callable): Called with the cached result to build the structure
+        
+    Returns:
+        The built structure, or None if the file is not cached
+    """
+    with space_memo_lock:
+        if key in memo:
+            memo.move_to_end(key)
+            return memo[key]
+    
+    result = get_cached_spaces_result(file_hash)
+    if result is None:
+        return None
+    
+    value = build(result)
+    
+    with space_memo_lock:
+        memo[key] = value
+        while len(memo) > SPACE_INDEX_CACHE_SIZE:
+            memo.popitem(last=False)
+    
+    return value
+
+
+def get_space_index(file_hash, coordinate_system):
+    """Get the spatial index ('pymupdf' or 'pdf' coordinates) for a cached result."""
+    return get_memoized(
+        space_indexes, (file_hash, coordinate_system), file_hash,
+        lambda result: SpaceIndex([BlueBeamSpace.from_dict(space) for space in result['spaces']],
+                                  coordinate_system))
+
+
+def public_spaces_result(result):
+    """Drop the keys only used internally (fingerprints) from a detection result."""
+    return {key: value for key, value in result.items() if key not in SPACES_INTERNAL_KEYS}
+
+
+def summarize_spaces_result(result):
+    """Drop the Space polygons and fingerprints from a detection result."""
+    return {key: value for key, value in result.items() if key not in SPACES_SUMMARY_EXCLUDED_KEYS}
+
+
+def build_page_view(result):
+    """Split a detection result into its summary and the spaces of each page."""
+    page_spaces = {page_num: [] for page_num in range(result['page_count'])}
+    for space in result['spaces']:
+        page_spaces.setdefault(space['page_number'], []).append(space)
+    
+    return {'summary': summarize_spaces_result(result), 'page_spaces': page_spaces}
+
+
+def get_page_view(file_hash):
+    """Get the per-page view of a cached result, or None if the file is not cached."""
+    return get_memoized(space_page_views, file_hash, file_hash, build_page_view)
+
+
+def build_spaces_result(handler, filename, file_hash, mode=DETECTION_MODE, previous_result=None):
+    """Run Space detection on an open handler and build the result that is cached.
+    
+    In "targeted" mode, if previous_result (the cached result for an earlier
+    revision of the same drawing set) has page fingerprints, only pages whose
+    fingerprints changed are re-parsed and the Spaces of the other pages are
+    reused. "full_scan" always inspects the whole document, since incremental
+    detection only finds Spaces referenced from the pages.
+    
+    Args:
+        handler (BlueBeamSpaceHandler): Handler with the PDF open
+        filename (str): Name reported in the response
+        file_hash (str): SHA256 of the PDF
+        mode (str): Detection mode, one of DETECTION_MODES
+        previous_result (dict): Optional cached result of a previous revision
+        
+    Returns:
+        dict: Detection result, including the 'page_fingerprints' kept out of
+        responses (see public_spaces_result()) and the 'recomputed_pages'
+        that were parsed for this result
+    """
+    page_count = handler.doc.page_count
+    fingerprints = handler.compute_page_fingerprints()
+    
+    incremental = bool(mode == 'targeted' and previous_result and previous_result.get('page_fingerprints'))
+    
+    if incremental:
+        previous_spaces = [BlueBeamSpace.from_dict(space) for space in previous_result['spaces']]
+        spaces, recomputed_pages = handler.detect_spaces_incremental(
+            previous_spaces, previous_result['page_fingerprints'], fingerprints)
+        print(f"Incremental detection: recomputed {len(recomputed_pages)} of {page_count} pages "
+              f"(previous revision {previous_result['file_hash'][:12]})")
+    else:
+        spaces = handler.detect_all_spaces(mode=mode, workers=DETECTION_WORKERS)
+        recomputed_pages = list(range(page_count))
+    
+    # Prepare response data
+    result = {
+        'success': True,
+        'result_version': SPACES_RESULT_VERSION,
+        'filename': filename,
+        'file_hash': file_hash,
+        'detection_mode': mode,
+        'page_count': page_count,
+        'total_spaces': len(spaces),
+        'spaces': [space.to_dict() for space in spaces],
+        'pages': [],
+        'recomputed_pages': recomputed_pages,
+        'incremental_from': previous_result['file_hash'] if incremental else None,
+        'page_fingerprints': fingerprints
+    }
+    
+    # Add page information, grouping the spaces by page once
+    spaces_by_page = {}
+    for space in spaces:
+        spaces_by_page.setdefault(space.page_number, []).append(space)
+    
+    for page_num in range(page_count):
+        page_info = handler.get_page_info(page_num)
+        page_spaces = spaces_by_page.get(page_num, [])
+        page_info['space_count'] = len(page_spaces)
+        page_info['space_titles'] = [s.title for s in page_spaces]
+        result['pages'].append(page_info)
+    
+    return result
 
 
 def convert_windows_path(windows_path):
@@ -128,338 +417,391 @@ def convert_windows_path(windows_path):
         return None, error_msg
 
 
-def create_consolidated_equipment_pdfs(export_folder_path):
+def find_previous_export(pdf_dir, safe_pdf_name, exclude_folder=None):
     """
-    Create consolidated PDF files for each equipment type folder with extraction type sorting.
+    Find the most recent earlier export folder of a PDF.
+    
+    Export folders are named '<pdf name>_extractions_<YYYYmmdd_HHMMSS>', so
+    the latest one sorts last.
     
     Args:
-        export_folder_path (str): Path to the export folder containing equipment directories
-        
+        pdf_dir: Directory the PDF and its export folders live in
+        safe_pdf_name: Truncated PDF name used in the folder names
+        exclude_folder: Folder name to skip (the export being created)
+    
+    Returns:
+        str: Path of the latest earlier export folder, or None
+    """
+    prefix = f"{safe_pdf_name}_extractions_"
+    try:
+        candidates = [
+            entry.name for entry in os.scandir(pdf_dir)
+            if entry.is_dir() and entry.name.startswith(prefix) and entry.name != exclude_folder
+            and entry.name[len(prefix):].replace('_', '').isdigit()
+        ]
+    except OSError:
+        return None
+    
+    return os.path.join(pdf_dir, max(candidates)) if candidates else None
+
+
+def prepare_export_folder(pdf_path):
+    """Resolve the PDF an export belongs to and name its timestamped export folder.
+    
+    Args:
+        pdf_path (str): Windows or WSL path of the PDF, possibly quoted
+    
     Returns:
-        int: Number of consolidated PDF files created
+        tuple: (export, error_message) where export is a dict with 'pdf_dir',
+        'safe_pdf_name', 'timestamp', 'folder_name' and 'folder_path', or
+        (None, error_message) if the path could not be converted
     """
+    # Remove any surrounding quotes from the path
+    pdf_path = pdf_path.strip('"').strip("'")
     
-    # Extraction type priority order (SCHEDULE first, DRAWING second, DETAIL third, others after)
-    extraction_type_priority = ['schedule', 'drawing', 'detail', 'table', 'specification', 'other']
+    print(f"Received PDF path: {pdf_path}", flush=True)
     
-    def get_extraction_type_priority(extraction_type):
-        """Get priority index for sorting (lower = higher priority)"""
-        try:
-            return extraction_type_priority.index(extraction_type.lower())
-        except ValueError:
-            # Unknown extraction types go to the end
-            return len(extraction_type_priority)
+    # Convert Windows path to WSL path if necessary
+    converted_path, error_msg = convert_windows_path(pdf_path)
+    if error_msg:
+        return None, f'Path conversion failed: {error_msg}'
+    pdf_path = converted_path
+    
+    # Get directory and name of PDF
+    pdf_dir = os.path.dirname(pdf_path)
+    pdf_name = os.path.splitext(os.path.basename(pdf_path))[0]
+    
+    # Create export folder name with timestamp
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    # Limit filename length to avoid issues
+    safe_pdf_name = pdf_name[:50] if len(pdf_name) > 50 else pdf_name
+    export_folder_name = f"{safe_pdf_name}_extractions_{timestamp}"
+    
+    return {
+        'pdf_dir': pdf_dir,
+        'safe_pdf_name': safe_pdf_name,
+        'timestamp': timestamp,
+        'folder_name': export_folder_name,
+        'folder_path': os.path.join(pdf_dir, export_folder_name)
+    }, None
+
+
+def generate_export_pdfs(export, image_profile, incremental=True, progress=None, should_cancel=None):
+    """Build the consolidated equipment PDFs of an extracted export folder.
+    
+    Args:
+        export (dict): Export folder from prepare_export_folder()
+        image_profile (dict): Recompression profile from resolve_image_profile()
+        incremental (bool): Reuse unchanged pages of the previous export's PDFs
+        progress (callable): Optional (done, total, equipment_type) callback
+        should_cancel (callable): Optional callback that stops the build when it returns True
+    
+    Returns:
+        dict: Statistics from create_consolidated_equipment_pdfs()
+    """
+    print("Generating consolidated PDFs by equipment type...", flush=True)
+    
+    previous_export_path = None
+    if incremental:
+        previous_export_path = find_previous_export(export['pdf_dir'], export['safe_pdf_name'],
+                                                    export['folder_name'])
+        if previous_export_path:
+            print(f"Reusing unchanged pages from previous export: {previous_export_path}", flush=True)
+    
+    # Create consolidated PDFs with extraction type sorting
+    pdf_stats = create_consolidated_equipment_pdfs(export['folder_path'], workers=EXPORT_PDF_WORKERS,
+                                                   image_profile=image_profile,
+                                                   previous_export_path=previous_export_path,
+                                                   progress=progress, should_cancel=should_cancel)
+    pdfs_created = pdf_stats['pdfs_created']
     
-    pdfs_created = 0
+    if pdfs_created > 0:
+        print(f"✅ Generated {pdfs_created} consolidated PDF files (one per equipment type)", flush=True)
+    else:
+        print("⚠️  No consolidated PDFs were created (no equipment folders or PNG files found)", flush=True)
     
+    return pdf_stats
+
+
+def export_response(export, zip_stats=None, pdf_stats=None):
+    """Response body of a finished export (also the result of export jobs)."""
+    # Exports land next to their PDF, so the PDF's directory becomes a catalog root
     try:
-        # Look for project_data.json to get extraction metadata
-        project_data_path = os.path.join(export_folder_path, 'project_data.json')
-        extraction_metadata = {}
-        
-        if os.path.exists(project_data_path):
-            print(f"Loading extraction metadata from: {project_data_path}", flush=True)
-            with open(project_data_path, 'r') as f:
-                project_data = json.load(f)
-                
-                # Build complete extraction metadata (not just image files)
-                extraction_metadata = {}
-                for equipment_type, extractions in project_data.get('equipment', {}).items():
-                    for extraction in extractions:
-                        extraction_id = extraction.get('id', 0)
-                        extraction_type = extraction.get('extractionType', 'other')
-                        extraction_name = extraction.get('extractionName', 'Unknown')
-                        is_full_page = extraction.get('isFullPage', False)
-                        
-                        # Store metadata by equipment type and ID
-                        if equipment_type not in extraction_metadata:
-                            extraction_metadata[equipment_type] = []
-                            
-                        extraction_metadata[equipment_type].append({
-                            'id': extraction_id,
-                            'type': extraction_type,
-                            'name': extraction_name,
-                            'is_full_page': is_full_page,
-                            'page_number': extraction.get('coordinates', {}).get('page', 1) if is_full_page else None,
-                            'image_file': extraction.get('files', {}).get('image') if not is_full_page else None
-                        })
-        else:
-            print("No project_data.json found, using filename-based sorting", flush=True)
-        
-        # Get the original PDF path for full page extractions
-        original_pdf_path = None
-        if project_data and 'originalPdfPath' in project_data:
-            original_pdf_path = project_data['originalPdfPath']
-        
-        # Process each equipment type
-        if project_data_path and os.path.exists(project_data_path):
-            # Use metadata-driven approach for equipment types with extractions
-            for equipment_type, extractions_list in extraction_metadata.items():
-                equipment_dir = os.path.join(export_folder_path, equipment_type)
-                
-                # Skip if equipment directory doesn't exist
-                if not os.path.isdir(equipment_dir):
-                    continue
-                    
-                print(f"Processing equipment directory: {equipment_type}", flush=True)
-                
-                if not extractions_list:
-                    print(f"No extractions found for {equipment_type}, skipping", flush=True)
-                    continue
-                
-                # Sort extractions by type priority, then by ID for consistency
-                extractions_list.sort(key=lambda x: (get_extraction_type_priority(x['type']), x['id']))
-                
-                print(f"Creating consolidated PDF for {equipment_type} with {len(extractions_list)} extractions:", flush=True)
-                for extraction in extractions_list:
-                    content_type = "Full Page" if extraction['is_full_page'] else "PNG Extraction"
-                    print(f"  - {extraction['type'].upper()}: {extraction['name']} ({content_type})", flush=True)
-                
-                # Create consolidated PDF
-                consolidated_pdf_path = os.path.join(equipment_dir, f"{equipment_type}_extractions.pdf")
+        project_catalog.add_root(export['pdf_dir'])
+        project_catalog.refresh_project(export['folder_path'])
+    except ValueError as e:
+        print(f"⚠️  Export not catalogued: {e}", flush=True)
+    
+    response = {
+        'success': True,
+        'path': export['folder_path'],
+        'filename': export['folder_name'],
+        'message': f"Exported to folder: {export['folder_name']}",
+        'is_folder': True,
+        'pdf_stats': pdf_stats
+    }
+    if zip_stats is not None:
+        response['entries'] = zip_stats['entries']
+        response['bytes_written'] = zip_stats['bytes_written']
+    return response
+
+
+def export_job(export, image_profile, incremental, include_pdfs, zip_bytes=None, zip_stats=None):
+    """Build the background part of an export as a job function.
+    
+    Args:
+        export (dict): Export folder from prepare_export_folder()
+        image_profile (dict): Recompression profile from resolve_image_profile()
+        incremental (bool): Reuse unchanged pages of the previous export's PDFs
+        include_pdfs (bool): Build the consolidated equipment PDFs
+        zip_bytes (bytes): ZIP to extract in the 'extract' stage, or None if
+            the folder was already extracted
+        zip_stats (dict): Extraction statistics when already extracted
+    
+    Returns:
+        callable: Function run by job_queue with the job's JobContext
+    """
+    def run(context):
+        extracted = zip_stats
+        
+        if zip_bytes is not None:
+            with context.stage('extract'):
+                def report(bytes_read, entries):
+                    context.progress('extract', bytes_read / max(len(zip_bytes), 1), entries=entries)
+                    context.check_cancelled()
                 
                 try:
-                    doc = fitz.open()
-                    
-                    for extraction in extractions_list:
-                        print(f"Adding page: {extraction['name']} ({extraction['type']})", flush=True)
-                        
-                        if extraction['is_full_page']:
-                            # Handle full page extraction
-                            if not original_pdf_path or not os.path.exists(original_pdf_path):
-                                print(f"⚠️  Original PDF not found for full page extraction: {extraction['name']}", flush=True)
-                                continue
-                                
-                            print(f"Inserting full PDF page {extraction['page_number']} from {original_pdf_path}", flush=True)
-                            
-                            # Open source PDF and copy the specific page
-                            source_doc = fitz.open(original_pdf_path)
-                            page_num = extraction['page_number'] - 1  # Convert to 0-based indexing
-                            
-                            if page_num < 0 or page_num >= len(source_doc):
-                                print(f"❌ Invalid page number {extraction['page_number']} for {extraction['name']}", flush=True)
-                                source_doc.close()
-                                continue
-                                
-                            # Insert the full page
-                            doc.insert_pdf(source_doc, from_page=page_num, to_page=page_num)
-                            source_doc.close()
-                            
-                            # Apply flattening and optimization to the inserted page
-                            inserted_page_idx = len(doc) - 1  # The page we just inserted
-                            inserted_page = doc[inserted_page_idx]
-                            
-                            print(f"Flattening and optimizing page {extraction['page_number']}...", flush=True)
-                            
-                            # Step 1: Flatten annotations, form fields, and interactive elements
-                            # Remove all annotations (flatten them into the page content)
-                            annots_to_remove = []
-                            for annot in inserted_page.annots():
-                                annots_to_remove.append(annot)
-                            
-                            for annot in annots_to_remove:
-                                # Apply redaction to flatten annotation content
-                                try:
-                                    annot.update()  # Ensure annotation is rendered
-                                except:
-                                    pass
-                                inserted_page.delete_annot(annot)
-                            
-                            # Step 2: Remove form fields and widgets
-                            for widget in inserted_page.widgets():
-                                try:
-                                    inserted_page.delete_widget(widget)
-                                except:
-                                    pass
-                            
-                            # Step 3: Clean and optimize page content streams
-                            inserted_page.clean_contents()  # Optimize content stream
-                            
-                            # Step 4: Remove optional content groups (layers) by flattening them
-                            try:
-                                # Get the page's resources and remove optional content references
-                                page_resources = inserted_page.get_contents()
-                                if page_resources:
-                                    # This helps flatten any layer-based content
-                                    inserted_page.wrap_contents()
-                            except Exception as e:
-                                print(f"Note: Could not optimize page layers: {str(e)}", flush=True)
-                            
-                        else:
-                            # Handle PNG-based extraction 
-                            if not extraction['image_file']:
-                                print(f"⚠️  No image file found for extraction: {extraction['name']}", flush=True)
-                                continue
-                                
-                            png_path = os.path.join(equipment_dir, os.path.basename(extraction['image_file']))
-                            
-                            if not os.path.exists(png_path):
-                                print(f"⚠️  PNG file not found: {png_path}", flush=True)
-                                continue
-                            
-                            # Load and optimize the PNG image before inserting
-                            with open(png_path, 'rb') as f:
-                                png_data = f.read()
-                            
-                            # Open image to get dimensions
-                            img = fitz.open(png_path)
-                            page_rect = img[0].rect
-                            img.close()
-                            
-                            # Create a new page with the same dimensions as the image
-                            page = doc.new_page(width=page_rect.width, height=page_rect.height)
-                            
-                            # Insert image with compression settings for smaller file size
-                            # Use JPEG compression for better file size (good quality, much smaller)
-                            page.insert_image(page_rect, stream=png_data, keep_proportion=True)
-                    
-                    # Document-level optimization and scrubbing
-                    print("Applying document-level optimizations...", flush=True)
-                    
-                    # Step 5: Scrub the document to remove sensitive data and optimize structure
-                    # This removes unused objects, optimizes cross-reference table, and removes metadata
-                    try:
-                        doc.scrub(attached_files=True, clean_pages=True, 
-                                 remove_links=False, reset_fields=True, 
-                                 reset_responses=True)
-                        print("Document scrubbing completed", flush=True)
-                    except Exception as e:
-                        print(f"Note: Document scrubbing had issues: {str(e)}", flush=True)
-                    
-                    # Step 6: Final garbage collection and resource cleanup
-                    # Remove any remaining unused fonts, images, and objects
-                    try:
-                        # Additional cleanup - remove unused resources
-                        for page_num in range(len(doc)):
-                            page = doc[page_num]
-                            # Clean any remaining content issues
-                            page.clean_contents()
-                        print("Final page content optimization completed", flush=True)
-                    except Exception as e:
-                        print(f"Note: Final optimization had issues: {str(e)}", flush=True)
-                    
-                    # Save the consolidated PDF with maximum compression and optimization
-                    print("Saving optimized PDF...", flush=True)
-                    doc.save(consolidated_pdf_path, 
-                            garbage=4,          # Garbage collect unused objects (maximum level)
-                            deflate=True,       # Enable deflate compression for streams
-                            clean=True,         # Clean and optimize the PDF structure  
-                            pretty=False,       # Compress structure (no pretty formatting)
-                            encryption=fitz.PDF_ENCRYPT_NONE,  # No encryption overhead
-                            permissions=-1,     # No permission restrictions
-                            expand=False)       # Keep compressed streams compressed
-                    doc.close()
-                    
-                    print(f"✅ Consolidated PDF created: {consolidated_pdf_path}", flush=True)
-                    pdfs_created += 1
-                    
-                except Exception as pdf_error:
-                    print(f"❌ Failed to create consolidated PDF for {equipment_type}: {str(pdf_error)}", flush=True)
-        else:
-            # Fallback to old PNG-only approach for backwards compatibility
-            print("Using fallback PNG-only processing", flush=True)
-            
-            for item in os.listdir(export_folder_path):
-                equipment_dir = os.path.join(export_folder_path, item)
-                
-                # Skip files, only process directories (equipment folders)
-                if not os.path.isdir(equipment_dir):
-                    continue
-                    
-                print(f"Processing equipment directory: {item}", flush=True)
-                
-                # Collect PNG files in this equipment directory
-                png_files = []
-                for file in os.listdir(equipment_dir):
-                    if file.lower().endswith('.png'):
-                        png_path = os.path.join(equipment_dir, file)
-                        png_files.append({
-                            'path': png_path,
-                            'filename': file,
-                            'extraction_type': 'other',
-                            'extraction_name': os.path.splitext(file)[0],
-                            'extraction_id': 0
-                        })
-                
-                if not png_files:
-                    print(f"No PNG files found in {item}, skipping", flush=True)
-                    continue
-                
-                # Sort PNG files by extraction type priority, then by ID for consistency
-                png_files.sort(key=lambda x: (get_extraction_type_priority(x['extraction_type']), x['extraction_id']))
-                
-                print(f"Creating consolidated PDF for {item} with {len(png_files)} extractions:", flush=True)
-                for png_file in png_files:
-                    print(f"  - {png_file['extraction_type'].upper()}: {png_file['extraction_name']}", flush=True)
+                    extracted = extract_zip_stream(io.BytesIO(zip_bytes), export['folder_path'], report)
+                except (JobCancelled, ValueError):
+                    shutil.rmtree(export['folder_path'], ignore_errors=True)
+                    raise
+            print(f"Export folder created successfully: {export['folder_path']}", flush=True)
+        
+        pdf_stats = None
+        if include_pdfs:
+            with context.stage('pdfs'):
+                def report_pdfs(done, total, equipment_type):
+                    context.progress('pdfs', done / total, pdfs_done=done, pdfs_total=total,
+                                     equipment_type=equipment_type)
                 
-                # Create consolidated PDF
-                consolidated_pdf_path = os.path.join(equipment_dir, f"{item}_extractions.pdf")
-                
-                try:
-                    doc = fitz.open()
-                    
-                    for png_file in png_files:
-                        print(f"Adding page: {png_file['extraction_name']} ({png_file['extraction_type']})", flush=True)
-                        
-                        # Load and optimize the PNG image before inserting
-                        with open(png_file['path'], 'rb') as f:
-                            png_data = f.read()
-                        
-                        # Open image to get dimensions
-                        img = fitz.open(png_file['path'])
-                        page_rect = img[0].rect
-                        img.close()
-                        
-                        # Create a new page with the same dimensions as the image
-                        page = doc.new_page(width=page_rect.width, height=page_rect.height)
-                        
-                        # Insert image with compression settings for smaller file size
-                        # Use JPEG compression for better file size (good quality, much smaller)  
-                        page.insert_image(page_rect, stream=png_data, keep_proportion=True)
-                    
-                    # Document-level optimization and scrubbing (PNG-only mode)
-                    print("Applying document-level optimizations...", flush=True)
-                    
-                    # Apply document scrubbing and optimization
-                    try:
-                        doc.scrub(attached_files=True, clean_pages=True, 
-                                 remove_links=False, reset_fields=True, 
-                                 reset_responses=True)
-                        print("Document scrubbing completed", flush=True)
-                    except Exception as e:
-                        print(f"Note: Document scrubbing had issues: {str(e)}", flush=True)
-                    
-                    # Final cleanup for PNG-based pages
-                    try:
-                        for page_num in range(len(doc)):
-                            page = doc[page_num]
-                            page.clean_contents()
-                        print("Final page content optimization completed", flush=True)
-                    except Exception as e:
-                        print(f"Note: Final optimization had issues: {str(e)}", flush=True)
-                    
-                    # Save the consolidated PDF with maximum compression and optimization
-                    print("Saving optimized PDF...", flush=True)
-                    doc.save(consolidated_pdf_path, 
-                            garbage=4,          # Garbage collect unused objects (maximum level)
-                            deflate=True,       # Enable deflate compression for streams
-                            clean=True,         # Clean and optimize the PDF structure  
-                            pretty=False,       # Compress structure (no pretty formatting)
-                            encryption=fitz.PDF_ENCRYPT_NONE,  # No encryption overhead
-                            permissions=-1,     # No permission restrictions
-                            expand=False)       # Keep compressed streams compressed
-                    doc.close()
-                    
-                    print(f"✅ Consolidated PDF created: {consolidated_pdf_path}", flush=True)
-                    pdfs_created += 1
-                    
-                except Exception as pdf_error:
-                    print(f"❌ Failed to create consolidated PDF for {item}: {str(pdf_error)}", flush=True)
-    
-    except Exception as e:
-        print(f"❌ Error in consolidated PDF creation: {str(e)}", flush=True)
+                pdf_stats = generate_export_pdfs(export, image_profile, incremental,
+                                                 progress=report_pdfs, should_cancel=context.cancelled)
+                if pdf_stats['cancelled']:
+                    raise JobCancelled('Export cancelled during PDF generation')
+        else:
+            context.skip('pdfs')
+            print("PDF generation skipped (include_pdfs=False)", flush=True)
         
-    return pdfs_created
+        return export_response(export, extracted, pdf_stats)
+    
+    return run
+
+
+def update_export_progress(upload_id, **fields):
+    """Record the progress of a streamed export, keeping the most recent EXPORT_PROGRESS_SIZE uploads."""
+    with export_progress_lock:
+        progress = export_progress.setdefault(upload_id, {'upload_id': upload_id})
+        progress.update(fields)
+        progress['updated_at'] = datetime.now().isoformat()
+        export_progress.move_to_end(upload_id)
+        while len(export_progress) > EXPORT_PROGRESS_SIZE:
+            export_progress.popitem(last=False)
+
+
+def resolve_pdf_path(pdf_path):
+    """Strip quotes from a PDF path sent by the frontend and convert it to a local path.
+    
+    Returns:
+        tuple: (path, error_message) where error_message is None if the file exists
+    """
+    pdf_path = pdf_path.strip('"').strip("'")
+    converted_path, error_msg = convert_windows_path(pdf_path)
+    if error_msg:
+        return None, error_msg
+    if not os.path.isfile(converted_path):
+        return None, f'File not found: {converted_path}'
+    return converted_path, None
+
+
+def get_rendered_region(pdf_path, file_hash, page_number, rect, dpi, image_format):
+    """Render a region of a page, or return it from the render cache.
+    
+    Args:
+        pdf_path (str): Local path of the PDF
+        file_hash (str): SHA256 of the PDF
+        page_number (int): 1-based page number
+        rect (fitz.Rect): Region in page display coordinates, or None for the whole page
+        dpi (float): Output resolution
+        image_format (str): 'png' or 'jpeg'
+    
+    Returns:
+        tuple: (image, cached) where image is a dict from render_region()
+    
+    Raises:
+        ValueError: If the page or region is out of range
+    """
+    cache_key = region_cache_key(file_hash, page_number, rect, dpi, image_format)
+    image = render_cache.get(cache_key)
+    if image is not None:
+        return image, True
+    
+    with open_documents.document(file_hash, pdf_path) as doc:
+        if not 1 <= page_number <= len(doc):
+            raise ValueError(f'Page {page_number} out of range (document has {len(doc)} pages)')
+        image = render_region(doc[page_number - 1], rect, dpi, image_format)
+    
+    render_cache.put(cache_key, file_hash, image)
+    return image, False
+
+
+def render_regions_cached(pdf_path, file_hash, regions, dpi, image_format, workers, output_dir=None,
+                          progress=None, should_cancel=None):
+    """Render a batch of regions, taking whatever it can from the render cache.
+    
+    Cache misses are rendered with render_regions_batch(). Without output_dir
+    the new images are added to the cache; with it, cached images are written
+    out and the rest are written by the workers directly.
+    
+    Args:
+        pdf_path (str): Local path of the PDF
+        file_hash (str): SHA256 of the PDF
+        regions (list): Regions from extraction_regions()
+        dpi (float): Output resolution
+        image_format (str): 'png' or 'jpeg'
+        workers (int): Worker processes for the cache misses
+        output_dir (str): Folder to write the images to, or None to return their data
+        progress (callable): Called with (regions done, total regions)
+        should_cancel (callable): Returns True to stop rendering
+    
+    Returns:
+        dict: render_regions_batch() result over all regions, each image
+        marked 'cached', plus a 'cached' count
+    """
+    keys = [region_cache_key(file_hash, region['page'], None if region['rect'] is None else fitz.Rect(region['rect']),
+                             dpi, image_format) for region in regions]
+    images = [None] * len(regions)
+    misses = []
+    
+    for index, (region, cache_key) in enumerate(zip(regions, keys)):
+        image = render_cache.get(cache_key)
+        if image is None:
+            misses.append(index)
+            continue
+        
+        result = {'id': region.get('id'), 'page': region['page'], 'content_type': image['content_type'],
+                  'width': image['width'], 'height': image['height'], 'cached': True}
+        if output_dir:
+            try:
+                path = region_output_path(output_dir, region, image_format)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, 'wb') as f:
+                    f.write(image['data'])
+                result.update(path=path, size_bytes=len(image['data']))
+            except (OSError, ValueError) as e:
+                result = {'id': region.get('id'), 'page': region['page'], 'error': str(e), 'cached': True}
+        else:
+            result['data'] = image['data']
+        images[index] = result
+    
+    cached = len(regions) - len(misses)
+    
+    def report(done, total):
+        if progress:
+            progress(cached + done, len(regions))
+    
+    batch = render_regions_batch(pdf_path, [regions[index] for index in misses], dpi, image_format,
+                                 workers=workers, output_dir=output_dir, progress=report,
+                                 should_cancel=should_cancel)
+    
+    for result in batch['images']:
+        index = misses[result.pop('index')]
+        result['cached'] = False
+        if 'data' in result:
+            render_cache.put(keys[index], file_hash, result)
+        images[index] = result
+    
+    images = [image for image in images if image is not None]
+    failed = sum(1 for image in images if 'error' in image)
+    return {
+        'images': images,
+        'regions': len(regions),
+        'pages': len({region['page'] for region in regions}),
+        'rendered': len(images) - failed,
+        'failed': failed,
+        'cached': cached,
+        'workers': batch['workers'],
+        'cancelled': batch['cancelled'],
+        'seconds': batch['seconds']
+    }
+
+
+def get_page_image(file_hash, page_number, cache_key, render):
+    """Return a thumbnail or tile of a PDF known by its hash, rendering it on a cache miss.
+    
+    Args:
+        file_hash (str): SHA256 of a PDF opened with /api/pdf/open
+        page_number (int): 1-based page number
+        cache_key (str): Render cache key of the image
+        render (callable): Renders the image from a fitz.Page
+    
+    Returns:
+        tuple: (image, cached) where image is a dict with 'data', 'content_type',
+        'width' and 'height'
+    
+    Raises:
+        FileNotFoundError: If no current file has this hash
+        ValueError: If the page or tile is out of range
+    """
+    image = render_cache.get(cache_key)
+    if image is not None:
+        return image, True
+    
+    pdf_path = file_hash_index.find_path(file_hash)
+    if pdf_path is None:
+        raise FileNotFoundError(f'No PDF with hash {file_hash} is known; open it with /api/pdf/open first')
+    
+    with open_documents.document(file_hash, pdf_path) as doc:
+        if not 1 <= page_number <= len(doc):
+            raise ValueError(f'Page {page_number} out of range (document has {len(doc)} pages)')
+        image = render(doc[page_number - 1])
+    
+    render_cache.put(cache_key, file_hash, image)
+    return image, False
+
+
+def page_image_response(image, cached):
+    """Send a thumbnail or tile, letting the browser keep it (its URL contains the file hash)."""
+    response = make_response(image['data'])
+    response.headers['Content-Type'] = image['content_type']
+    response.headers['Cache-Control'] = f'public, max-age={TILE_BROWSER_CACHE_SECONDS}, immutable'
+    response.headers['X-Render-Cache'] = 'hit' if cached else 'miss'
+    return response
+
+
+def thumbnails_job(pdf_path, file_hash, size):
+    """Build a job function that renders the thumbnail of every page into the render cache.
+    
+    Returns:
+        callable: Function run by job_queue with the job's JobContext
+    """
+    def run(context):
+        rendered = 0
+        with context.stage('thumbnails'):
+            with fitz.open(pdf_path) as doc:
+                for page in doc:
+                    context.check_cancelled()
+                    cache_key = thumbnail_cache_key(file_hash, page.number + 1, size)
+                    if not render_cache.contains(cache_key):
+                        render_cache.put(cache_key, file_hash, render_thumbnail(page, size))
+                        rendered += 1
+                    context.progress('thumbnails', (page.number + 1) / len(doc),
+                                     pages_done=page.number + 1, pages_total=len(doc))
+                page_count = len(doc)
+        
+        print(f"✅ Rendered {rendered} thumbnails of {os.path.basename(pdf_path)}", flush=True)
+        return {'file_hash': file_hash, 'pages': page_count, 'rendered': rendered}
+    
+    return run
 
 
 def convert_png_to_pdf(png_path):
@@ -559,80 +901,74 @@ def detect_spaces():
     """
     Detect BlueBeam Spaces in uploaded PDF.
     
-    Expects multipart/form-data with 'file' field containing PDF.
+    Expects multipart/form-data with 'file' field containing PDF, or a raw
+    application/pdf request body with the name in the 'filename' query
+    parameter. The upload is read once: it is hashed while it is buffered in
+    memory and handed to PyMuPDF without being written to disk. Pass
+    'summary_only=1' to get page and Space counts without the polygons, and
+    fetch them per page from /api/spaces/<file_hash>/page/<n>. 'mode' picks
+    the detection mode ('full_scan' by default, or 'targeted').
     
     Returns:
         JSON with detected spaces and page information
     """
     try:
-        # Check if file was uploaded
-        if 'file' not in request.files:
-            return jsonify({'error': 'No file provided'}), 400
-        
-        file = request.files['file']
+        try:
+            mode = get_detection_mode(request.values.get('mode'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        if request.mimetype == 'application/pdf':
+            # Raw body upload, streamed straight from the socket
+            filename = request.args.get('filename', 'upload.pdf')
+            upload_stream = request.stream
+            
+            if request.content_length and request.content_length > MAX_FILE_SIZE:
+                return jsonify({'error': f'File too large. Maximum size is {MAX_FILE_SIZE/1024/1024}MB'}), 400
+        else:
+            # Check if file was uploaded
+            if 'file' not in request.files:
+                return jsonify({'error': 'No file provided'}), 400
+            
+            file = request.files['file']
+            filename = file.filename
+            upload_stream = file.stream
         
-        if file.filename == '':
+        if filename == '':
             return jsonify({'error': 'No file selected'}), 400
         
-        if not allowed_file(file.filename):
+        if not allowed_file(filename):
             return jsonify({'error': 'Invalid file type. Only PDF files are allowed'}), 400
         
-        # Save uploaded file temporarily
-        filename = secure_filename(file.filename)
-        temp_path = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(temp_path)
+        filename = secure_filename(filename)
         
-        # Check file size
-        if os.path.getsize(temp_path) > MAX_FILE_SIZE:
-            os.remove(temp_path)
+        # Buffer and hash the upload in one pass, enforcing the size limit while reading
+        pdf_data, file_hash = read_upload(upload_stream, MAX_FILE_SIZE)
+        if pdf_data is None:
             return jsonify({'error': f'File too large. Maximum size is {MAX_FILE_SIZE/1024/1024}MB'}), 400
         
-        # Generate file hash for caching
-        file_hash = get_file_hash(temp_path)
-        
         # Check cache first
-        if file_hash in spaces_cache:
+        result = get_cached_spaces_result(file_hash, mode)
+        if result is not None:
             print(f"Returning cached spaces for {filename}")
-            result = spaces_cache[file_hash]
         else:
-            # Detect spaces using handler
+            # Detect spaces, reusing unchanged pages of a previous revision if known
+            previous_hash = request.values.get('previous_file_hash')
+            previous_result = spaces_cache.peek(previous_hash) if previous_hash else None
+            
             print(f"Detecting spaces in {filename}")
-            with BlueBeamSpaceHandler(temp_path) as handler:
-                spaces = handler.detect_all_spaces()
-                
-                # Prepare response data
-                result = {
-                    'success': True,
-                    'filename': filename,
-                    'file_hash': file_hash,
-                    'page_count': handler.doc.page_count,
-                    'total_spaces': len(spaces),
-                    'spaces': [space.to_dict() for space in spaces],
-                    'pages': []
-                }
-                
-                # Add page information
-                for page_num in range(handler.doc.page_count):
-                    page_info = handler.get_page_info(page_num)
-                    page_spaces = handler.get_spaces_for_page(page_num)
-                    page_info['space_count'] = len(page_spaces)
-                    page_info['space_titles'] = [s.title for s in page_spaces]
-                    result['pages'].append(page_info)
-                
-                # Cache the result
-                spaces_cache[file_hash] = result
-        
-        # Clean up temp file
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+            with BlueBeamSpaceHandler(stream=pdf_data) as handler:
+                result = build_spaces_result(handler, filename, file_hash, mode, previous_result)
+            
+            # Cache the result
+            store_spaces_result(file_hash, result)
         
-        return jsonify(result)
+        if request.values.get('summary_only', '').lower() in ('1', 'true', 'yes'):
+            return jsonify(summarize_spaces_result(result))
+        return jsonify(public_spaces_result(result))
         
     except Exception as e:
         print(f"Error detecting spaces: {e}")
-        # Clean up on error
-        if 'temp_path' in locals() and os.path.exists(temp_path):
-            os.remove(temp_path)
         return jsonify({'error': str(e), 'success': False}), 500
 
 
@@ -641,7 +977,9 @@ def detect_spaces_from_path():
     """
     Detect BlueBeam Spaces from a file path (for local testing).
     
-    Expects JSON with 'pdf_path' field.
+    Expects JSON with 'pdf_path' field, and optionally 'summary_only': true
+    to leave out the Space polygons and 'mode' ('full_scan' by default, or
+    'targeted').
     
     Returns:
         JSON with detected spaces and page information
@@ -653,84 +991,465 @@ def detect_spaces_from_path():
         
         pdf_path = data['pdf_path']
         
+        try:
+            mode = get_detection_mode(data.get('mode'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         # Verify file exists
         if not os.path.exists(pdf_path):
             return jsonify({'error': f'File not found: {pdf_path}'}), 404
         
-        # Generate file hash for caching
-        file_hash = get_file_hash(pdf_path)
+        # The hash recorded for this path before it was replaced by a revision
+        previous_hash = data.get('previous_file_hash') or file_hash_index.get_recorded_hash(pdf_path)
+        
+        # Generate file hash for caching
+        file_hash = get_file_hash(pdf_path)
+        
+        # Check cache first
+        cached_result = get_cached_spaces_result(file_hash, mode)
+        if cached_result is not None:
+            print(f"Returning cached spaces for {pdf_path}")
+            if data.get('summary_only'):
+                return jsonify(summarize_spaces_result(cached_result))
+            return jsonify(public_spaces_result(cached_result))
+        
+        previous_result = None
+        if previous_hash and previous_hash != file_hash:
+            previous_result = spaces_cache.peek(previous_hash)
+        
+        # Detect spaces
+        print(f"Detecting spaces in {pdf_path}")
+        with BlueBeamSpaceHandler(pdf_path) as handler:
+            result = build_spaces_result(handler, os.path.basename(pdf_path), file_hash, mode, previous_result)
+        
+        # Cache the result
+        store_spaces_result(file_hash, result)
+        
+        if data.get('summary_only'):
+            return jsonify(summarize_spaces_result(result))
+        return jsonify(public_spaces_result(result))
+        
+    except Exception as e:
+        print(f"Error detecting spaces: {e}")
+        return jsonify({'error': str(e), 'success': False}), 500
+
+
+@app.route('/api/spaces/<file_hash>', methods=['GET'])
+def get_cached_spaces(file_hash):
+    """
+    Get cached spaces for a file hash.
+    
+    Args:
+        file_hash: SHA256 hash of the PDF file
+        
+    Returns:
+        JSON with cached spaces or 404 if not found
+    """
+    result = get_cached_spaces_result(file_hash)
+    if result is not None:
+        return jsonify(public_spaces_result(result))
+    else:
+        return jsonify({'error': 'Spaces not found in cache'}), 404
+
+
+@app.route('/api/spaces/<file_hash>/summary', methods=['GET'])
+def get_spaces_summary(file_hash):
+    """
+    Get page and Space counts for a cached file, without the Space polygons.
+    
+    Args:
+        file_hash: SHA256 hash of the PDF file
+        
+    Returns:
+        JSON with the detection result minus 'spaces', or 404 if not found
+    """
+    view = get_page_view(file_hash)
+    if view is None:
+        return jsonify({'error': 'Spaces not found in cache'}), 404
+    return jsonify(view['summary'])
+
+
+@app.route('/api/spaces/<file_hash>/page/<int:page_num>', methods=['GET'])
+def get_page_spaces(file_hash, page_num):
+    """
+    Get the Spaces of one page of a cached file.
+    
+    Args:
+        file_hash: SHA256 hash of the PDF file
+        page_num: Zero-based page number
+        
+    Returns:
+        JSON with the page information and its spaces, or 404 if the file is
+        not cached or the page does not exist
+    """
+    view = get_page_view(file_hash)
+    if view is None:
+        return jsonify({'error': 'Spaces not found in cache'}), 404
+    
+    summary = view['summary']
+    if page_num >= summary['page_count']:
+        return jsonify({'error': f"Page {page_num} out of range (page_count {summary['page_count']})"}), 404
+    
+    page_spaces = view['page_spaces'].get(page_num, [])
+    return jsonify({
+        'success': True,
+        'file_hash': file_hash,
+        'page_number': page_num,
+        'page': summary['pages'][page_num],
+        'total_spaces': len(page_spaces),
+        'spaces': page_spaces
+    })
+
+
+@app.route('/api/spaces/<file_hash>/query', methods=['POST'])
+def query_spaces(file_hash):
+    """
+    Find the Spaces at a point or overlapping a rectangle on one page.
+    
+    Expects JSON with 'page' (zero-based) and either 'point': [x, y] or
+    'rect': [x0, y0, x1, y1]. Optional 'mode' for rectangle queries is
+    'overlap' (default) or 'contains', and optional 'coordinate_system' is
+    'pymupdf' (default, same as pymupdf_rect) or 'pdf'.
+    
+    Args:
+        file_hash: SHA256 hash of the PDF file
+        
+    Returns:
+        JSON with the matching spaces, best match first, or 404 if the file
+        has not been detected yet
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        if 'page' not in data or ('point' not in data and 'rect' not in data):
+            return jsonify({'error': "Expected 'page' and either 'point' or 'rect'"}), 400
+        
+        page = int(data['page'])
+        coordinate_system = data.get('coordinate_system', 'pymupdf')
+        
+        index = get_space_index(file_hash, coordinate_system)
+        if index is None:
+            return jsonify({'error': 'Spaces not found in cache'}), 404
+        
+        if 'point' in data:
+            x, y = (float(value) for value in data['point'])
+            matches = [space.to_dict() for space in index.query_point(page, x, y)]
+        else:
+            rect = tuple(float(value) for value in data['rect'])
+            if len(rect) != 4:
+                return jsonify({'error': "'rect' must be [x0, y0, x1, y1]"}), 400
+            matches = []
+            for space, overlap in index.query_rect(page, rect, data.get('mode', 'overlap')):
+                match = space.to_dict()
+                match['overlap'] = round(overlap, 4)
+                matches.append(match)
+        
+        return jsonify({
+            'success': True,
+            'file_hash': file_hash,
+            'page': page,
+            'coordinate_system': coordinate_system,
+            'count': len(matches),
+            'spaces': matches
+        })
+        
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e), 'success': False}), 400
+    except Exception as e:
+        print(f"Error querying spaces: {e}")
+        return jsonify({'error': str(e), 'success': False}), 500
+
+
+@app.route('/api/clear_cache', methods=['POST'])
+def clear_cache():
+    """Clear the Space and render caches (see /api/search-extractions/clear and /api/catalog/clear)."""
+    spaces_cache.clear()
+    render_cache.clear()
+    browse_cache.invalidate()
+    with space_memo_lock:
+        space_indexes.clear()
+        space_page_views.clear()
+    return jsonify({'success': True, 'message': 'Cache cleared'})
+
+
+@app.route('/api/cache_stats', methods=['GET'])
+def cache_stats():
+    """Get cache statistics (entries, size, limits and hit/miss counters)."""
+    stats = spaces_cache.stats()
+    stats['file_hash_index'] = file_hash_index.stats()
+    stats['render_cache'] = render_cache.stats()
+    stats['search_index'] = search_index.stats()
+    stats['project_catalog'] = project_catalog.stats()
+    stats['path_index'] = path_index.status()
+    stats['browse_cache'] = browse_cache.stats()
+    return jsonify(stats)
+
+
+# ============================================================
+# RENDERING ENDPOINTS
+# ============================================================
+
+@app.route('/api/render-region', methods=['POST'])
+def render_region_endpoint():
+    """
+    Rasterise one extraction region server-side, rendering only the clip rectangle.
+    
+    Expects JSON with 'pdf_path', 'page' (1-based), 'rect' (the frontend's
+    {x, y, width, height} selection at scale 1, or [x0, y0, x1, y1]; omit it
+    or set 'isFullPage' for the whole page), and optionally 'dpi' (default
+    216, the frontend's 3x capture scale), 'format' ('png' or 'jpeg') and
+    'as_data_url'. Renders are cached by file hash, page, rect and dpi.
+    
+    Returns:
+        The encoded image, or JSON with a data URL in 'image' when
+        as_data_url is set
+    """
+    try:
+        data = request.get_json()
+        if not data or not data.get('pdf_path'):
+            return jsonify({'error': 'No pdf_path provided'}), 400
+        
+        pdf_path, error_msg = resolve_pdf_path(data['pdf_path'])
+        if error_msg:
+            return jsonify({'error': error_msg}), 404
+        
+        try:
+            page_number = int(data.get('page', 1))
+            dpi = float(data.get('dpi') or DEFAULT_REGION_DPI)
+            rect = None if data.get('isFullPage') else parse_region(data.get('rect'))
+            image_format = data.get('format', 'png')
+            file_hash = get_file_hash(pdf_path)
+            image, cached = get_rendered_region(pdf_path, file_hash, page_number, rect, dpi, image_format)
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
+        
+        if data.get('as_data_url'):
+            encoded = base64.b64encode(image['data']).decode('ascii')
+            return jsonify({
+                'image': f"data:{image['content_type']};base64,{encoded}",
+                'width': image['width'],
+                'height': image['height'],
+                'dpi': dpi,
+                'file_hash': file_hash,
+                'cached': cached
+            })
+        
+        response = make_response(image['data'])
+        response.headers['Content-Type'] = image['content_type']
+        response.headers['X-Image-Width'] = str(image['width'])
+        response.headers['X-Image-Height'] = str(image['height'])
+        response.headers['X-Render-Cache'] = 'hit' if cached else 'miss'
+        return response
+    
+    except Exception as e:
+        print(f"Error rendering region: {str(e)}", flush=True)
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/render-regions', methods=['POST'])
+def render_regions_endpoint():
+    """
+    Rasterise a whole session's extraction regions in one call.
+    
+    Regions are grouped by page so each page is interpreted once, and pages
+    are rendered on a pool of worker processes that each open the PDF once.
+    
+    Expects JSON with 'pdf_path' and either 'extractions' (a session's
+    extraction list; defaults to the session file saved next to the PDF) or
+    'regions' ([{id, page, rect}], rect as for /api/render-region or null
+    for the whole page), and optionally 'dpi' (default 216), 'format',
+    'workers', 'output_dir' and 'async'.
+    
+    With 'output_dir' the images are written there, named like the export's
+    equipment folders (files.image for project_data.json extractions);
+    otherwise they are returned as data URLs. 'async' runs the batch as a
+    background job (output_dir required) and returns 202 with its job id.
+    
+    Returns:
+        JSON with one entry per region in 'images' and the batch statistics
+    """
+    try:
+        data = request.get_json()
+        if not data or not data.get('pdf_path'):
+            return jsonify({'error': 'No pdf_path provided'}), 400
+        
+        pdf_path, error_msg = resolve_pdf_path(data['pdf_path'])
+        if error_msg:
+            return jsonify({'error': error_msg}), 404
+        
+        output_dir = data.get('output_dir')
+        if output_dir:
+            output_dir, error_msg = convert_windows_path(output_dir.strip('"').strip("'"))
+            if error_msg:
+                return jsonify({'error': error_msg}), 400
+        background = data.get('async', False)
+        if background and not output_dir:
+            return jsonify({'error': 'async batches must write to an output_dir'}), 400
+        
+        try:
+            dpi = float(data.get('dpi') or DEFAULT_REGION_DPI)
+            image_format = data.get('format', 'png')
+            workers = max(1, int(data.get('workers') or RENDER_WORKERS))
+            
+            if data.get('regions') is not None:
+                regions = []
+                for position, region in enumerate(data['regions']):
+                    rect = parse_region(region.get('rect'))
+                    regions.append({'id': region.get('id', position), 'page': int(region.get('page', 1)),
+                                    'rect': None if rect is None else tuple(rect),
+                                    'filename': region.get('filename')})
+            else:
+                extractions = data.get('extractions')
+                if extractions is None:
+                    session_path = f"{pdf_path}.pdfextractor.json"
+                    if not os.path.exists(session_path):
+                        return jsonify({'error': f'No extractions provided and no session file at {session_path}'}), 404
+                    with open(session_path, 'r') as f:
+                        extractions = json.load(f).get('extractions', [])
+                regions = extraction_regions(extractions, image_format)
+        except (AttributeError, TypeError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
+        
+        if not regions:
+            return jsonify({'error': 'No regions to render'}), 400
         
-        # Check cache first
-        if file_hash in spaces_cache:
-            print(f"Returning cached spaces for {pdf_path}")
-            return jsonify(spaces_cache[file_hash])
+        file_hash = get_file_hash(pdf_path)
+        print(f"Rendering {len(regions)} regions of {os.path.basename(pdf_path)} at {dpi:g} dpi", flush=True)
         
-        # Detect spaces
-        print(f"Detecting spaces in {pdf_path}")
-        with BlueBeamSpaceHandler(pdf_path) as handler:
-            spaces = handler.detect_all_spaces()
+        def run(context=None):
+            def report(done, total):
+                if context:
+                    context.progress('render', done / total, regions_done=done, regions_total=total)
             
-            # Prepare response data
-            result = {
-                'success': True,
-                'filename': os.path.basename(pdf_path),
-                'file_hash': file_hash,
-                'page_count': handler.doc.page_count,
-                'total_spaces': len(spaces),
-                'spaces': [space.to_dict() for space in spaces],
-                'pages': []
-            }
+            result = render_regions_cached(pdf_path, file_hash, regions, dpi, image_format, workers,
+                                           output_dir=output_dir, progress=report,
+                                           should_cancel=context.cancelled if context else None)
+            if result['cancelled']:
+                raise JobCancelled('Region rendering cancelled')
             
-            # Add page information
-            for page_num in range(handler.doc.page_count):
-                page_info = handler.get_page_info(page_num)
-                page_spaces = handler.get_spaces_for_page(page_num)
-                page_info['space_count'] = len(page_spaces)
-                page_info['space_titles'] = [s.title for s in page_spaces]
-                result['pages'].append(page_info)
+            for image in result['images']:
+                if 'data' in image:
+                    encoded = base64.b64encode(image.pop('data')).decode('ascii')
+                    image['image'] = f"data:{image['content_type']};base64,{encoded}"
             
-            # Cache the result
-            spaces_cache[file_hash] = result
-        
-        return jsonify(result)
+            print(f"✅ Rendered {result['rendered']} regions ({result['cached']} cached, {result['failed']} failed) "
+                  f"on {result['pages']} pages in {result['seconds']:.2f}s", flush=True)
+            return dict(result, success=True, file_hash=file_hash, dpi=dpi, format=image_format,
+                        output_dir=output_dir)
+        
+        if background:
+            def job(context):
+                with context.stage('render'):
+                    return run(context)
+            
+            job_id = job_queue.submit('render-regions', {'pdf_path': pdf_path, 'regions': len(regions), 'dpi': dpi,
+                                                         'output_dir': output_dir},
+                                      ['render'], job)
+            return jsonify({'success': True, 'job_id': job_id, 'status_url': f'/api/jobs/{job_id}',
+                            'regions': len(regions), 'output_dir': output_dir}), 202
         
+        try:
+            return jsonify(run())
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    
     except Exception as e:
-        print(f"Error detecting spaces: {e}")
-        return jsonify({'error': str(e), 'success': False}), 500
+        print(f"Error rendering regions: {str(e)}", flush=True)
+        return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/spaces/<file_hash>', methods=['GET'])
-def get_cached_spaces(file_hash):
+@app.route('/api/pdf/open', methods=['POST'])
+def open_pdf_for_tiles():
     """
-    Get cached spaces for a file hash.
+    Prepare a PDF for tiled viewing.
+    
+    Expects JSON with 'path', and optionally 'thumbnails' (default true:
+    render every page's thumbnail in a background job) and 'thumbnail_size'.
+    Pages are then served by file hash from /api/pdf/<file_hash>/thumbnail/<page>
+    and /api/pdf/<file_hash>/tile/<page>/<level>/<column>/<row>.
     
-    Args:
-        file_hash: SHA256 hash of the PDF file
-        
     Returns:
-        JSON with cached spaces or 404 if not found
+        JSON with 'file_hash', 'page_count', 'tile_size', 'thumbnail_size',
+        'pages' (size, rotation and tile levels of each page) and the
+        thumbnail job's 'job_id' (None when all thumbnails are cached)
     """
-    if file_hash in spaces_cache:
-        return jsonify(spaces_cache[file_hash])
-    else:
-        return jsonify({'error': 'Spaces not found in cache'}), 404
+    try:
+        data = request.get_json()
+        if not data or not data.get('path'):
+            return jsonify({'error': 'No path provided'}), 400
+        
+        pdf_path, error_msg = resolve_pdf_path(data['path'])
+        if error_msg:
+            return jsonify({'error': error_msg}), 404
+        
+        try:
+            thumbnail_size = int(data.get('thumbnail_size') or THUMBNAIL_SIZE)
+        except (TypeError, ValueError):
+            return jsonify({'error': 'thumbnail_size must be a number'}), 400
+        
+        file_hash = get_file_hash(pdf_path)
+        with open_documents.document(file_hash, pdf_path) as doc:
+            pages = page_layout(doc)
+        
+        job_id = None
+        if data.get('thumbnails', True):
+            missing = [page['page'] for page in pages
+                       if not render_cache.contains(thumbnail_cache_key(file_hash, page['page'], thumbnail_size))]
+            if missing:
+                job_id = job_queue.submit('thumbnails', {'pdf_path': pdf_path, 'pages': len(pages),
+                                                         'thumbnail_size': thumbnail_size},
+                                          ['thumbnails'], thumbnails_job(pdf_path, file_hash, thumbnail_size))
+        
+        return jsonify({
+            'success': True,
+            'file_hash': file_hash,
+            'page_count': len(pages),
+            'tile_size': TILE_SIZE,
+            'thumbnail_size': thumbnail_size,
+            'pages': pages,
+            'thumbnail_url': f'/api/pdf/{file_hash}/thumbnail/{{page}}?size={thumbnail_size}',
+            'tile_url': f'/api/pdf/{file_hash}/tile/{{page}}/{{level}}/{{column}}/{{row}}',
+            'job_id': job_id
+        })
+    
+    except Exception as e:
+        print(f"Error opening PDF for tiles: {str(e)}", flush=True)
+        return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/clear_cache', methods=['POST'])
-def clear_cache():
-    """Clear the spaces cache."""
-    spaces_cache.clear()
-    return jsonify({'success': True, 'message': 'Cache cleared'})
+@app.route('/api/pdf/<file_hash>/thumbnail/<int:page_number>', methods=['GET'])
+def get_page_thumbnail(file_hash, page_number):
+    """Low-resolution JPEG of a whole page ('size' query parameter: longest side in pixels)."""
+    try:
+        size = request.args.get('size', THUMBNAIL_SIZE, type=int)
+        image, cached = get_page_image(file_hash, page_number, thumbnail_cache_key(file_hash, page_number, size),
+                                       lambda page: render_thumbnail(page, size))
+        return page_image_response(image, cached)
+    except FileNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Error rendering thumbnail: {str(e)}", flush=True)
+        return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/cache_stats', methods=['GET'])
-def cache_stats():
-    """Get cache statistics."""
-    return jsonify({
-        'cached_files': len(spaces_cache),
-        'file_hashes': list(spaces_cache.keys()),
-        'total_spaces': sum(data['total_spaces'] for data in spaces_cache.values())
-    })
+@app.route('/api/pdf/<file_hash>/tile/<int:page_number>/<int:level>/<int:column>/<int:row>', methods=['GET'])
+def get_page_tile(file_hash, page_number, level, column, row):
+    """One tile of a page's zoom pyramid ('format' query parameter: 'png' or 'jpeg')."""
+    try:
+        image_format = request.args.get('format', 'png')
+        cache_key = tile_cache_key(file_hash, page_number, level, column, row, image_format)
+        image, cached = get_page_image(file_hash, page_number, cache_key,
+                                       lambda page: render_tile(page, level, column, row, image_format))
+        return page_image_response(image, cached)
+    except FileNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Error rendering tile: {str(e)}", flush=True)
+        return jsonify({'error': str(e)}), 500
 
 
 # ============================================================
@@ -839,172 +1558,326 @@ def export_to_local():
     """Export as folder structure to same directory as PDF."""
     try:
         import zipfile
-        import shutil
         
         data = request.get_json()
         pdf_path = data.get('pdf_path')
         zip_data = data.get('zip_data')  # Base64 encoded ZIP
         include_pdfs = data.get('include_pdfs', False)  # New: whether to generate PDFs
+        incremental = data.get('incremental', True)  # Reuse unchanged pages of the previous export's PDFs
+        background = data.get('async', False)  # Run as a job and return its id right away
         
         if not pdf_path or not zip_data:
             return jsonify({'error': 'Missing pdf_path or zip_data'}), 400
         
-        # Remove any surrounding quotes from the path
-        pdf_path = pdf_path.strip('"').strip("'")
-        
-        print(f"Received PDF path: {pdf_path}", flush=True)
+        # Image recompression for the consolidated PDFs, e.g. 'jpeg:70' or 'bilevel'
+        try:
+            image_profile = resolve_image_profile(data.get('image_profile') or EXPORT_IMAGE_PROFILE,
+                                                  data.get('max_image_dpi'))
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Convert Windows path to WSL path if necessary
-        converted_path, error_msg = convert_windows_path(pdf_path)
+        export, error_msg = prepare_export_folder(pdf_path)
         if error_msg:
-            return jsonify({'error': f'Path conversion failed: {error_msg}'}), 400
-        pdf_path = converted_path
+            return jsonify({'error': error_msg}), 400
+        export_folder_path = export['folder_path']
+        export_folder_name = export['folder_name']
         
-        # Get directory and name of PDF
-        pdf_dir = os.path.dirname(pdf_path)
-        pdf_name = os.path.splitext(os.path.basename(pdf_path))[0]
+        print(f"Creating export folder: {export_folder_path}", flush=True)
         
-        # Create export folder name with timestamp
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        # Limit filename length to avoid issues
-        safe_pdf_name = pdf_name[:50] if len(pdf_name) > 50 else pdf_name
-        export_folder_name = f"{safe_pdf_name}_extractions_{timestamp}"
-        export_folder_path = os.path.join(pdf_dir, export_folder_name)
+        # Decode the ZIP and extract it from memory
+        zip_bytes = base64.b64decode(zip_data)
         
-        print(f"Creating export folder: {export_folder_path}", flush=True)
+        if background:
+            job_id = job_queue.submit('export', {'pdf_path': pdf_path, 'folder_path': export_folder_path,
+                                                 'include_pdfs': include_pdfs,
+                                                 'image_profile': image_profile['name']},
+                                      ['extract', 'pdfs'],
+                                      export_job(export, image_profile, incremental, include_pdfs,
+                                                 zip_bytes=zip_bytes))
+            return jsonify({'success': True, 'job_id': job_id, 'status_url': f'/api/jobs/{job_id}',
+                            'path': export_folder_path, 'filename': export_folder_name}), 202
         
-        # Create temporary ZIP file first
-        temp_zip_path = os.path.join(pdf_dir, f"temp_{timestamp}.zip")
+        # Create the export folder
+        os.makedirs(export_folder_path, exist_ok=True)
         
-        # Decode and save ZIP file temporarily
-        zip_bytes = base64.b64decode(zip_data)
-        with open(temp_zip_path, 'wb') as f:
-            f.write(zip_bytes)
+        # Extract ZIP contents to folder
+        with zipfile.ZipFile(io.BytesIO(zip_bytes), 'r') as zip_ref:
+            zip_ref.extractall(export_folder_path)
         
-        # Extract ZIP to folder
-        try:
-            # Create the export folder
-            os.makedirs(export_folder_path, exist_ok=True)
-            
-            # Extract ZIP contents to folder
-            with zipfile.ZipFile(temp_zip_path, 'r') as zip_ref:
-                zip_ref.extractall(export_folder_path)
-            
-            print(f"Export folder created successfully: {export_folder_path}", flush=True)
-            
-            # Generate consolidated PDF versions if requested
-            if include_pdfs:
-                print(f"Generating consolidated PDFs by equipment type (include_pdfs={include_pdfs})...", flush=True)
-                
-                # Create consolidated PDFs with extraction type sorting
-                pdfs_created = create_consolidated_equipment_pdfs(export_folder_path)
-                
-                if pdfs_created > 0:
-                    print(f"✅ Generated {pdfs_created} consolidated PDF files (one per equipment type)", flush=True)
-                else:
-                    print("⚠️  No consolidated PDFs were created (no equipment folders or PNG files found)", flush=True)
-            else:
-                print("PDF generation skipped (include_pdfs=False)", flush=True)
-            
-            # Clean up temporary ZIP file
-            os.remove(temp_zip_path)
-            
-            return jsonify({
-                'success': True,
-                'path': export_folder_path,
-                'filename': export_folder_name,
-                'message': f'Exported to folder: {export_folder_name}',
-                'is_folder': True
-            })
-            
-        except Exception as extract_error:
-            # Clean up temp file if extraction fails
-            if os.path.exists(temp_zip_path):
-                os.remove(temp_zip_path)
-            raise extract_error
+        print(f"Export folder created successfully: {export_folder_path}", flush=True)
+        
+        # Generate consolidated PDF versions if requested
+        if include_pdfs:
+            pdf_stats = generate_export_pdfs(export, image_profile, incremental)
+        else:
+            pdf_stats = None
+            print("PDF generation skipped (include_pdfs=False)", flush=True)
+        
+        return jsonify(export_response(export, pdf_stats=pdf_stats))
         
     except Exception as e:
         print(f"Error exporting to local: {str(e)}", flush=True)
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/browse', methods=['GET'])
-def browse_files():
-    """Browse for PDF files in common directories."""
+@app.route('/api/export/local/stream', methods=['POST'])
+def export_to_local_stream():
+    """Export a ZIP uploaded as a binary body, extracting entries as they arrive.
+    
+    The body is either the raw ZIP (application/zip or
+    application/octet-stream) or multipart/form-data with the ZIP in a 'zip'
+    file part. Options are read from the query string, or from form fields
+    sent before the file part: pdf_path (required), include_pdfs,
+    image_profile, max_image_dpi, incremental, async and upload_id. Progress
+    can be polled at /api/export/local/progress/<upload_id> while the upload
+    runs. With async, the upload is recorded as the first stage of a job and
+    the PDFs are built in the background: the response (202) carries the
+    job id to poll at /api/jobs/<job_id>.
+    """
+    upload_id = request.args.get('upload_id') or uuid.uuid4().hex
+    export = None
+    context = None
+    
     try:
-        import platform
-        from pathlib import Path
+        # Read the body directly; touching request.form would spool it to a temporary file
+        if request.mimetype == 'multipart/form-data':
+            boundary = request.mimetype_params.get('boundary')
+            if not boundary:
+                return jsonify({'error': 'Missing multipart boundary'}), 400
+            zip_stream = MultipartFileStream(request.stream, boundary.encode('latin-1'), file_field='zip')
+            options = {**request.args.to_dict(), **zip_stream.fields}
+            upload_id = options.get('upload_id') or upload_id
+        else:
+            zip_stream = request.stream
+            options = request.args.to_dict()
         
-        # Get the starting directory from query params or use defaults
-        start_dir = request.args.get('path', '')
+        def option_flag(name, default):
+            value = options.get(name)
+            return default if value is None else value.lower() in ('1', 'true', 'yes')
         
-        # Common directories to search
-        if not start_dir:
-            if platform.system() == 'Windows' or os.path.exists('/mnt/c'):
-                # Windows or WSL
-                user_home = os.path.expanduser('~')
-                if '/mnt/c' in user_home or os.path.exists('/mnt/c'):
-                    # WSL environment
-                    common_dirs = [
-                        '/mnt/c/Users',
-                        os.getcwd(),
-                    ]
-                else:
-                    # Native Windows
-                    common_dirs = [
-                        str(Path.home() / 'Documents'),
-                        str(Path.home() / 'Downloads'),
-                        str(Path.home() / 'Desktop'),
-                        os.getcwd(),
-                    ]
-            else:
-                # Linux/Mac
-                common_dirs = [
-                    str(Path.home() / 'Documents'),
-                    str(Path.home() / 'Downloads'),
-                    str(Path.home() / 'Desktop'),
-                    os.getcwd(),
-                ]
+        pdf_path = options.get('pdf_path')
+        include_pdfs = option_flag('include_pdfs', False)
+        incremental = option_flag('incremental', True)
+        background = option_flag('async', False)
+        
+        if not pdf_path:
+            return jsonify({'error': 'Missing pdf_path'}), 400
+        
+        try:
+            image_profile = resolve_image_profile(options.get('image_profile') or EXPORT_IMAGE_PROFILE,
+                                                  options.get('max_image_dpi') or None)
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
+        
+        export, error_msg = prepare_export_folder(pdf_path)
+        if error_msg:
+            return jsonify({'error': error_msg}), 400
+        
+        print(f"Streaming export into folder: {export['folder_path']}", flush=True)
+        
+        total_bytes = request.content_length
+        update_export_progress(upload_id, status='receiving', bytes_received=0, total_bytes=total_bytes,
+                               entries=0, percent=0.0, path=export['folder_path'], error=None)
+        
+        if background:
+            context = job_queue.create('export', {'pdf_path': pdf_path, 'folder_path': export['folder_path'],
+                                                  'include_pdfs': include_pdfs, 'upload_id': upload_id,
+                                                  'image_profile': image_profile['name']},
+                                       ['upload', 'pdfs'])
+            update_export_progress(upload_id, job_id=context.job_id)
+        
+        def report(bytes_received, entries):
+            percent = round(100.0 * bytes_received / total_bytes, 1) if total_bytes else None
+            update_export_progress(upload_id, bytes_received=bytes_received, entries=entries, percent=percent)
+            if context:
+                context.progress('upload', percent / 100 if percent is not None else None,
+                                 bytes_received=bytes_received, entries=entries)
+                context.check_cancelled()
+        
+        if context:
+            def receive(job_context):
+                with job_context.stage('upload'):
+                    return extract_zip_stream(zip_stream, export['folder_path'], report)
+            zip_stats = job_queue.run_inline(context, receive)
         else:
-            common_dirs = [start_dir]
+            zip_stats = extract_zip_stream(zip_stream, export['folder_path'], report)
+        
+        print(f"✅ Extracted {zip_stats['entries']} entries "
+              f"({zip_stats['bytes_written'] / 1024 / 1024:.1f}MB) into {export['folder_path']}", flush=True)
+        
+        if context:
+            job_queue.start(context, export_job(export, image_profile, incremental, include_pdfs,
+                                                zip_stats=zip_stats))
+            update_export_progress(upload_id, status='queued', percent=100.0)
+            return jsonify({'success': True, 'upload_id': upload_id, 'job_id': context.job_id,
+                            'status_url': f'/api/jobs/{context.job_id}', 'path': export['folder_path'],
+                            'filename': export['folder_name'], 'entries': zip_stats['entries'],
+                            'bytes_written': zip_stats['bytes_written']}), 202
+        
+        if include_pdfs:
+            update_export_progress(upload_id, status='generating_pdfs', percent=100.0)
+            pdf_stats = generate_export_pdfs(export, image_profile, incremental)
+        else:
+            pdf_stats = None
+            print("PDF generation skipped (include_pdfs=False)", flush=True)
         
-        files = []
-        folders = []
+        update_export_progress(upload_id, status='complete', percent=100.0)
+        
+        return jsonify({**export_response(export, zip_stats, pdf_stats), 'upload_id': upload_id})
+    
+    except JobCancelled as e:
+        print(f"⚠️  Streamed export cancelled: {str(e)}", flush=True)
+        update_export_progress(upload_id, status='cancelled', error=str(e))
+        if export and os.path.isdir(export['folder_path']):
+            shutil.rmtree(export['folder_path'], ignore_errors=True)
+        return jsonify({'error': str(e), 'upload_id': upload_id}), 409
+    
+    except ValueError as e:
+        # Truncated or corrupt upload: do not leave a partial export behind
+        print(f"❌ Streamed export failed: {str(e)}", flush=True)
+        update_export_progress(upload_id, status='error', error=str(e))
+        if export and os.path.isdir(export['folder_path']):
+            shutil.rmtree(export['folder_path'], ignore_errors=True)
+        return jsonify({'error': str(e), 'upload_id': upload_id}), 400
+    
+    except Exception as e:
+        print(f"Error exporting to local: {str(e)}", flush=True)
+        update_export_progress(upload_id, status='error', error=str(e))
+        return jsonify({'error': str(e), 'upload_id': upload_id}), 500
+
+
+@app.route('/api/export/local/progress/<upload_id>', methods=['GET'])
+def export_progress_status(upload_id):
+    """Get the progress of a streamed export."""
+    with export_progress_lock:
+        progress = export_progress.get(upload_id)
+        progress = dict(progress) if progress else None
+    
+    if progress is None:
+        return jsonify({'error': f'Unknown upload id: {upload_id}'}), 404
+    
+    return jsonify(progress)
+
+
+# ============================================================
+# BACKGROUND JOB ENDPOINTS
+# ============================================================
+
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    """List recent background jobs, optionally filtered by ?status=."""
+    try:
+        limit = int(request.args.get('limit', 50))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    
+    return jsonify({
+        'jobs': job_queue.list(status=request.args.get('status'), limit=limit),
+        'stats': job_queue.stats()
+    })
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get the status, per-stage progress and timings, and result of a job."""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': f'Unknown job: {job_id}'}), 404
+    return jsonify(job)
+
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Cancel a queued or running job."""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': f'Unknown job: {job_id}'}), 404
+    if job['status'] in FINAL_STATES:
+        return jsonify({'error': f"Job already {job['status']}", 'job': job}), 409
+    
+    return jsonify(job_queue.cancel(job_id))
+
+
+@app.route('/api/browse', methods=['GET'])
+def browse_files():
+    """
+    Browse for PDF files in a directory, or in the common directories.
+    
+    Query parameters:
+        path (str): Directory to list; omitted lists the common directories
+        sort (str): Order of the files: 'name' (default), 'modified' or 'size'
+        order (str): 'asc' (default) or 'desc'
+        offset (int): Entries to skip, counting folders first, then files
+        limit (int): Entries to return; omitted returns all of them
+        stream (bool): Return NDJSON instead: a header line without 'folders'
+            and 'files', then one line per entry
+    
+    Listings come from browse_cache, so paging through a large network
+    folder reads the directory once.
+    """
+    try:
+        start_dir = request.args.get('path', '')
+        sort = request.args.get('sort', 'name')
+        order = request.args.get('order', 'asc')
+        stream = request.args.get('stream', 'false').lower() == 'true'
+        try:
+            offset = max(int(request.args.get('offset', 0)), 0)
+            limit = int(request.args['limit']) if request.args.get('limit') else None
+        except ValueError:
+            return jsonify({'error': 'offset and limit must be integers'}), 400
+        if sort not in SORT_KEYS:
+            return jsonify({'error': f"sort must be one of {', '.join(SORT_KEYS)}"}), 400
+        if order not in ('asc', 'desc'):
+            return jsonify({'error': "order must be 'asc' or 'desc'"}), 400
         
+        folders = []
+        files = []
+        common_dirs = [start_dir] if start_dir else common_pdf_directories()
         for directory in common_dirs:
-            if os.path.exists(directory):
-                try:
-                    for item in os.listdir(directory):
-                        item_path = os.path.join(directory, item)
-                        if os.path.isdir(item_path):
-                            folders.append({
-                                'name': item,
-                                'path': item_path,
-                                'type': 'folder'
-                            })
-                        elif item.lower().endswith('.pdf'):
-                            stat = os.stat(item_path)
-                            files.append({
-                                'name': item,
-                                'path': item_path,
-                                'size': stat.st_size,
-                                'modified': stat.st_mtime,
-                                'type': 'file'
-                            })
-                except PermissionError:
-                    continue
+            if not os.path.isdir(directory):
+                continue
+            try:
+                listing = browse_cache.listing(directory)
+            except PermissionError:
+                continue
+            listing_folders, listing_files = listing.sorted(sort, order == 'desc')
+            if len(common_dirs) == 1:
+                folders, files = listing_folders, listing_files
+            else:
+                folders.extend(listing_folders)
+                files.extend(listing_files)
         
-        # Sort folders first, then files
-        folders.sort(key=lambda x: x['name'].lower())
-        files.sort(key=lambda x: x['name'].lower())
+        if len(common_dirs) > 1:
+            merged = DirectoryListing('', 0, folders, files)
+            folders, files = merged.sorted(sort, order == 'desc')
         
-        return jsonify({
+        # One page across folders then files
+        end = len(folders) + len(files) if limit is None else offset + max(limit, 0)
+        page_folders = folders[offset:end]
+        page_files = files[max(offset - len(folders), 0):max(end - len(folders), 0)]
+        
+        header = {
             'success': True,
             'current_dir': start_dir or 'Common Locations',
-            'folders': folders,
-            'files': files,
-            'parent': os.path.dirname(start_dir) if start_dir else None
-        })
+            'parent': os.path.dirname(start_dir) if start_dir else None,
+            'total_folders': len(folders),
+            'total_files': len(files),
+            'offset': offset,
+            'limit': limit,
+            'has_more': end < len(folders) + len(files)
+        }
+        
+        if stream:
+            def generate():
+                yield json.dumps(header) + '\n'
+                for entry in page_folders:
+                    yield json.dumps(entry) + '\n'
+                for entry in page_files:
+                    yield json.dumps(entry) + '\n'
+            
+            return app.response_class(generate(), mimetype='application/x-ndjson')
+        
+        return jsonify({**header, 'folders': page_folders, 'files': page_files})
         
     except Exception as e:
         print(f"Error browsing files: {str(e)}", flush=True)
@@ -1013,11 +1886,15 @@ def browse_files():
 
 @app.route('/api/find-file', methods=['POST'])
 def find_file():
-    """Find a file by name, size, and modified date."""
+    """
+    Find a file by name, size, and modified date.
+    
+    Looks the name up in the background-built path index instead of walking
+    the search directories. The response's 'index' reports how fresh the
+    index is; a miss wakes the crawler, so a file saved since the last crawl
+    is found on a later attempt.
+    """
     try:
-        import platform
-        from pathlib import Path
-        
         data = request.get_json()
         file_name = data.get('name')
         file_size = data.get('size')
@@ -1026,111 +1903,93 @@ def find_file():
         if not file_name:
             return jsonify({'error': 'File name required'}), 400
         
-        # Common directories to search
-        if platform.system() == 'Windows' or os.path.exists('/mnt/c'):
-            if os.path.exists('/mnt/c'):
-                # WSL
-                search_dirs = [
-                    '/mnt/c/Users',
-                ]
-                # Add specific user directories if we can find them
-                for user_dir in os.listdir('/mnt/c/Users'):
-                    user_path = f'/mnt/c/Users/{user_dir}'
-                    if os.path.isdir(user_path):
-                        search_dirs.extend([
-                            f'{user_path}/Documents',
-                            f'{user_path}/Downloads',
-                            f'{user_path}/Desktop',
-                            f'{user_path}/Claude',
-                        ])
-            else:
-                # Native Windows
-                search_dirs = [
-                    str(Path.home() / 'Documents'),
-                    str(Path.home() / 'Downloads'),
-                    str(Path.home() / 'Desktop'),
-                ]
-        else:
-            search_dirs = [
-                str(Path.home() / 'Documents'),
-                str(Path.home() / 'Downloads'),
-                str(Path.home() / 'Desktop'),
-            ]
-        
-        # Add current directory
-        search_dirs.append(os.getcwd())
-        
-        matches = []
-        
-        for directory in search_dirs:
-            if os.path.exists(directory):
-                for root, dirs, files in os.walk(directory):
-                    # Skip hidden directories
-                    dirs[:] = [d for d in dirs if not d.startswith('.')]
-                    
-                    for file in files:
-                        if file == file_name:
-                            file_path = os.path.join(root, file)
-                            try:
-                                stat = os.stat(file_path)
-                                # Check if size matches (if provided)
-                                if file_size and abs(stat.st_size - file_size) > 100:
-                                    continue
-                                
-                                matches.append({
-                                    'path': file_path,
-                                    'size': stat.st_size,
-                                    'modified': stat.st_mtime,
-                                    'exact_match': stat.st_size == file_size if file_size else True
-                                })
-                                
-                                # If exact match, return immediately
-                                if file_size and stat.st_size == file_size:
-                                    print(f"Found exact match: {file_path}", flush=True)
-                                    return jsonify({
-                                        'success': True,
-                                        'found': True,
-                                        'path': file_path,
-                                        'confidence': 'high'
-                                    })
-                            except:
-                                continue
-                    
-                    # Limit search depth to avoid taking too long
-                    if len(matches) > 10:
-                        break
+        matches = path_index.find(file_name, size=file_size, modified_ms=file_modified)
+        status = path_index.status()
+        index_status = {key: status[key] for key in ('ready', 'crawling', 'age_seconds', 'files')}
         
-        if len(matches) == 1:
-            print(f"Found unique match: {matches[0]['path']}", flush=True)
-            return jsonify({
-                'success': True,
-                'found': True,
-                'path': matches[0]['path'],
-                'confidence': 'medium'
-            })
-        elif len(matches) > 1:
-            # Multiple matches, return the most recent
-            matches.sort(key=lambda x: x['modified'], reverse=True)
-            print(f"Found {len(matches)} matches, returning most recent: {matches[0]['path']}", flush=True)
-            return jsonify({
-                'success': True,
-                'found': True,
-                'path': matches[0]['path'],
-                'confidence': 'low',
-                'multiple_matches': len(matches)
-            })
-        else:
+        if not matches:
+            path_index.wake()
             print(f"No matches found for {file_name}", flush=True)
             return jsonify({
                 'success': True,
-                'found': False
+                'found': False,
+                'index': index_status
             })
         
+        best = matches[0]
+        if file_size and best['exact_match']:
+            print(f"Found exact match: {best['path']}", flush=True)
+            confidence = 'high'
+        elif len(matches) == 1:
+            print(f"Found unique match: {best['path']}", flush=True)
+            confidence = 'medium'
+        else:
+            print(f"Found {len(matches)} matches, returning best: {best['path']}", flush=True)
+            confidence = 'low'
+        
+        response = {
+            'success': True,
+            'found': True,
+            'path': best['path'],
+            'confidence': confidence,
+            'index': index_status
+        }
+        if len(matches) > 1:
+            response['multiple_matches'] = len(matches)
+        return jsonify(response)
+        
     except Exception as e:
         print(f"Error finding file: {str(e)}", flush=True)
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/path-index', methods=['GET'])
+def get_path_index():
+    """Path index freshness: roots, file count, crawl state and age."""
+    return jsonify({'success': True, **path_index.status()})
+
+
+@app.route('/api/path-index/roots', methods=['POST', 'DELETE'])
+def path_index_roots():
+    """
+    Add (POST) or remove (DELETE) a path index root.
+    
+    Expects JSON with 'path' (Windows or WSL). An added root is crawled in
+    the background right away.
+    """
+    try:
+        data = request.get_json() or {}
+        if not data.get('path'):
+            return jsonify({'error': 'No path provided'}), 400
+        
+        root_path, error_msg = convert_windows_path(data['path'].strip('"').strip("'"))
+        if request.method == 'POST':
+            if error_msg:
+                return jsonify({'error': f'Path conversion failed: {error_msg}'}), 400
+            try:
+                added = path_index.add_root(root_path)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            return jsonify({'success': True, 'added': added, 'roots': path_index.roots()})
+        
+        if not path_index.remove_root(root_path if not error_msg else data['path']):
+            return jsonify({'error': 'Not a path index root'}), 404
+        return jsonify({'success': True, 'roots': path_index.roots()})
+    
+    except Exception as e:
+        print(f"Error updating path index roots: {str(e)}", flush=True)
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/path-index/refresh', methods=['POST'])
+def refresh_path_index():
+    """Crawl every path index root now and return the crawl statistics."""
+    try:
+        return jsonify({'success': True, 'crawl': path_index.crawl()})
+    except Exception as e:
+        print(f"Error crawling path index: {str(e)}", flush=True)
+        return jsonify({'error': str(e)}), 500
+
 
 @app.route('/api/load-pdf', methods=['POST'])
 def load_pdf():
@@ -1208,6 +2067,10 @@ def browse_extractions():
                                 'modified': os.path.getmtime(project_file)
                             })
             
+            # Export folders found by the catalog under its roots
+            listed = {folder['path'] for folder in common_paths}
+            common_paths.extend(project for project in project_catalog.projects() if project['path'] not in listed)
+            
             return jsonify({
                 'success': True,
                 'extraction_folders': common_paths
@@ -1281,54 +2144,41 @@ def load_extraction_details(extraction_id):
 
 @app.route('/api/search-extractions', methods=['POST'])
 def search_extractions():
-    """Search across extraction OCR text and metadata."""
+    """
+    Search across extraction OCR text and metadata.
+    
+    Expects JSON with 'query' and 'folder_path' (or a list of 'folder_paths')
+    and optionally 'where' (conditions on schedule table rows, such as
+    "HP >= 5 AND VOLTAGE = 460", which may replace the query), 'limit' and
+    'offset'. Folders are searched through a
+    persistent full-text index that is rebuilt for a folder whenever its
+    project_data.json changes. Queries support "exact phrases", prefix*
+    words, OR and -excluded words; results are ranked by BM25 and carry a
+    snippet with the matches marked.
+    """
     try:
         data = request.get_json()
-        query = data.get('query', '').lower()
-        folder_path = data.get('folder_path')
+        query = data.get('query', '').strip()
+        where = (data.get('where') or '').strip()
+        folder_paths = data.get('folder_paths') or ([data['folder_path']] if data.get('folder_path') else [])
         
-        if not query:
+        if not query and not where:
             return jsonify({'error': 'No search query provided'}), 400
-            
-        results = []
         
-        # If folder_path provided, search within that folder
-        if folder_path and os.path.exists(folder_path):
-            project_file = os.path.join(folder_path, 'project_data.json')
-            if os.path.exists(project_file):
-                with open(project_file, 'r', encoding='utf-8') as f:
-                    project_data = json.load(f)
-                    
-                # Search through extractions
-                if 'equipment' in project_data:
-                    for equipment_type, extractions in project_data['equipment'].items():
-                        for extraction in extractions:
-                            # Check if query matches any searchable field
-                            searchable_text = ' '.join([
-                                extraction.get('extractionName', ''),
-                                extraction.get('equipmentType', ''),
-                                extraction.get('extractionType', ''),
-                                extraction.get('ocrData', {}).get('rawText', ''),
-                                ' '.join(extraction.get('ocrData', {}).get('notes', {}).get('entries', []))
-                            ]).lower()
-                            
-                            if query in searchable_text:
-                                results.append({
-                                    'id': extraction.get('id'),
-                                    'extractionName': extraction.get('extractionName'),
-                                    'equipmentType': equipment_type,
-                                    'extractionType': extraction.get('extractionType'),
-                                    'relevance': searchable_text.count(query)
-                                })
-        
-        # Sort by relevance
-        results.sort(key=lambda x: x.get('relevance', 0), reverse=True)
+        try:
+            limit = int(data.get('limit') or SEARCH_RESULT_LIMIT)
+            offset = int(data.get('offset') or 0)
+            found = search_index.search(query or None, [path for path in folder_paths if os.path.isdir(path)],
+                                        limit=limit, offset=offset, where=where or None)
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
         
         return jsonify({
             'success': True,
-            'results': results,
+            'results': found['results'],
             'query': query,
-            'total_found': len(results)
+            'total_found': found['total_found'],
+            'folders_refreshed': found['folders_refreshed']
         })
         
     except Exception as e:
@@ -1336,6 +2186,140 @@ def search_extractions():
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/search-extractions/clear', methods=['POST'])
+def clear_search_index():
+    """
+    Drop the full-text index. Folders are re-indexed the next time they are
+    searched, and catalogued folders on the next catalog crawl, which starts
+    right away.
+    """
+    search_index.clear()
+    project_catalog.wake()
+    return jsonify({'success': True, 'message': 'Search index cleared'})
+
+
+@app.route('/api/catalog', methods=['GET'])
+def get_catalog():
+    """
+    Catalog status: configured roots, crawl statistics and, with
+    ?projects=true, every catalogued export folder. ?columns=true adds the
+    schedule table columns that conditions can refer to, with row counts.
+    """
+    response = {
+        'success': True,
+        'roots': project_catalog.roots(),
+        'stats': project_catalog.stats()
+    }
+    if request.args.get('projects', 'false').lower() == 'true':
+        response['projects'] = project_catalog.projects()
+    if request.args.get('columns', 'false').lower() == 'true':
+        response['columns'] = project_catalog.columns()
+    return jsonify(response)
+
+
+@app.route('/api/catalog/roots', methods=['POST', 'DELETE'])
+def catalog_roots():
+    """
+    Add (POST) or remove (DELETE) a catalog root.
+    
+    Expects JSON with 'path' (Windows or WSL). An added root is crawled in
+    the background right away; removing a root drops its export folders
+    from the catalog.
+    """
+    try:
+        data = request.get_json() or {}
+        if not data.get('path'):
+            return jsonify({'error': 'No path provided'}), 400
+        
+        if request.method == 'POST':
+            root_path, error_msg = convert_windows_path(data['path'].strip('"').strip("'"))
+            if error_msg:
+                return jsonify({'error': f'Path conversion failed: {error_msg}'}), 400
+            try:
+                added = project_catalog.add_root(root_path)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            return jsonify({'success': True, 'added': added, 'roots': project_catalog.roots()})
+        
+        root_path, error_msg = convert_windows_path(data['path'].strip('"').strip("'"))
+        removed = project_catalog.remove_root(root_path if not error_msg else data['path'])
+        if not removed:
+            return jsonify({'error': 'Not a catalog root'}), 404
+        return jsonify({'success': True, 'roots': project_catalog.roots()})
+    
+    except Exception as e:
+        print(f"Error updating catalog roots: {str(e)}", flush=True)
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/catalog/refresh', methods=['POST'])
+def refresh_catalog():
+    """Crawl every catalog root now and return the crawl statistics."""
+    try:
+        return jsonify({'success': True, 'crawl': project_catalog.crawl()})
+    except Exception as e:
+        print(f"Error crawling catalog: {str(e)}", flush=True)
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/catalog/clear', methods=['POST'])
+def clear_catalog():
+    """
+    Forget the crawled directories and projects (roots are kept) and rebuild
+    the catalog with a full crawl in the background. The search index is
+    left alone; see /api/search-extractions/clear.
+    """
+    project_catalog.clear()
+    return jsonify({'success': True, 'message': 'Catalog cleared', 'roots': project_catalog.roots()})
+
+
+@app.route('/api/catalog/search', methods=['POST'])
+def search_catalog():
+    """
+    Search the extractions of every catalogued export folder.
+    
+    Expects JSON with any of:
+        query (str): Full-text query, as for /api/search-extractions; when
+            omitted every extraction passing the filters is returned
+        equipment_types (list): Equipment groups to include, e.g. ["FANS"]
+        extraction_types (list): Extraction types to include, e.g. ["schedule"]
+        where (str): Conditions on schedule table rows, e.g.
+            "CFM > 5000" or "HP >= 5 AND VOLTAGE = 460"; matching
+            extractions carry their matching 'rows'
+        roots (list): Only search folders under these catalog roots
+        limit (int), offset (int): Page of results
+    """
+    try:
+        data = request.get_json() or {}
+        query = (data.get('query') or '').strip() or None
+        
+        try:
+            limit = int(data.get('limit') or SEARCH_RESULT_LIMIT)
+            offset = int(data.get('offset') or 0)
+            found = project_catalog.search(query,
+                                           equipment_types=data.get('equipment_types') or None,
+                                           extraction_types=data.get('extraction_types') or None,
+                                           where=(data.get('where') or '').strip() or None,
+                                           roots=data.get('roots') or None,
+                                           limit=limit, offset=offset)
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify({
+            'success': True,
+            'results': found['results'],
+            'query': query,
+            'where': data.get('where'),
+            'total_found': found['total_found'],
+            'folders_searched': found['folders_searched'],
+            'last_crawl': project_catalog.last_crawl
+        })
+    
+    except Exception as e:
+        print(f"Error searching catalog: {str(e)}", flush=True)
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/api/extraction-file/<path:file_path>', methods=['GET'])
 def serve_extraction_file(file_path):
     """Serve extraction files (images, JSON, TXT) from extraction folders."""
@@ -1439,8 +2423,16 @@ if __name__ == '__main__':
     print("  POST /api/detect_spaces - Upload PDF and detect spaces")
     print("  POST /api/detect_spaces_from_path - Detect spaces from file path")
     print("  GET  /api/spaces/<file_hash> - Get cached spaces")
+    print("  GET  /api/spaces/<file_hash>/summary - Get page and space counts")
+    print("  GET  /api/spaces/<file_hash>/page/<n> - Get the spaces of one page")
+    print("  POST /api/spaces/<file_hash>/query - Find spaces at a point or in a rectangle")
     print("  POST /api/clear_cache - Clear spaces cache")
     print("  GET  /api/cache_stats - Get cache statistics")
+    print("  POST /api/render-region - Render one extraction region server-side")
+    print("  POST /api/render-regions - Render a whole session's extraction regions")
+    print("  POST /api/pdf/open - Prepare a PDF for tiled viewing (page sizes, thumbnails)")
+    print("  GET  /api/pdf/<file_hash>/thumbnail/<page> - Page thumbnail")
+    print("  GET  /api/pdf/<file_hash>/tile/<page>/<level>/<column>/<row> - Page tile")
     print("  GET  /api/health - Health check")
     print("")
     print("Session Management:")
@@ -1450,15 +2442,41 @@ if __name__ == '__main__':
     print("")
     print("Local Export:")
     print("  POST /api/export/local - Export ZIP to PDF directory")
+    print("  POST /api/export/local/stream - Stream a ZIP upload into the PDF directory")
+    print("  GET  /api/export/local/progress/<upload_id> - Progress of a streamed export")
+    print("  GET  /api/jobs - List background jobs")
+    print("  GET  /api/jobs/<job_id> - Job status with per-stage progress and timings")
+    print("  POST /api/jobs/<job_id>/cancel - Cancel a background job")
     print("")
     print("Equipment Browser:")
     print("  GET  /api/browse-extractions - List available extraction folders")
     print("  POST /api/browse-extractions - Load project data from folder")
     print("  GET  /api/load-extraction/<id> - Load extraction details")
     print("  POST /api/search-extractions - Search across extractions")
+    print("  POST /api/search-extractions/clear - Drop the search index")
     print("  GET  /api/extraction-file/<path> - Serve extraction files")
     print("")
+    print("Project Catalog:")
+    print("  GET  /api/catalog - Catalog roots, crawl statistics and folders")
+    print("  POST /api/catalog/roots - Add a catalog root (DELETE to remove)")
+    print("  POST /api/catalog/refresh - Crawl the catalog roots now")
+    print("  POST /api/catalog/clear - Forget the crawled folders and crawl again")
+    print("  POST /api/catalog/search - Search extractions across every catalogued folder")
+    print("")
+    print("File Lookup:")
+    print("  GET  /api/browse - List a directory's folders and PDFs (paged, sorted)")
+    print("  POST /api/find-file - Find a PDF's path by name, size and modified time")
+    print("  GET  /api/path-index - Path index roots, size and freshness")
+    print("  POST /api/path-index/roots - Add a path index root (DELETE to remove)")
+    print("  POST /api/path-index/refresh - Crawl the path index roots now")
+    print("")
     print("Server running on http://localhost:5000")
     print("CORS enabled for all origins")
     
+    # With the reloader the parent process only watches source files; the child serves requests
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        job_queue.recover_interrupted()
+        project_catalog.start()
+        path_index.start()
+    
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
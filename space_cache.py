@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Persistent Space Detection Cache
+================================
+
+SQLite-backed cache of BlueBeam Space detection results keyed by the
+SHA-256 of the PDF contents. Results are stored as zlib-compressed JSON,
+survive server restarts and are shared by every process that opens the
+same database file. Entries are evicted least-recently-used first once the
+cache grows past its size limit, and entries older than the age limit are
+dropped.
+"""
+
+import json
+import os
+import sqlite3
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Any
+
+
+class SpaceCache:
+    """Persistent LRU cache for Space detection results."""
+    
+    def __init__(self, db_path: str, max_bytes: int = 512 * 1024 * 1024,
+                 max_age_seconds: Optional[float] = 30 * 24 * 3600):
+        """
+        Initialize the cache, creating the database if needed.
+        
+        Args:
+            db_path: Path to the SQLite database file
+            max_bytes: Maximum total size of the compressed results
+            max_age_seconds: Entries not accessed for this long are evicted
+                (None disables age-based eviction)
+        """
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        
+        db_dir = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(db_dir, exist_ok=True)
+        
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS results (
+                    file_hash TEXT PRIMARY KEY,
+                    data BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    total_spaces INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    last_accessed REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_results_last_accessed ON results(last_accessed)')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS counters (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                )
+            ''')
+            conn.executemany('INSERT OR IGNORE INTO counters (name, value) VALUES (?, 0)',
+                             [('hits',), ('misses',), ('evictions',)])
+    
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection for one operation; this keeps the cache safe across threads."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def _bump(conn: sqlite3.Connection, name: str, amount: int = 1) -> None:
+        conn.execute('UPDATE counters SET value = value + ? WHERE name = ?', (amount, name))
+    
+    def get(self, file_hash: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a detection result.
+        
+        Args:
+            file_hash: SHA-256 of the PDF file
+        
+        Returns:
+            Cached result dictionary, or None on a miss
+        """
+        now = time.time()
+        
+        with self._connect() as conn:
+            row = conn.execute('SELECT data, last_accessed FROM results WHERE file_hash = ?',
+                               (file_hash,)).fetchone()
+            
+            if row and self.max_age_seconds is not None and now - row[1] > self.max_age_seconds:
+                conn.execute('DELETE FROM results WHERE file_hash = ?', (file_hash,))
+                self._bump(conn, 'evictions')
+                row = None
+            
+            if not row:
+                self._bump(conn, 'misses')
+                return None
+            
+            conn.execute('UPDATE results SET last_accessed = ? WHERE file_hash = ?', (now, file_hash))
+            self._bump(conn, 'hits')
+        
+        return json.loads(zlib.decompress(row[0]))
+    
+    def peek(self, file_hash: str) -> Optional[Dict[str, Any]]:
+        """Return a cached result without touching the hit/miss counters or LRU order."""
+        with self._connect() as conn:
+            row = conn.execute('SELECT data FROM results WHERE file_hash = ?', (file_hash,)).fetchone()
+        return json.loads(zlib.decompress(row[0])) if row else None
+    
+    def put(self, file_hash: str, result: Dict[str, Any]) -> None:
+        """
+        Store a detection result and evict old entries if over the limits.
+        
+        Args:
+            file_hash: SHA-256 of the PDF file
+            result: JSON-serialisable detection result
+        """
+        data = zlib.compress(json.dumps(result, separators=(',', ':')).encode('utf-8'))
+        now = time.time()
+        
+        with self._connect() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO results (file_hash, data, size, total_spaces, created, last_accessed)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (file_hash, data, len(data), result.get('total_spaces', 0), now, now))
+            self._evict(conn, now)
+    
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        """Drop expired entries, then least-recently-used entries until under max_bytes."""
+        evicted = 0
+        
+        if self.max_age_seconds is not None:
+            evicted += conn.execute('DELETE FROM results WHERE last_accessed < ?',
+                                    (now - self.max_age_seconds,)).rowcount
+        
+        total_size = conn.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+        if total_size > self.max_bytes:
+            for file_hash, size in conn.execute(
+                    'SELECT file_hash, size FROM results ORDER BY last_accessed ASC').fetchall():
+                if total_size <= self.max_bytes:
+                    break
+                conn.execute('DELETE FROM results WHERE file_hash = ?', (file_hash,))
+                total_size -= size
+                evicted += 1
+        
+        if evicted:
+            self._bump(conn, 'evictions', evicted)
+    
+    def clear(self) -> None:
+        """Remove every cached result (counters are kept)."""
+        with self._connect() as conn:
+            conn.execute('DELETE FROM results')
+    
+    def keys(self) -> List[str]:
+        """Return the cached file hashes, most recently used first."""
+        with self._connect() as conn:
+            rows = conn.execute('SELECT file_hash FROM results ORDER BY last_accessed DESC').fetchall()
+        return [row[0] for row in rows]
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+        
+        Returns:
+            Dictionary with entry counts, sizes, limits and hit/miss counters
+        """
+        with self._connect() as conn:
+            count, total_size, total_spaces = conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(total_spaces), 0) FROM results'
+            ).fetchone()
+            counters = dict(conn.execute('SELECT name, value FROM counters').fetchall())
+        
+        lookups = counters['hits'] + counters['misses']
+        
+        return {
+            'cached_files': count,
+            'file_hashes': self.keys(),
+            'total_spaces': total_spaces,
+            'size_bytes': total_size,
+            'max_bytes': self.max_bytes,
+            'max_age_seconds': self.max_age_seconds,
+            'hits': counters['hits'],
+            'misses': counters['misses'],
+            'evictions': counters['evictions'],
+            'hit_rate': counters['hits'] / lookups if lookups else 0.0,
+            'db_path': self.db_path
+        }
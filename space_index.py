@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+BlueBeam Space Spatial Index
+============================
+
+Per-page uniform grid index over detected BlueBeam Spaces, answering
+"which Space contains this point" and "which Spaces overlap this
+rectangle" without testing every polygon on the page.
+"""
+
+import math
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from bluebeam_space_handler import BlueBeamSpace
+
+# Coordinate systems queries can be expressed in
+COORDINATE_SYSTEMS = ("pymupdf", "pdf")
+
+# Target number of Spaces per grid cell
+SPACES_PER_CELL = 4
+
+
+def point_in_polygon(vertices: np.ndarray, x: float, y: float) -> bool:
+    """
+    Even-odd ray casting test, vectorised over the polygon edges.
+    
+    Args:
+        vertices: Nx2 array of polygon vertices
+        x: Point x coordinate
+        y: Point y coordinate
+    
+    Returns:
+        bool: True if the point is inside the polygon
+    """
+    xs = vertices[:, 0]
+    ys = vertices[:, 1]
+    prev_xs = np.roll(xs, 1)
+    prev_ys = np.roll(ys, 1)
+    
+    straddles = (ys > y) != (prev_ys > y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        crossing_x = xs + (y - ys) * (prev_xs - xs) / (prev_ys - ys)
+    
+    return bool(np.count_nonzero(straddles & (x < crossing_x)) % 2)
+
+
+class _PageGrid:
+    """Uniform grid over the Space bounding boxes of one page."""
+    
+    def __init__(self, spaces: List[BlueBeamSpace], polygons: List[np.ndarray]):
+        self.spaces = spaces
+        self.polygons = polygons
+        self.boxes = np.array([
+            [p[:, 0].min(), p[:, 1].min(), p[:, 0].max(), p[:, 1].max()] for p in polygons
+        ], dtype=np.float64).reshape(-1, 4)
+        
+        self.origin_x, self.origin_y = self.boxes[:, 0].min(), self.boxes[:, 1].min()
+        extent_x = max(self.boxes[:, 2].max() - self.origin_x, 1e-6)
+        extent_y = max(self.boxes[:, 3].max() - self.origin_y, 1e-6)
+        
+        # Square-ish cells sized so that each holds about SPACES_PER_CELL spaces
+        cells = max(1, len(spaces) // SPACES_PER_CELL)
+        self.cell_size = max(math.sqrt(extent_x * extent_y / cells), 1e-6)
+        
+        self.cells: Dict[Tuple[int, int], List[int]] = {}
+        for i, box in enumerate(self.boxes):
+            for cell in self._cells_for_box(box):
+                self.cells.setdefault(cell, []).append(i)
+        
+        # Range of occupied cells, used to clamp queries
+        self.cell_limits = self._cell_range(self.origin_x, self.origin_y,
+                                            self.boxes[:, 2].max(), self.boxes[:, 3].max())
+    
+    def _cell_range(self, x0: float, y0: float, x1: float, y1: float) -> Tuple[int, int, int, int]:
+        return (
+            int((x0 - self.origin_x) // self.cell_size),
+            int((y0 - self.origin_y) // self.cell_size),
+            int((x1 - self.origin_x) // self.cell_size),
+            int((y1 - self.origin_y) // self.cell_size)
+        )
+    
+    def _cells_for_box(self, box) -> List[Tuple[int, int]]:
+        cx0, cy0, cx1, cy1 = self._cell_range(*box)
+        return [(cx, cy) for cx in range(cx0, cx1 + 1) for cy in range(cy0, cy1 + 1)]
+    
+    def candidates(self, x0: float, y0: float, x1: float, y1: float) -> List[int]:
+        """Indices of spaces whose bounding box intersects the rectangle."""
+        cx0, cy0, cx1, cy1 = self._cell_range(x0, y0, x1, y1)
+        
+        # Clamp to occupied cells so huge query rectangles stay cheap
+        cx0 = max(cx0, self.cell_limits[0])
+        cy0 = max(cy0, self.cell_limits[1])
+        cx1 = min(cx1, self.cell_limits[2])
+        cy1 = min(cy1, self.cell_limits[3])
+        
+        found = set()
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                found.update(self.cells.get((cx, cy), ()))
+        
+        return [
+            i for i in sorted(found)
+            if self.boxes[i, 0] <= x1 and self.boxes[i, 2] >= x0
+            and self.boxes[i, 1] <= y1 and self.boxes[i, 3] >= y0
+        ]
+
+
+class SpaceIndex:
+    """Spatial index over the Spaces of a detection result, one grid per page."""
+    
+    def __init__(self, spaces: List[BlueBeamSpace], coordinate_system: str = "pymupdf"):
+        """
+        Build the index.
+        
+        Args:
+            spaces: Detected spaces (with pymupdf_rect set)
+            coordinate_system: "pymupdf" to query in the same coordinates as
+                pymupdf_rect (what the frontend overlays use), or "pdf" for the
+                original BlueBeam coordinates
+        """
+        if coordinate_system not in COORDINATE_SYSTEMS:
+            raise ValueError(f"Unknown coordinate system '{coordinate_system}', expected one of {COORDINATE_SYSTEMS}")
+        
+        self.coordinate_system = coordinate_system
+        
+        by_page: Dict[int, List[BlueBeamSpace]] = {}
+        for space in spaces:
+            by_page.setdefault(space.page_number, []).append(space)
+        
+        self.pages: Dict[int, _PageGrid] = {}
+        for page_number, page_spaces in by_page.items():
+            if coordinate_system == "pymupdf":
+                polygons = [space.transformed_vertices() for space in page_spaces]
+            else:
+                polygons = [space.vertices.astype(np.float64) for space in page_spaces]
+            self.pages[page_number] = _PageGrid(page_spaces, polygons)
+    
+    def query_point(self, page_number: int, x: float, y: float) -> List[BlueBeamSpace]:
+        """
+        Find the spaces whose polygon contains a point.
+        
+        Args:
+            page_number: Zero-based page number
+            x: Point x coordinate
+            y: Point y coordinate
+        
+        Returns:
+            Matching spaces, smallest first (the innermost Space leads)
+        """
+        grid = self.pages.get(page_number)
+        if not grid:
+            return []
+        
+        matches = [
+            grid.spaces[i] for i in grid.candidates(x, y, x, y)
+            if point_in_polygon(grid.polygons[i], x, y)
+        ]
+        matches.sort(key=lambda space: space.area if space.area is not None else 0.0)
+        return matches
+    
+    def query_rect(self, page_number: int, rect: Tuple[float, float, float, float],
+                   mode: str = "overlap") -> List[Tuple[BlueBeamSpace, float]]:
+        """
+        Find the spaces overlapping or containing a rectangle.
+        
+        Args:
+            page_number: Zero-based page number
+            rect: (x0, y0, x1, y1) query rectangle
+            mode: "overlap" returns every space whose bounding box intersects
+                the rectangle; "contains" only spaces whose polygon contains
+                all four corners of the rectangle
+        
+        Returns:
+            List of (space, overlap) tuples, where overlap is the fraction of
+            the rectangle covered by the space's bounding box, best match first
+        """
+        if mode not in ("overlap", "contains"):
+            raise ValueError(f"Unknown query mode '{mode}', expected 'overlap' or 'contains'")
+        
+        grid = self.pages.get(page_number)
+        if not grid:
+            return []
+        
+        x0, y0, x1, y1 = min(rect[0], rect[2]), min(rect[1], rect[3]), max(rect[0], rect[2]), max(rect[1], rect[3])
+        rect_area = max((x1 - x0) * (y1 - y0), 1e-12)
+        corners = ((x0, y0), (x1, y0), (x1, y1), (x0, y1))
+        
+        matches = []
+        for i in grid.candidates(x0, y0, x1, y1):
+            if mode == "contains" and not all(point_in_polygon(grid.polygons[i], cx, cy) for cx, cy in corners):
+                continue
+            
+            box = grid.boxes[i]
+            overlap_w = min(x1, box[2]) - max(x0, box[0])
+            overlap_h = min(y1, box[3]) - max(y0, box[1])
+            overlap = max(overlap_w, 0.0) * max(overlap_h, 0.0) / rect_area
+            matches.append((grid.spaces[i], min(float(overlap), 1.0)))
+        
+        matches.sort(key=lambda match: (-match[1], match[0].area if match[0].area is not None else 0.0))
+        return matches
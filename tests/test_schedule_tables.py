@@ -0,0 +1,145 @@
+"""Tests for schedule_tables: number parsing, condition parsing and the column index."""
+
+import re
+
+import pytest
+
+from schedule_tables import ScheduleIndex, parse_number, parse_where, record_cells, table_records
+
+HEADERS = ['Tag', 'Supply CFM', 'HP', 'V/PH/HZ']
+ROWS = [
+    ['EF-1', '2,000', '1-1/2', '460/3/60'],
+    ['EF-2', '500', '', '208/1/60'],
+    ['AHU-1', '', '10 kW', ''],
+]
+
+
+def build_index(headers=HEADERS, rows=ROWS):
+    records = table_records(headers, rows)
+    return ScheduleIndex([cell for row_number, record in enumerate(records)
+                          for cell in record_cells(1, row_number, record)])
+
+
+def matching_tags(index, where):
+    return sorted(index.row(position)['TAG'] for positions in index.query(parse_where(where)).values()
+                  for position in positions)
+
+
+@pytest.mark.parametrize('text, field, header_unit, expected', [
+    ('1-1/2', None, None, 1.5),
+    ('1-1/2 HP', 'HP', None, 1.5),
+    ('½ HP', 'HP', None, 0.5),
+    ('460/3/60', None, None, 460.0),
+    ('208-230/1/60', None, None, 208.0),
+    ('1,200', None, None, 1200.0),
+    ('2,000 L/s', None, None, 2000.0),
+    ('2,000 L/s', 'CFM', None, 4237.76),
+    ('2000', 'CFM', 'L/S', 4237.76),
+    ('10 kW', 'HP', None, 13.4102),
+    ('250 Pa', 'STATIC', None, 1.003658),
+    ('-5', None, None, -5.0),
+])
+def test_parse_number(text, field, header_unit, expected):
+    assert parse_number(text, field, header_unit) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize('text', ['EF-1', 'TBD', 'ECM, 1/2 HP', ''])
+def test_parse_number_without_leading_number(text):
+    assert parse_number(text, 'HP') is None
+
+
+def test_parse_number_anywhere():
+    assert parse_number('ECM, 1/2 HP', 'HP', anywhere=True) == 0.5
+
+
+def test_parse_where_tree():
+    assert parse_where('HP >= 5 AND NOT (TAG ~ EF OR "Supply CFM" = \'1,200\')') == (
+        'and', [
+            ('compare', 'HP', '>=', '5', 5.0),
+            ('not', ('or', [('compare', 'TAG', '~', 'EF', None),
+                            ('compare', 'SUPPLY_CFM', '=', '1,200', None)])),
+        ])
+
+
+def test_parse_where_or_binds_loosest():
+    assert parse_where('A = 1 OR B = 2 AND C = 3') == (
+        'or', [('compare', 'A', '=', '1', 1.0),
+               ('and', [('compare', 'B', '=', '2', 2.0), ('compare', 'C', '=', '3', 3.0)])])
+
+
+@pytest.mark.parametrize('where, message', [
+    ('HP >=', 'Expected a value after HP >=, found end of conditions'),
+    ('(HP > 1', 'Missing ) in conditions, found end of conditions'),
+    ('HP 5', "Expected one of <= >= != = < > ~ after HP, found '5'"),
+    ('AND HP > 1', "Expected a column name, found 'AND'"),
+    ('HP > 1)', "Unexpected ')' in conditions"),
+    ('HP ! 1', 'Unexpected character in conditions at position 2'),
+])
+def test_parse_where_errors(where, message):
+    with pytest.raises(ValueError, match=re.escape(message)):
+        parse_where(where)
+
+
+def test_table_records_split_electrical_and_alias():
+    records = table_records(HEADERS, ROWS)
+    
+    assert records[0]['cells']['VOLTAGE'] == [460.0, '460']
+    assert records[0]['cells']['PHASE'] == [3.0, '3']
+    assert records[0]['cells']['HZ'] == [60.0, '60']
+    assert records[0]['cells']['TAG'] == [None, 'EF-1']
+    assert records[0]['aliases'] == {'CFM': 'SUPPLY_CFM'}
+    # No Supply CFM cell in the last row, so no alias either
+    assert records[2]['aliases'] == {}
+    assert records[2]['cells']['HP'][0] == pytest.approx(13.4102)
+
+
+def test_index_alias_column():
+    index = build_index()
+    
+    assert matching_tags(index, 'CFM > 1000') == ['EF-1']
+    assert matching_tags(index, 'SUPPLY_CFM > 1000') == ['EF-1']
+    assert matching_tags(index, 'CFM <= 500') == ['EF-2']
+    assert index.column_counts()['CFM'] == 2
+
+
+def test_index_numbers_and_text():
+    index = build_index()
+    
+    assert matching_tags(index, 'HP >= 1.5') == ['AHU-1', 'EF-1']
+    assert matching_tags(index, 'HP = 1-1/2') == ['EF-1']
+    assert matching_tags(index, 'VOLTAGE = 460 AND PHASE = 3') == ['EF-1']
+    assert matching_tags(index, 'TAG = ef-2') == ['EF-2']
+    assert matching_tags(index, 'TAG ~ EF') == ['EF-1', 'EF-2']
+    assert matching_tags(index, 'HP > 1 OR VOLTAGE < 300') == ['AHU-1', 'EF-1', 'EF-2']
+    assert matching_tags(index, 'UNKNOWN = 1') == []
+
+
+def test_index_missing_column_with_not_equal_and_not():
+    index = build_index()
+    
+    # != only matches rows that have the column...
+    assert matching_tags(index, 'HP != 1.5') == ['AHU-1']
+    assert matching_tags(index, 'VOLTAGE != 460') == ['EF-2']
+    # ...while NOT matches every row the condition does not
+    assert matching_tags(index, 'NOT HP = 1.5') == ['AHU-1', 'EF-2']
+    assert matching_tags(index, 'NOT VOLTAGE = 460') == ['AHU-1', 'EF-2']
+    assert matching_tags(index, 'NOT UNKNOWN = 1') == ['AHU-1', 'EF-1', 'EF-2']
+
+
+def test_index_rows_and_entries():
+    records = table_records(HEADERS, ROWS)
+    cells = [cell for row_number, record in enumerate(records[:2]) for cell in record_cells(7, row_number, record)]
+    cells += record_cells(9, 0, records[2])
+    index = ScheduleIndex(cells)
+    
+    assert index.size == 3
+    assert index.query(parse_where('HP > 0')) == {7: [0], 9: [2]}
+    assert index.row(1) == {'TAG': 'EF-2', 'SUPPLY_CFM': 500.0, 'VOLTAGE': 208.0, 'PHASE': 1.0, 'HZ': 60.0,
+                            'V_PH_HZ': 208.0}
+
+
+def test_empty_index():
+    index = ScheduleIndex([])
+    
+    assert index.size == 0
+    assert index.query(parse_where('HP > 1')) == {}
@@ -0,0 +1,250 @@
+"""Tests for zip_stream: streaming ZIP extraction and the multipart file part reader."""
+
+import io
+import os
+import struct
+import zipfile
+
+import pytest
+
+from zip_stream import MultipartFileStream, extract_zip_stream, iter_zip_stream
+
+BOUNDARY = b'----exportboundary'
+
+
+class UnseekableWriter(io.RawIOBase):
+    """Write-only stream, so zipfile defers entry sizes to data descriptors."""
+    
+    def __init__(self):
+        self.data = bytearray()
+    
+    def writable(self):
+        return True
+    
+    def write(self, data):
+        self.data += data
+        return len(data)
+
+
+class TrickleReader:
+    """Forward-only stream returning at most a few bytes per read, to split every structure."""
+    
+    def __init__(self, data, step=7):
+        self.data = data
+        self.position = 0
+        self.step = step
+    
+    def read(self, size=-1):
+        size = self.step if size < 0 else min(size, self.step)
+        chunk = self.data[self.position:self.position + size]
+        self.position += len(chunk)
+        return chunk
+
+
+def build_zip(entries, seekable=True, force_zip64=False):
+    """ZIP of (name, data, compress_type) entries, written like a file (seekable) or a socket."""
+    target = io.BytesIO() if seekable else UnseekableWriter()
+    with zipfile.ZipFile(target, 'w') as archive:
+        for name, data, compress_type in entries:
+            info = zipfile.ZipInfo(name)
+            info.compress_type = compress_type
+            with archive.open(info, 'w', force_zip64=force_zip64) as f:
+                f.write(data)
+    return bytes(target.getvalue() if seekable else target.data)
+
+
+def local_headers(archive):
+    """(offset, flags, method, compressed size, uncompressed size) of each local file header."""
+    headers = []
+    offset = archive.find(b'PK\x03\x04')
+    while offset >= 0:
+        _, flags, method, _, _, _, compressed_size, uncompressed_size, _, _ = struct.unpack_from(
+            '<HHHHHIIIHH', archive, offset + 4)
+        headers.append((offset, flags, method, compressed_size, uncompressed_size))
+        offset = archive.find(b'PK\x03\x04', offset + 4)
+    return headers
+
+
+def read_tree(folder):
+    files = {}
+    for dir_path, _, names in os.walk(folder):
+        for name in names:
+            path = os.path.join(dir_path, name)
+            with open(path, 'rb') as f:
+                files[os.path.relpath(path, folder).replace(os.sep, '/')] = f.read()
+    return files
+
+
+def multipart_body(fields, file_field, filename, data):
+    parts = []
+    for name, value in fields.items():
+        parts.append(b'--' + BOUNDARY + b'\r\n'
+                     + f'Content-Disposition: form-data; name="{name}"\r\n\r\n'.encode() + value.encode() + b'\r\n')
+    parts.append(b'--' + BOUNDARY + b'\r\n'
+                 + f'Content-Disposition: form-data; name="{file_field}"; filename="{filename}"\r\n'.encode()
+                 + b'Content-Type: application/zip\r\n\r\n' + data + b'\r\n')
+    return b''.join(parts) + b'--' + BOUNDARY + b'--\r\n'
+
+
+CONTENTS = {
+    'project_data.json': b'{"equipment": {}}',
+    'images/ef-1.png': bytes(range(256)) * 40,
+    'notes/readme.txt': b'supply fan schedule\n' * 500,
+}
+
+
+def test_stored_and_deflated_entries(tmp_path):
+    archive = build_zip([('project_data.json', CONTENTS['project_data.json'], zipfile.ZIP_STORED),
+                         ('images/', b'', zipfile.ZIP_STORED),
+                         ('images/ef-1.png', CONTENTS['images/ef-1.png'], zipfile.ZIP_DEFLATED),
+                         ('notes/readme.txt', CONTENTS['notes/readme.txt'], zipfile.ZIP_DEFLATED)])
+    assert [header[1] & 0x08 for header in local_headers(archive)] == [0, 0, 0, 0]
+    
+    entries = list(iter_zip_stream(TrickleReader(archive), str(tmp_path)))
+    
+    assert [(entry['name'], entry['is_dir'], entry['size']) for entry in entries] == [
+        ('project_data.json', False, len(CONTENTS['project_data.json'])),
+        ('images/', True, 0),
+        ('images/ef-1.png', False, len(CONTENTS['images/ef-1.png'])),
+        ('notes/readme.txt', False, len(CONTENTS['notes/readme.txt'])),
+    ]
+    assert entries[2]['path'] == os.path.join(str(tmp_path), 'images', 'ef-1.png')
+    assert read_tree(tmp_path) == CONTENTS
+
+
+def test_data_descriptor_entries(tmp_path):
+    archive = build_zip([(name, data, zipfile.ZIP_DEFLATED) for name, data in CONTENTS.items()], seekable=False)
+    headers = local_headers(archive)
+    assert all(flags & 0x08 and compressed_size == 0 for _, flags, _, compressed_size, _ in headers)
+    
+    progress = []
+    result = extract_zip_stream(TrickleReader(archive, step=4096), str(tmp_path),
+                                lambda bytes_read, entries: progress.append((bytes_read, entries)))
+    
+    assert result == {'entries': 3, 'bytes_written': sum(len(data) for data in CONTENTS.values())}
+    assert read_tree(tmp_path) == CONTENTS
+    assert progress[-1] == (len(archive), 3)
+
+
+def test_stored_entry_with_data_descriptor_is_rejected(tmp_path):
+    archive = build_zip([('project_data.json', b'{}', zipfile.ZIP_STORED)], seekable=False)
+    
+    with pytest.raises(ValueError, match='Stored ZIP entries must record their size'):
+        extract_zip_stream(io.BytesIO(archive), str(tmp_path))
+
+
+@pytest.mark.parametrize('seekable, compress_type', [
+    (True, zipfile.ZIP_STORED),
+    (True, zipfile.ZIP_DEFLATED),
+    (False, zipfile.ZIP_DEFLATED),
+])
+def test_zip64_sizes(tmp_path, seekable, compress_type):
+    archive = build_zip([(name, data, compress_type) for name, data in CONTENTS.items()],
+                        seekable=seekable, force_zip64=True)
+    assert all(compressed_size == 0xFFFFFFFF for _, _, _, compressed_size, _ in local_headers(archive))
+    
+    result = extract_zip_stream(TrickleReader(archive, step=1000), str(tmp_path))
+    
+    assert result['entries'] == 3
+    assert read_tree(tmp_path) == CONTENTS
+
+
+@pytest.mark.parametrize('seekable', [True, False])
+def test_truncated_stream(tmp_path, seekable):
+    archive = build_zip([(name, data, zipfile.ZIP_DEFLATED) for name, data in CONTENTS.items()], seekable=seekable)
+    last_entry = local_headers(archive)[-1][0]
+    
+    for cut in (last_entry + 10, last_entry + 60, archive.find(b'PK\x01\x02') - 3):
+        with pytest.raises(ValueError, match='Unexpected end of ZIP stream'):
+            extract_zip_stream(io.BytesIO(archive[:cut]), str(tmp_path))
+
+
+def test_empty_and_foreign_streams(tmp_path):
+    with pytest.raises(ValueError, match='Empty ZIP stream'):
+        extract_zip_stream(io.BytesIO(b''), str(tmp_path))
+    with pytest.raises(ValueError, match='Not a ZIP archive'):
+        extract_zip_stream(io.BytesIO(b'%PDF-1.7\n' + b'0' * 100), str(tmp_path))
+
+
+def test_crc_mismatch(tmp_path):
+    data = b'supply fan EF-1'
+    archive = build_zip([('notes.txt', data, zipfile.ZIP_STORED)])
+    
+    with pytest.raises(ValueError, match="Corrupt ZIP entry 'notes.txt'"):
+        extract_zip_stream(io.BytesIO(archive.replace(data, b'supply fan EF-7')), str(tmp_path))
+
+
+def test_crc_mismatch_in_data_descriptor(tmp_path):
+    archive = bytearray(build_zip([('notes.txt', b'supply fan EF-1' * 50, zipfile.ZIP_DEFLATED)], seekable=False))
+    descriptor = archive.find(b'PK\x07\x08')
+    archive[descriptor + 4] ^= 0xFF
+    
+    with pytest.raises(ValueError, match="Corrupt ZIP entry 'notes.txt'"):
+        extract_zip_stream(io.BytesIO(bytes(archive)), str(tmp_path))
+
+
+def test_names_stay_inside_dest_dir(tmp_path):
+    dest_dir = tmp_path / 'export'
+    archive = build_zip([('../escaped.txt', b'a', zipfile.ZIP_STORED),
+                         ('/etc/absolute.txt', b'b', zipfile.ZIP_DEFLATED),
+                         ('images/../../../up.txt', b'c', zipfile.ZIP_STORED),
+                         ('..\\windows.txt', b'd', zipfile.ZIP_STORED),
+                         ('../', b'', zipfile.ZIP_STORED)])
+    
+    entries = list(iter_zip_stream(io.BytesIO(archive), str(dest_dir)))
+    
+    assert [entry['path'] for entry in entries] == [
+        str(dest_dir / 'escaped.txt'),
+        str(dest_dir / 'etc' / 'absolute.txt'),
+        str(dest_dir / 'images' / 'up.txt'),
+        str(dest_dir / 'windows.txt'),
+        None,
+    ]
+    assert sorted(os.listdir(tmp_path)) == ['export']
+    assert read_tree(dest_dir) == {'escaped.txt': b'a', 'etc/absolute.txt': b'b', 'images/up.txt': b'c',
+                                   'windows.txt': b'd'}
+
+
+def test_multipart_fields_before_file_part(tmp_path):
+    archive = build_zip([(name, data, zipfile.ZIP_DEFLATED) for name, data in CONTENTS.items()], seekable=False)
+    body = multipart_body({'pdf_path': '/mnt/s/job1/drawings.pdf', 'image_profile': 'compact'},
+                          'zip', 'export.zip', archive)
+    
+    stream = MultipartFileStream(TrickleReader(body, step=50), BOUNDARY, file_field='zip', chunk_size=50)
+    
+    assert stream.fields == {'pdf_path': '/mnt/s/job1/drawings.pdf', 'image_profile': 'compact'}
+    assert stream.filename == 'export.zip'
+    assert extract_zip_stream(stream, str(tmp_path))['entries'] == 3
+    assert read_tree(tmp_path) == CONTENTS
+
+
+def test_multipart_read_sizes():
+    data = bytes(range(256)) * 20
+    body = multipart_body({'name': 'value'}, 'file', 'data.bin', data)
+    
+    stream = MultipartFileStream(io.BytesIO(body), BOUNDARY, chunk_size=100)
+    
+    assert stream.read(0) == b''
+    assert stream.read(10) == data[:10]
+    assert stream.read(1000) == data[10:1010]
+    assert stream.read() == data[1010:]
+    assert stream.read(10) == b''
+
+
+def test_multipart_without_file_part():
+    body = multipart_body({'pdf_path': '/mnt/s/job1/drawings.pdf'}, 'other', 'export.zip', b'PK')
+    
+    with pytest.raises(ValueError, match="Multipart body has no 'zip' file part"):
+        MultipartFileStream(io.BytesIO(body), BOUNDARY, file_field='zip')
+
+
+def test_multipart_truncated_body():
+    body = multipart_body({'pdf_path': '/mnt/s/job1/drawings.pdf'}, 'zip', 'export.zip', b'x' * 500)
+    
+    for cut in (60, body.index(b'/mnt/s') + 3):
+        with pytest.raises(ValueError, match='Unexpected end of multipart body'):
+            MultipartFileStream(io.BytesIO(body[:cut]), BOUNDARY, file_field='zip')
+    
+    stream = MultipartFileStream(io.BytesIO(body[:-100]), BOUNDARY, file_field='zip')
+    with pytest.raises(ValueError, match='Unexpected end of multipart body'):
+        stream.read()
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+Streaming ZIP Extraction
+========================
+
+Extracts a ZIP archive while it is being received, reading the local file
+headers in order instead of seeking to the central directory at the end.
+Nothing is buffered beyond one read chunk, so uploads of any size go
+straight into the export folder without a temporary archive.
+
+Entries may be stored or deflated; deflated entries may defer their sizes to
+a data descriptor (as streaming ZIP writers do). ZIP64 sizes are supported.
+"""
+
+import os
+import struct
+import zlib
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File, MultipartDecoder, NeedData
+
+# Read size for both the request body and entry data
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+LOCAL_HEADER_SIGNATURE = 0x04034b50
+DATA_DESCRIPTOR_SIGNATURE = 0x08074b50
+CENTRAL_DIRECTORY_SIGNATURE = 0x02014b50
+END_OF_CENTRAL_DIRECTORY_SIGNATURE = 0x06054b50
+
+LOCAL_HEADER = struct.Struct('<HHHHHIIIHH')
+ZIP64_EXTRA_ID = 0x0001
+
+FLAG_DATA_DESCRIPTOR = 0x08
+FLAG_UTF8 = 0x800
+
+METHOD_STORED = 0
+METHOD_DEFLATED = 8
+
+
+class _StreamReader:
+    """Reads exact byte counts from a stream, keeping count and allowing data to be pushed back."""
+    
+    def __init__(self, stream, chunk_size: int = STREAM_CHUNK_SIZE):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.buffer = b''
+        self.bytes_read = 0
+    
+    def read_some(self, size: int) -> bytes:
+        """Read up to size bytes (fewer only at the end of the stream)."""
+        if self.buffer:
+            data, self.buffer = self.buffer[:size], self.buffer[size:]
+            return data
+        data = self.stream.read(min(size, self.chunk_size))
+        self.bytes_read += len(data)
+        return data
+    
+    def read_exact(self, size: int) -> bytes:
+        """Read exactly size bytes, raising ValueError if the stream ends first."""
+        parts = []
+        remaining = size
+        while remaining:
+            data = self.read_some(remaining)
+            if not data:
+                raise ValueError('Unexpected end of ZIP stream')
+            parts.append(data)
+            remaining -= len(data)
+        return b''.join(parts)
+    
+    def unread(self, data: bytes) -> None:
+        self.buffer = data + self.buffer
+    
+    def drain(self) -> None:
+        """Consume the rest of the stream (the central directory)."""
+        self.buffer = b''
+        while self.read_some(self.chunk_size):
+            pass
+
+
+def safe_member_path(dest_dir: str, name: str) -> Optional[str]:
+    """
+    Destination path of a ZIP entry, sanitised like zipfile.extractall().
+    
+    Drive letters, absolute paths and '.'/'..' components are dropped so an
+    entry can never be written outside dest_dir.
+    
+    Returns:
+        str: Path inside dest_dir, or None if nothing is left of the name
+    """
+    name = name.replace('\\', '/')
+    name = os.path.splitdrive(name)[1]
+    parts = [part for part in name.split('/') if part not in ('', '.', '..')]
+    if not parts:
+        return None
+    return os.path.join(dest_dir, *parts)
+
+
+def _zip64_sizes(extra: bytes, compressed_size: int, uncompressed_size: int) -> Tuple[int, int]:
+    """Replace 0xFFFFFFFF sizes with the values of a ZIP64 extra field."""
+    offset = 0
+    while offset + 4 <= len(extra):
+        header_id, length = struct.unpack_from('<HH', extra, offset)
+        if header_id == ZIP64_EXTRA_ID:
+            values = list(struct.unpack_from(f'<{length // 8}Q', extra, offset + 4))
+            if uncompressed_size == 0xFFFFFFFF and values:
+                uncompressed_size = values.pop(0)
+            if compressed_size == 0xFFFFFFFF and values:
+                compressed_size = values.pop(0)
+            break
+        offset += 4 + length
+    return compressed_size, uncompressed_size
+
+
+def _read_data_descriptor(reader: _StreamReader, zip64: bool) -> Tuple[int, int, int]:
+    """Read the (crc, compressed size, uncompressed size) descriptor after an entry's data."""
+    first = reader.read_exact(4)
+    if struct.unpack('<I', first)[0] == DATA_DESCRIPTOR_SIGNATURE:
+        first = reader.read_exact(4)
+    crc = struct.unpack('<I', first)[0]
+    
+    size_format = '<QQ' if zip64 else '<II'
+    compressed_size, uncompressed_size = struct.unpack(size_format, reader.read_exact(struct.calcsize(size_format)))
+    return crc, compressed_size, uncompressed_size
+
+
+def _copy_entry_data(reader: _StreamReader, method: int, compressed_size: Optional[int],
+                     write: Callable[[bytes], Any], progress: Callable[[], None]) -> Tuple[int, int]:
+    """
+    Copy one entry's data to write(), decompressing it if needed.
+    
+    Args:
+        reader: Stream positioned at the start of the entry data
+        method: Compression method from the local header
+        compressed_size: Size from the local header, or None if it is in a
+            data descriptor
+        write: Called with each chunk of uncompressed data
+        progress: Called after each chunk
+    
+    Returns:
+        Tuple of (crc32, uncompressed bytes written)
+    """
+    crc = 0
+    written = 0
+    
+    if method == METHOD_STORED:
+        if compressed_size is None:
+            raise ValueError('Stored ZIP entries must record their size in the local header')
+        remaining = compressed_size
+        while remaining:
+            data = reader.read_exact(min(remaining, reader.chunk_size))
+            remaining -= len(data)
+            crc = zlib.crc32(data, crc)
+            write(data)
+            written += len(data)
+            progress()
+        return crc, written
+    
+    if method != METHOD_DEFLATED:
+        raise ValueError(f'Unsupported ZIP compression method {method}')
+    
+    # The deflate stream marks its own end, so the compressed size is not needed
+    decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+    remaining = compressed_size
+    while not decompressor.eof:
+        size = reader.chunk_size if remaining is None else min(remaining, reader.chunk_size)
+        data = reader.read_some(size) if size else b''
+        if not data:
+            raise ValueError('Unexpected end of ZIP stream')
+        if remaining is not None:
+            remaining -= len(data)
+        
+        output = decompressor.decompress(data)
+        if output:
+            crc = zlib.crc32(output, crc)
+            write(output)
+            written += len(output)
+        progress()
+    
+    # Give back whatever followed the end of the deflate stream
+    if decompressor.unused_data:
+        reader.unread(decompressor.unused_data)
+    
+    return crc, written
+
+
+def iter_zip_stream(stream, dest_dir: str,
+                    progress: Optional[Callable[[int, int], None]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Extract a ZIP archive from a forward-only stream, yielding each entry once written.
+    
+    Args:
+        stream: Readable binary stream positioned at the start of the archive
+        dest_dir: Folder the entries are extracted into
+        progress: Optional callback receiving (bytes read, entries written)
+            as data arrives
+    
+    Yields:
+        Dictionary with 'name', 'path' (None for skipped names), 'is_dir'
+        and 'size' of each entry
+    
+    Raises:
+        ValueError: If the stream is not a supported ZIP archive, an entry is
+            truncated or its CRC does not match
+    """
+    reader = _StreamReader(stream)
+    entries = 0
+    
+    def report():
+        if progress:
+            progress(reader.bytes_read, entries)
+    
+    while True:
+        signature_bytes = reader.read_some(4)
+        if len(signature_bytes) < 4:
+            if entries or signature_bytes:
+                raise ValueError('Unexpected end of ZIP stream')
+            raise ValueError('Empty ZIP stream')
+        
+        signature = struct.unpack('<I', signature_bytes)[0]
+        if signature in (CENTRAL_DIRECTORY_SIGNATURE, END_OF_CENTRAL_DIRECTORY_SIGNATURE):
+            reader.drain()
+            report()
+            return
+        if signature != LOCAL_HEADER_SIGNATURE:
+            raise ValueError('Not a ZIP archive (bad local header signature)')
+        
+        (_, flags, method, _, _, crc, compressed_size, uncompressed_size,
+         name_length, extra_length) = LOCAL_HEADER.unpack(reader.read_exact(LOCAL_HEADER.size))
+        raw_name = reader.read_exact(name_length)
+        extra = reader.read_exact(extra_length)
+        
+        name = raw_name.decode('utf-8' if flags & FLAG_UTF8 else 'cp437')
+        zip64 = 0xFFFFFFFF in (compressed_size, uncompressed_size)
+        if zip64:
+            compressed_size, uncompressed_size = _zip64_sizes(extra, compressed_size, uncompressed_size)
+        
+        deferred = bool(flags & FLAG_DATA_DESCRIPTOR)
+        path = safe_member_path(dest_dir, name)
+        is_dir = name.endswith('/')
+        
+        if path is not None and is_dir:
+            os.makedirs(path, exist_ok=True)
+        
+        known_size = None if deferred else compressed_size
+        if path is not None and not is_dir:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                actual_crc, written = _copy_entry_data(reader, method, known_size, f.write, report)
+        else:
+            actual_crc, written = _copy_entry_data(reader, method, known_size, lambda data: None, report)
+        
+        if deferred:
+            crc, _, uncompressed_size = _read_data_descriptor(reader, zip64)
+        
+        if actual_crc != crc or written != uncompressed_size:
+            raise ValueError(f"Corrupt ZIP entry '{name}' (CRC or size mismatch)")
+        
+        entries += 1
+        report()
+        yield {'name': name, 'path': path, 'is_dir': is_dir, 'size': written}
+
+
+def extract_zip_stream(stream, dest_dir: str,
+                       progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
+    """
+    Extract a ZIP archive from a forward-only stream.
+    
+    Args:
+        stream: Readable binary stream positioned at the start of the archive
+        dest_dir: Folder the entries are extracted into
+        progress: Optional callback receiving (bytes read, entries written)
+    
+    Returns:
+        Dictionary with 'entries' (files and folders written) and
+        'bytes_written' (uncompressed size of the files)
+    """
+    os.makedirs(dest_dir, exist_ok=True)
+    result = {'entries': 0, 'bytes_written': 0}
+    for entry in iter_zip_stream(stream, dest_dir, progress):
+        result['entries'] += 1
+        result['bytes_written'] += entry['size']
+    return result
+
+
+class MultipartFileStream:
+    """
+    Readable stream over one file part of a multipart/form-data body.
+    
+    Form fields sent before the file part are parsed into `fields` when the
+    stream is created; the file data is then read lazily, straight from the
+    request body, without Werkzeug spooling it to a temporary file.
+    """
+    
+    def __init__(self, stream, boundary: bytes, file_field: str = 'file',
+                 chunk_size: int = STREAM_CHUNK_SIZE):
+        """
+        Parse the body up to the start of the file part.
+        
+        Args:
+            stream: Raw request body
+            boundary: Multipart boundary from the Content-Type header
+            file_field: Name of the file part to stream
+            chunk_size: Size of each read from the body
+        
+        Raises:
+            ValueError: If the body ends before the file part
+        """
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = MultipartDecoder(boundary)
+        self.fields: Dict[str, str] = {}
+        self.filename: Optional[str] = None
+        self._buffer = b''
+        self._body_done = False
+        self._file_done = False
+        
+        field_name = None
+        field_data: List[bytes] = []
+        while True:
+            event = self._next_event()
+            if isinstance(event, Field):
+                field_name, field_data = event.name, []
+            elif isinstance(event, File):
+                if event.name == file_field:
+                    self.filename = event.filename
+                    return
+                field_name = None
+            elif isinstance(event, Data):
+                if field_name is not None:
+                    field_data.append(event.data)
+                    if not event.more_data:
+                        self.fields[field_name] = b''.join(field_data).decode('utf-8')
+                        field_name = None
+            elif isinstance(event, Epilogue):
+                raise ValueError(f"Multipart body has no '{file_field}' file part")
+    
+    def _next_event(self):
+        """Next decoder event, reading more of the body as needed."""
+        event = self.decoder.next_event()
+        while isinstance(event, NeedData):
+            if self._body_done:
+                raise ValueError('Unexpected end of multipart body')
+            chunk = self.stream.read(self.chunk_size)
+            self._body_done = not chunk
+            self.decoder.receive_data(chunk or None)
+            try:
+                event = self.decoder.next_event()
+            except ValueError:
+                # The decoder rejects a body that stops before its closing boundary
+                if self._body_done:
+                    raise ValueError('Unexpected end of multipart body') from None
+                raise
+        return event
+    
+    def read(self, size: int = -1) -> bytes:
+        """Read up to size bytes of the file part (all of it if size is negative)."""
+        parts = [self._buffer]
+        length = len(self._buffer)
+        while not self._file_done and (size < 0 or length < size):
+            event = self._next_event()
+            if not isinstance(event, Data):
+                continue
+            parts.append(event.data)
+            length += len(event.data)
+            if not event.more_data:
+                self._file_done = True
+        
+        data = b''.join(parts)
+        if size < 0:
+            self._buffer = b''
+            return data
+        self._buffer = data[size:]
+        return data[:size]